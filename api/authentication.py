@@ -0,0 +1,45 @@
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from orders.auth import WorkerAuthService
+
+
+class WorkerTokenAuthentication(BaseAuthentication):
+    """
+    Аутентификация работника по заголовку "Authorization: Token <ключ>".
+    Токен проверяется через кэш, к БД запрос идет только при промахе кэша.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Неверный заголовок токена.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Неверный заголовок токена.')
+
+        worker = WorkerAuthService.get_token_worker(key)
+        if worker is None:
+            raise AuthenticationFailed('Неверный токен.')
+        return worker, key
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class WorkerSessionAuthentication(SessionAuthentication):
+    """
+    Аутентификация работника, вошедшего через HTML-форму (request.worker из WorkerMiddleware).
+    Как и SessionAuthentication, требует CSRF-токен для небезопасных методов.
+    """
+    def authenticate(self, request):
+        # request.worker — ленивый объект: проверяем его истинность, а не is None
+        worker = getattr(request._request, 'worker', None)
+        if not worker:
+            return None
+        self.enforce_csrf(request)
+        return worker, None
@@ -0,0 +1,11 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class OrderConflict(APIException):
+    """
+    Заказ изменили после того, как клиент его прочитал (HTTP 409).
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Заказ был изменен другим пользователем. Получите актуальную версию и повторите.'
+    default_code = 'conflict'
@@ -0,0 +1,38 @@
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.filters import BaseFilterBackend
+
+from orders.search import DishSearchService
+
+
+class DishSearchFilter(BaseFilterBackend):
+    """
+    Поиск заказов по названиям блюд (?dish=борщ) через полнотекстовый индекс.
+    """
+    search_param = 'dish'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return DishSearchService.filter_orders(queryset, query)
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        return [
+            coreapi.Field(
+                name=self.search_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(description='Название блюда (поиск по словам и их началу).'),
+            )
+        ]
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Название блюда (поиск по словам и их началу).',
+            'schema': {'type': 'string'},
+        }]
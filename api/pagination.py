@@ -0,0 +1,208 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class OrderCursorPagination(BasePagination):
+    """
+    Постраничный вывод по непрозрачному курсору без COUNT(*) и OFFSET.
+    Курсор хранит значения полей сортировки последней строки страницы,
+    а следующая страница выбирается условием "строго после этих значений",
+    поэтому время ответа не зависит от глубины. Сортировка берется из
+    OrderingFilter и всегда дополняется ID, чтобы позиция была уникальной.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = ('-id',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare_queryset(queryset, request)
+        return self.set_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        То же, что paginate_queryset, но строки страницы читаются асинхронным ORM.
+        """
+        queryset = self.prepare_queryset(queryset, request)
+        return self.set_page([row async for row in queryset[:self.page_size + 1]])
+
+    def prepare_queryset(self, queryset, request):
+        """
+        Разбирает курсор и возвращает queryset, начинающийся сразу после позиции.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self.invert(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, self.position))
+        return queryset
+
+    def set_page(self, rows) -> list:
+        """
+        Отрезает лишнюю строку (признак следующей страницы) и запоминает направление ссылок.
+        """
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.page = page
+        return page
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset) -> list[str]:
+        """
+        Сортировка queryset (после OrderingFilter) с ID в качестве последнего ключа.
+        """
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(self.default_ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    @staticmethod
+    def invert(field) -> str:
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def get_position_filter(ordering, position) -> Q:
+        """
+        Условие "строка идет после позиции" для составного ключа сортировки.
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                condition &= Q(**{previous_field.lstrip('-'): value})
+            conditions.append(condition)
+        return reduce(or_, conditions)
+
+    def get_position(self, instance) -> list:
+        # Строка страницы — заказ или словарь из values()
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in self.ordering]
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, instance, reverse) -> str:
+        position = [value if isinstance(value, (int, str)) else str(value) for value in self.get_position(instance)]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, model) -> tuple:
+        """
+        Позиция и направление из курсора. Значения приводятся к типам полей сортировки,
+        поэтому подделанный курсор дает 404, а не ошибку в запросе к БД.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [self.to_python(model, field, value) for field, value in zip(self.ordering, position)]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def to_python(model, field, value):
+        name = field.lstrip('-')
+        model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        if isinstance(value, (dict, list, bool)) or value is None:
+            raise ValueError
+        return model_field.to_python(value)
+
+    def get_link(self, instance, reverse):
+        if instance is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(instance, reverse))
+
+    def get_next_link(self):
+        return self.get_link(self.page[-1] if self.has_next and self.page else None, reverse=False)
+
+    def get_previous_link(self):
+        return self.get_link(self.page[0] if self.has_previous and self.page else None, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OrderPagination(BasePagination):
+    """
+    По умолчанию — курсорный режим; номерной режим (PageNumberPagination)
+    сохраняется для существующих клиентов через параметр page или pagination=page.
+    """
+    mode_query_param = 'pagination'
+
+    def get_paginator(self, request) -> BasePagination:
+        if request.query_params.get(self.mode_query_param) == 'page' or 'page' in request.query_params:
+            return PageNumberPagination()
+        return OrderCursorPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        if isinstance(self.paginator, OrderCursorPagination):
+            return await self.paginator.apaginate_queryset(queryset, request, view)
+        # Номерной режим считает COUNT(*) внутри DRF — выполняем его в потоке
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return OrderCursorPagination().get_paginated_response_schema(schema)
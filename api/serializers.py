@@ -1,11 +1,21 @@
+from decimal import Decimal
+
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework import serializers
 
-from orders.models import Order
+from orders.models import Order, OrderArchive, OrderConflictError, Worker
 from orders.services import OrderService
+from orders.tables import TableService
+
+from .exceptions import OrderConflict
 
 
 class OrderSerializer(serializers.ModelSerializer):
+    # Версия, с которой клиент прочитал заказ; при изменении — необязательная проверка
+    version = serializers.IntegerField(required=False, min_value=1)
+
     class Meta:
         model = Order
         fields = '__all__'
@@ -21,45 +31,64 @@ class OrderSerializer(serializers.ModelSerializer):
         
         return fields
 
+    @staticmethod
+    def get_total_price(items) -> float:
+        return sum(float(item.get('price', 0)) for item in items)
+
+    def get_create_data(self, validated_data) -> dict:
+        """
+        Поля нового заказа (в том числе при пакетном создании): версию новой строки
+        задает модель, а не клиент, total_price вычисляется на основе items.
+        """
+        validated_data.pop('version', None)
+        validated_data['total_price'] = self.get_total_price(validated_data.get('items', []))
+        return validated_data
+
     def create(self, validated_data):
-        # Вычисляем total_price на основе items
-        items = validated_data.get('items', [])
-        total_price = sum(float(item.get('price', 0)) for item in items)
-        validated_data['total_price'] = total_price
-        
-        # Создаем заказ
-        return super().create(validated_data)
+        validated_data = self.get_create_data(validated_data)
+
+        # Создаем заказ и закрепляем за ним стол в одной транзакции
+        with transaction.atomic():
+            order = super().create(validated_data)
+            if not TableService.claim(order):
+                raise serializers.ValidationError({'table_number': ["Стол уже занят."]})
+        return order
     
     def update(self, instance, validated_data):
         # Удаляем table_number и total_price, если они есть
         validated_data.pop('table_number', None)
         validated_data.pop('total_price', None)
 
-        # Получаем текущие блюда
-        existing_items = instance.items
-
-        # Получаем новые блюда
-        new_items = validated_data.get('items', [])
-
-        # Добавляем новые блюда к существующим
-        updated_items = existing_items + new_items
-
-        # Обновляем validated_data
-        validated_data['items'] = updated_items
+        # Новые блюда добавляются к существующим одним UPDATE на стороне БД,
+        # total_price и количество блюд пересчитываются там же
+        new_items = validated_data.pop('items', [])
 
-        # Пересчитываем total_price
-        total_price = sum(float(item.get('price', 0)) for item in updated_items)
-        instance.total_price = total_price
+        # Без версии от клиента проверяется версия, прочитанная в этом запросе
+        expected_version = validated_data.pop('version', None)
 
-        # Сохраняем обновленные данные
-        return super().update(instance, validated_data)
+        try:
+            with transaction.atomic():
+                if validated_data:
+                    if expected_version is not None:
+                        instance.version = expected_version
+                    for attr, value in validated_data.items():
+                        setattr(instance, attr, value)
+                    instance.save(update_fields=list(validated_data))
+                    expected_version = None  # Версию уже проверило сохранение
+                if new_items:
+                    OrderService.append_items(instance, new_items, expected_version=expected_version)
+        except OrderConflictError:
+            raise OrderConflict()
+        return instance
 
     def validate_table_number(self, value):
         """
         Проверка, что выбранный стол не занят.
+        При пакетном создании занятость проверяется одним запросом на весь пакет.
         """
-        occupied_tables = OrderService.get_occupied_tables()
-        if value in occupied_tables:
+        if self.context.get('skip_table_check'):
+            return value
+        if TableService.is_occupied(value):
             raise serializers.ValidationError("Стол уже занят.")
         return value
 
@@ -89,4 +118,180 @@ class OrderSerializer(serializers.ModelSerializer):
             except (TypeError, ValueError):
                 raise serializers.ValidationError("Цена блюда должна быть числом.")
         
-        return value
\ No newline at end of file
+        return value
+
+
+class OrderReadSerializer:
+    """
+    Представление заказа для чтения (список и детали) из строк values() без объектов полей DRF.
+    Дает тот же результат, что OrderSerializer: поля в том же порядке, сумма — строкой
+    с двумя знаками, даты — ISO 8601 в текущем часовом поясе с "Z" вместо "+00:00".
+    Набор полей можно сузить (?fields= / ?exclude=), тогда лишние столбцы не читаются из БД.
+    """
+    FIELDS = (
+        'id', 'version', 'table_number', 'items', 'items_count',
+        'total_price', 'status', 'created_at', 'updated_at', 'paid_at',
+    )
+    PRICE_EXP = Decimal('0.01')
+
+    @staticmethod
+    def format_price(value) -> str:
+        # Как rest_framework.fields.DecimalField.to_representation
+        return format(value.quantize(OrderReadSerializer.PRICE_EXP), 'f')
+
+    @staticmethod
+    def format_datetime(value):
+        # Как rest_framework.fields.DateTimeField.to_representation
+        if value is None:
+            return None
+        value = value.astimezone(timezone.get_current_timezone()).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    # Поля, которые нужно привести к виду DRF; остальные отдаются как есть
+    CONVERTERS = {
+        'total_price': format_price,
+        'created_at': format_datetime,
+        'updated_at': format_datetime,
+        'paid_at': format_datetime,
+    }
+
+    @staticmethod
+    def select_fields(fields=None, exclude=None) -> tuple:
+        """
+        Поля ответа по параметрам fields и exclude (названия через запятую) в порядке FIELDS.
+        """
+        selected = set(OrderReadSerializer.FIELDS)
+        errors = {}
+        for param, value in (('fields', fields), ('exclude', exclude)):
+            if not value:
+                continue
+            names = {name.strip() for name in value.split(',') if name.strip()}
+            unknown = names - selected if param == 'fields' else names - set(OrderReadSerializer.FIELDS)
+            if unknown:
+                errors[param] = [f"Неизвестные поля: {', '.join(sorted(unknown))}."]
+            elif param == 'fields':
+                selected = names
+            else:
+                selected -= names
+        if errors:
+            raise serializers.ValidationError(errors)
+        if not selected:
+            raise serializers.ValidationError({'fields': ["Не осталось ни одного поля."]})
+        return tuple(field for field in OrderReadSerializer.FIELDS if field in selected)
+
+    @staticmethod
+    def to_representation(row, fields=FIELDS) -> dict:
+        converters = OrderReadSerializer.CONVERTERS
+        return {
+            field: converters[field](row[field]) if field in converters else row[field]
+            for field in fields
+        }
+
+    @staticmethod
+    def many(rows, fields=FIELDS) -> list:
+        return [OrderReadSerializer.to_representation(row, fields) for row in rows]
+
+
+class OrderArchiveSerializer(serializers.ModelSerializer):
+    """
+    Архивный заказ: те же поля, что у OrderSerializer, плюс дата архивации. Только чтение.
+    """
+    class Meta:
+        model = OrderArchive
+        fields = [
+            'id', 'version', 'table_number', 'items', 'items_count', 'total_price',
+            'status', 'created_at', 'updated_at', 'paid_at', 'archived_at',
+        ]
+        read_only_fields = fields
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    """
+    Массовая смена статуса: новый статус и ID заказов (или фильтр в параметрах запроса).
+    """
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class OrderExportFilterSerializer(serializers.Serializer):
+    """
+    Параметры выгрузки заказов: формат и фильтры OrderViewSet плюс период создания.
+    """
+    export_format = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    table_number = serializers.IntegerField(min_value=1, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+
+class TableSerializer(serializers.Serializer):
+    """
+    Стол на схеме зала.
+    """
+    number = serializers.IntegerField()
+    is_occupied = serializers.BooleanField()
+    active_order = serializers.IntegerField(allow_null=True)
+    active_order_status = serializers.CharField(allow_null=True)
+
+
+class RevenueFilterSerializer(serializers.Serializer):
+    """
+    Параметры периода для расчета выручки; дата окончания включается целиком.
+    """
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_from = attrs.get('date_from')
+        date_to = attrs.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("Дата начала периода не может быть позже даты окончания.")
+        return attrs
+
+
+class TableRevenueSerializer(serializers.Serializer):
+    table_number = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    orders_count = serializers.IntegerField()
+
+
+class RevenueSerializer(serializers.Serializer):
+    total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    orders_count = serializers.IntegerField()
+    by_table = TableRevenueSerializer(many=True)
+
+
+class DishTopFilterSerializer(RevenueFilterSerializer):
+    """
+    Параметры рейтинга блюд: период оплаты, стол и длина списка.
+    """
+    table_number = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class DishSalesSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class WorkerTokenSerializer(serializers.Serializer):
+    """
+    Данные для получения токена работника.
+    """
+    identifier = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        worker = Worker.objects.filter(identifier=attrs['identifier']).first()
+        if worker is None or not worker.check_password(attrs['password']):
+            raise serializers.ValidationError('Неверный идентификатор или пароль.')
+        attrs['worker'] = worker
+        return attrs
@@ -1,14 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter 
 
-from .views import OrderViewSet
+from .views import AsyncOrderView, DishTopView, OrderViewSet, RevenueView, TableViewSet, WorkerTokenView
 
 
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='order')
+router.register(r'tables', TableViewSet, basename='table')
 
 
 urlpatterns = [
+    path('revenue/', RevenueView.as_view(), name='revenue'),
+    path('dishes/top/', DishTopView.as_view(), name='dish-top'),
+    path('auth/token/', WorkerTokenView.as_view(), name='worker-token'),
+    path('async/orders/', AsyncOrderView.as_view(), name='async-order-list'),
+    path('async/orders/<str:pk>/', AsyncOrderView.as_view(), name='async-order-detail'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
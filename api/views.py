@@ -1,18 +1,56 @@
+import hashlib
+import math
+import time
+
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import BasePermission, IsAuthenticated
-from rest_framework import viewsets, filters
+from rest_framework import generics, viewsets, filters, serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView, exception_handler
 
-from orders.models import Order
+from orders.auth import WorkerAuthService
+from orders.dishes import DishStatsService
+from orders.export import OrderExportService
+from orders.models import Order, OrderArchive
+from orders.revenue import RevenueService
+from orders.services import OrderService
+from orders.tables import TableService
 
-from .serializers import OrderSerializer
+from .filters import DishSearchFilter
+from .pagination import OrderPagination
+from .renderers import FastJSONRenderer
+from .serializers import (
+    DishSalesSerializer,
+    DishTopFilterSerializer,
+    OrderArchiveSerializer,
+    OrderExportFilterSerializer,
+    OrderReadSerializer,
+    OrderSerializer,
+    OrderTransitionSerializer,
+    RevenueFilterSerializer,
+    RevenueSerializer,
+    TableSerializer,
+    WorkerTokenSerializer,
+)
 
 
 class IsWorker(BasePermission):
     """
-    Проверка, что пользователь является работником.
+    Проверка, что запрос выполнен работником (токен или сессия работника).
     """
+    message = 'Действие доступно только работникам кафе.'
+
     def has_permission(self, request, view):
-        return request.user.is_worker
+        return bool(getattr(request.user, 'is_worker', False))
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -21,9 +59,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, DishSearchFilter, filters.OrderingFilter]
     filterset_fields = ['table_number', 'status']
     search_fields = ['table_number', 'status']
+    ordering_fields = ['id', 'table_number', 'status', 'total_price', 'created_at', 'updated_at']
+    ordering = ['-id']
+    pagination_class = OrderPagination
+    bulk_max_orders = 500
 
     def get_serializer_context(self):
         """
@@ -31,4 +73,352 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         context = super().get_serializer_context()
         context['request'] = self.request  # Добавляем запрос в контекст
-        return context
\ No newline at end of file
+        return context
+
+    @staticmethod
+    def is_conditional(request) -> bool:
+        return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        # Один URL отдается в разных форматах (JSON, MessagePack) по заголовку Accept
+        patch_vary_headers(response, ['Accept'])
+        if last_modified is not None:
+            # HTTP-дата точна до секунды: время изменения округляется вверх, но не дальше текущей
+            # секунды, чтобы Last-Modified не оказался в будущем
+            response['Last-Modified'] = http_date(min(math.ceil(last_modified.timestamp()), int(time.time())))
+        return response
+
+    @staticmethod
+    def get_detail_etag(request, pk, version, fields) -> str:
+        """
+        ETag деталей заказа: версия заказа, формат ответа и выбранные поля,
+        чтобы 304 не подставил клиенту тело в другом формате или с другими полями.
+        """
+        tag = f'{pk}-{version}-{request.accepted_renderer.format}'
+        if fields != OrderReadSerializer.FIELDS:
+            tag += '-' + ','.join(fields)
+        return quote_etag(tag)
+
+    def get_not_modified(self, request, etag, last_modified, use_last_modified=True):
+        """
+        Ответ 304, если версия клиента актуальна (If-None-Match / If-Modified-Since), иначе None.
+        """
+        # По If-Modified-Since 304 выдается, только если заказ изменен не позже начала
+        # указанной секунды: изменение внутри этой секунды дает 200
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=math.ceil(last_modified.timestamp()) if use_last_modified and last_modified else None,
+        )
+        if not_modified is not None:
+            self.set_validators(not_modified, etag, last_modified)
+        return not_modified
+
+    def get_read_fields(self) -> tuple:
+        """
+        Поля ответа при чтении по параметрам ?fields= и ?exclude= (по умолчанию — все).
+        """
+        return OrderReadSerializer.select_fields(
+            self.request.query_params.get('fields'), self.request.query_params.get('exclude')
+        )
+
+    def get_read_queryset(self, fields, queryset=None):
+        """
+        Заказы для чтения (список и детали) в виде словарей для OrderReadSerializer.
+        Читаются только поля ответа, ID и поля сортировки (для позиции курсора):
+        без items в fields столбец JSON со списком блюд не читается вовсе.
+        """
+        if queryset is None:
+            queryset = self.filter_queryset(self.get_queryset())
+        ordering = {field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)}
+        columns = {*fields, 'id', *ordering}
+        return queryset.values(*(field for field in OrderReadSerializer.FIELDS if field in columns))
+
+    @staticmethod
+    def trim_archived(data, fields) -> dict:
+        """
+        Архивный заказ с теми же полями, что выбраны для рабочего; дата архивации остается.
+        """
+        return {name: value for name, value in data.items() if name in fields or name not in OrderReadSerializer.FIELDS}
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Детали заказа с ETag по версии заказа и Last-Modified по времени изменения.
+        Для условного запроса сначала читаются только версия и время, и при совпадении
+        отдается 304 без загрузки и сериализации заказа. Если заказа нет среди рабочих,
+        он ищется в архиве.
+        """
+        fields = self.get_read_fields()
+        if self.is_conditional(request):
+            try:
+                validators = (
+                    self.filter_queryset(self.get_queryset())
+                    .filter(pk=kwargs[self.lookup_field])
+                    .values('pk', 'version', 'updated_at')
+                    .first()
+                )
+            except (TypeError, ValueError, ValidationError):
+                validators = None
+            if validators is not None:
+                not_modified = self.get_not_modified(
+                    request,
+                    self.get_detail_etag(request, validators['pk'], validators['version'], fields),
+                    validators['updated_at']
+                )
+                if not_modified is not None:
+                    return not_modified
+
+        try:
+            row = generics.get_object_or_404(
+                self.get_read_queryset((*fields, 'version', 'updated_at')), pk=kwargs[self.lookup_field]
+            )
+        except Http404:
+            response = self.retrieve_archived(request, kwargs[self.lookup_field], fields)
+            if response is None:
+                raise
+            return response
+        self.check_object_permissions(request, row)
+        response = Response(OrderReadSerializer.to_representation(row, fields))
+        etag = self.get_detail_etag(request, row['id'], row['version'], fields)
+        return self.set_validators(response, etag, row['updated_at'])
+
+    def retrieve_archived(self, request, pk, fields=OrderReadSerializer.FIELDS):
+        """
+        Детали архивного заказа (только чтение) с теми же валидаторами, что у рабочего заказа;
+        None, если в архиве заказа нет.
+        """
+        try:
+            instance = OrderArchive.objects.filter(pk=pk).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if instance is None:
+            return None
+        etag = self.get_detail_etag(request, instance.pk, instance.version, fields)
+        not_modified = self.get_not_modified(request, etag, instance.updated_at)
+        if not_modified is not None:
+            return not_modified
+        data = self.trim_archived(OrderArchiveSerializer(instance).data, fields)
+        return self.set_validators(Response(data), etag, instance.updated_at)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список заказов с ETag по строкам отдаваемой страницы (ID, версия, время изменения),
+        ссылкам на соседние страницы и параметрам запроса. Для 304 читается только
+        сама страница — без сериализации и без агрегатов по всей выборке.
+        """
+        fields = self.get_read_fields()
+        # Строки страницы читаются через values() и сериализуются без ModelSerializer
+        rows = self.get_read_queryset((*fields, 'version', 'updated_at'))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            page, links = list(rows), None
+        else:
+            links = {name: value for name, value in self.get_paginated_response([]).data.items() if name != 'results'}
+
+        fingerprint = repr((
+            request.accepted_renderer.format,
+            request.get_full_path(),
+            links,
+            [(row['id'], row['version'], row['updated_at'].isoformat()) for row in page],
+        ))
+        etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+        last_modified = max((row['updated_at'] for row in page), default=None)
+
+        # Удаление заказа не сдвигает максимум updated_at, поэтому для списка
+        # Last-Modified только информирует, а 304 выдается по ETag
+        not_modified = self.get_not_modified(request, etag, last_modified, use_last_modified=False)
+        if not_modified is not None:
+            return not_modified
+
+        data = OrderReadSerializer.many(page, fields)
+        response = Response(data) if links is None else self.get_paginated_response(data)
+        return self.set_validators(response, etag, last_modified)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Пакетное создание заказов. Принимает список заказов и возвращает
+        результат для каждого: ошибка в одном заказе не отменяет остальные.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            return Response({'detail': 'Ожидается непустой список заказов.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.bulk_max_orders:
+            return Response(
+                {'detail': f'Не больше {self.bulk_max_orders} заказов за один запрос.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = OrderSerializer(context={**self.get_serializer_context(), 'skip_table_check': True})
+        results = [None] * len(request.data)
+        orders, indices = [], []
+        for index, data in enumerate(request.data):
+            try:
+                validated_data = serializer.run_validation(data)
+            except serializers.ValidationError as e:
+                results[index] = {'index': index, 'status': 'error', 'errors': e.detail}
+                continue
+            orders.append(Order(**serializer.get_create_data(validated_data)))
+            indices.append(index)
+
+        errors = OrderService.bulk_create_orders(orders)
+        for index, order, error in zip(indices, orders, errors):
+            if error:
+                results[index] = {'index': index, 'status': 'error', 'errors': error}
+            else:
+                results[index] = {'index': index, 'status': 'created', 'order': serializer.to_representation(order)}
+
+        all_created = all(result['status'] == 'created' for result in results)
+        return Response(results, status=status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS)
+
+    @action(detail=False, methods=['post'], url_path='transition', permission_classes=[IsWorker])
+    def bulk_transition(self, request):
+        """
+        Массовая смена статуса заказов из списка ids или по фильтрам
+        filterset_fields в параметрах запроса. Недопустимые переходы пропускаются.
+        """
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        orders = serializer.validated_data.get('ids')
+        if orders is None:
+            if not any(field in request.query_params for field in self.filterset_fields):
+                return Response(
+                    {'detail': 'Укажите ids или фильтр заказов в параметрах запроса.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            orders = self.filter_queryset(self.get_queryset())
+
+        updated, skipped = OrderService.bulk_transition(orders, serializer.validated_data['status'])
+        return Response({'updated': updated, 'skipped': skipped})
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsWorker])
+    def export(self, request):
+        """
+        Потоковая выгрузка заказов в CSV или NDJSON (параметр export_format, только для работников).
+        """
+        serializer = OrderExportFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        export_format = params.pop('export_format')
+
+        response = StreamingHttpResponse(
+            OrderExportService.iter_export(OrderExportService.build_filter(**params), export_format),
+            content_type=OrderExportService.FORMATS[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+
+class AsyncOrderView(View):
+    """
+    Асинхронное чтение заказов (список и детали) через асинхронный ORM.
+    Фильтры, сортировка, пагинация и сериализация берутся из OrderViewSet,
+    поэтому ответы совпадают с /api/orders/; под ASGI запрос не занимает
+    поток на время ожидания базы.
+    """
+    viewset_class = OrderViewSet
+    renderer = FastJSONRenderer()
+
+    async def get(self, request, pk=None):
+        viewset = self.viewset_class(
+            request=Request(request),
+            args=(),
+            kwargs=self.kwargs,
+            format_kwarg=None,
+            action='list' if pk is None else 'retrieve',
+        )
+        try:
+            data = await (self.list(viewset) if pk is None else self.retrieve(viewset, pk))
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {'view': viewset, 'request': viewset.request})
+            return self.render(response.data, response.status_code)
+        return self.render(data)
+
+    @staticmethod
+    async def list(viewset):
+        fields = viewset.get_read_fields()
+        page = await viewset.paginator.apaginate_queryset(viewset.get_read_queryset(fields), viewset.request, view=viewset)
+        return viewset.paginator.get_paginated_response(OrderReadSerializer.many(page, fields)).data
+
+    @staticmethod
+    async def retrieve(viewset, pk):
+        fields = viewset.get_read_fields()
+        try:
+            row = await aget_object_or_404(viewset.get_read_queryset(fields), pk=pk)
+        except (TypeError, ValueError, ValidationError):
+            # Как в rest_framework.generics.get_object_or_404
+            raise Http404
+        except Http404:
+            # Как в OrderViewSet.retrieve: заказ мог быть перенесен в архив
+            archived = await OrderArchive.objects.filter(pk=pk).afirst()
+            if archived is None:
+                raise
+            return viewset.trim_archived(OrderArchiveSerializer(archived).data, fields)
+        return OrderReadSerializer.to_representation(row, fields)
+
+    def render(self, data, status_code=status.HTTP_200_OK) -> HttpResponse:
+        return HttpResponse(self.renderer.render(data), content_type='application/json', status=status_code)
+
+
+class TableViewSet(viewsets.ViewSet):
+    """
+    API для схемы зала и подбора свободного стола.
+    """
+    def list(self, request):
+        return Response(TableSerializer(TableService.get_floor_map(), many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='next-free')
+    def next_free(self, request):
+        """
+        Возвращает ближайший свободный стол.
+        """
+        return Response({'number': TableService.get_next_free_table()})
+
+
+class RevenueView(APIView):
+    """
+    API для расчета выручки за период по агрегатам (только для работников).
+    """
+    permission_classes = [IsWorker]
+
+    def get(self, request):
+        filter_serializer = RevenueFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        date_from, date_to = RevenueService.period_from_dates(
+            filter_serializer.validated_data.get('date_from'),
+            filter_serializer.validated_data.get('date_to')
+        )
+        revenue = RevenueService.get_revenue(date_from, date_to)
+        return Response(RevenueSerializer(revenue).data)
+
+
+class DishTopView(APIView):
+    """
+    API рейтинга самых продаваемых блюд по счетчикам продаж (только для работников).
+    """
+    permission_classes = [IsWorker]
+
+    def get(self, request):
+        filter_serializer = DishTopFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        dishes = DishStatsService.get_top(**filter_serializer.validated_data)
+        return Response(DishSalesSerializer(dishes, many=True).data)
+
+
+class WorkerTokenView(APIView):
+    """
+    Выдача токена работника по идентификатору и паролю (POST) и отзыв текущего токена (DELETE).
+    """
+    def post(self, request):
+        serializer = WorkerTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = WorkerAuthService.create_token(serializer.validated_data['worker'])
+        return Response({'token': token}, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        if not isinstance(request.auth, str):
+            return Response({'detail': 'Передайте токен в заголовке Authorization.'}, status=status.HTTP_400_BAD_REQUEST)
+        WorkerAuthService.revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,125 @@
+"""
+Сравнение пропускной способности чтения заказов: синхронный /api/orders/
+против асинхронного /api/async/orders/ при одинаковом числе одновременных запросов.
+
+Запуск из корня проекта:
+    python benchmarks/async_read.py --orders 2000 --requests 500 --concurrency 50
+
+Бенчмарк создает временную тестовую базу и удаляет её после замера.
+Синхронные запросы выполняются пулом потоков (как WSGI-сервер), асинхронные —
+корутинами в одном цикле событий (как ASGI-сервер).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cafe_order_system.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from orders.models import Order  # noqa: E402
+from orders.signals import orders_bulk_created  # noqa: E402
+
+
+def create_orders(count) -> None:
+    orders = Order.objects.bulk_create(
+        Order(
+            table_number=number % 20 + 1,
+            items=[{"name": "Борщ", "price": 5.00}, {"name": "Чай", "price": 2.00}],
+            total_price=7.00,
+            status=('waiting', 'ready', 'paid')[number % 3],
+        )
+        for number in range(count)
+    )
+    orders_bulk_created.send(sender=Order, orders=orders)
+
+
+def get_paths(requests) -> list:
+    variants = ['orders/', 'orders/?status=paid', 'orders/?ordering=table_number&page_size=50']
+    return [variants[number % len(variants)] for number in range(requests)]
+
+
+def report(name, started, latencies, threads) -> None:
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latencies)
+    print(
+        f'{name:<6} {len(latencies) / elapsed:8.1f} запр/с   '
+        f'p50 {statistics.median(latencies) * 1000:7.1f} мс   '
+        f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} мс   '
+        f'потоков: {threads}'
+    )
+
+
+def run_sync(paths, concurrency) -> None:
+    local = threading.local()
+    thread_ids = set()
+
+    def fetch(path):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        thread_ids.add(threading.get_ident())
+        started = time.perf_counter()
+        response = local.client.get(f'/api/{path}', HTTP_ACCEPT='application/json')
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(fetch, paths))
+    report('sync', started, latencies, len(thread_ids))
+
+
+async def run_async(paths, concurrency) -> None:
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    threads_before = threading.active_count()
+    peak_threads = threads_before
+
+    async def fetch(path):
+        nonlocal peak_threads
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(f'/api/async/{path}')
+            peak_threads = max(peak_threads, threading.active_count())
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(fetch(path) for path in paths))
+    report('async', started, latencies, peak_threads - threads_before + 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=2000, help='Количество заказов в базе')
+    parser.add_argument('--requests', type=int, default=500, help='Количество запросов на вариант')
+    parser.add_argument('--concurrency', type=int, default=50, help='Одновременных запросов')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        create_orders(args.orders)
+        paths = get_paths(args.requests)
+        print(f'Заказов: {args.orders}, запросов: {args.requests}, одновременно: {args.concurrency}')
+        run_sync(paths, args.concurrency)
+        asyncio.run(run_async(paths, args.concurrency))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
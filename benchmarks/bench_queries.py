@@ -0,0 +1,35 @@
+"""
+Бенчмарки поиска заказов (OrderSearchForm) и страницы выручки (revenue_request).
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from orders.forms import OrderSearchForm
+from orders.models import Order
+from orders.services import WorkerOrderService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('query', ['7', 'оплачено', 'пельм'], ids=['number', 'status', 'dish'])
+def test_search_form_filter_queryset(benchmark, dataset, query):
+    form = OrderSearchForm({'query': query})
+    assert form.is_valid()
+
+    def search():
+        return list(form.filter_queryset(Order.objects.all()).order_by('-id')[:20])
+
+    benchmark(search)
+
+
+@pytest.mark.parametrize('days', [None, 7], ids=['all-time', 'week'])
+def test_revenue_request(benchmark, dataset, make_request, days):
+    today = timezone.localdate()
+    request = make_request(data={} if days is None else {
+        'date_from': (today - timedelta(days=days)).isoformat(),
+        'date_to': today.isoformat(),
+    })
+    response = benchmark(WorkerOrderService.revenue_request, request)
+    assert response.status_code == 200
@@ -0,0 +1,36 @@
+"""
+Бенчмарки кодирования ответов и разбора запросов API: стандартный json, orjson и MessagePack.
+"""
+from io import BytesIO
+
+import pytest
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser, MessagePackParser
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+from api.serializers import OrderReadSerializer
+from orders.models import Order
+
+pytestmark = pytest.mark.django_db
+
+FORMATS = ['json', 'orjson', 'msgpack']
+RENDERERS = [JSONRenderer, FastJSONRenderer, MessagePackRenderer]
+PARSERS = [(JSONParser, JSONRenderer), (FastJSONParser, JSONRenderer), (MessagePackParser, MessagePackRenderer)]
+
+
+@pytest.mark.parametrize('renderer_class', RENDERERS, ids=FORMATS)
+def test_render_order_page(benchmark, dataset, renderer_class):
+    rows = Order.objects.order_by('-id').values(*OrderReadSerializer.FIELDS)[:100]
+    data = {'next': None, 'previous': None, 'results': OrderReadSerializer.many(rows)}
+    renderer = renderer_class()
+
+    assert benchmark(renderer.render, data)
+
+
+@pytest.mark.parametrize('parser_class, renderer_class', PARSERS, ids=FORMATS)
+def test_parse_order(benchmark, dataset, parser_class, renderer_class):
+    body = renderer_class().render({'table_number': 1, 'items': dataset.items()})
+    parser = parser_class()
+
+    assert len(benchmark(lambda: parser.parse(BytesIO(body)))['items']) == dataset.items_count
@@ -0,0 +1,59 @@
+"""
+Бенчмарки сериализатора заказов API (OrderSerializer) и быстрого представления для чтения (OrderReadSerializer).
+"""
+import pytest
+from rest_framework.request import Request
+
+from api.serializers import OrderReadSerializer, OrderSerializer
+from orders.models import Order
+
+pytestmark = pytest.mark.django_db
+
+
+def test_serializer_create(benchmark, dataset, make_request, table_numbers):
+    context = {'request': Request(make_request('post'))}
+    items = dataset.items()
+
+    def create():
+        serializer = OrderSerializer(data={'table_number': next(table_numbers), 'items': items}, context=context)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    benchmark(create)
+
+
+def test_serializer_update(benchmark, dataset, make_request, table_numbers):
+    context = {'request': Request(make_request('patch'))}
+    new_items = dataset.items(offset=5, count=max(dataset.items_count // 10, 1))
+
+    def setup():
+        order = Order.objects.create(table_number=next(table_numbers), items=dataset.items(), total_price=0)
+        return (order,), {}
+
+    def update(order):
+        serializer = OrderSerializer(
+            order, data={'items': new_items, 'version': order.version}, partial=True, context=context
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    benchmark.pedantic(update, setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize('page_size', [20, 100])
+def test_serializer_list(benchmark, dataset, make_request, page_size):
+    context = {'request': Request(make_request())}
+
+    def serialize():
+        return OrderSerializer(Order.objects.order_by('-id')[:page_size], many=True, context=context).data
+
+    assert len(benchmark(serialize)) == page_size
+
+
+@pytest.mark.parametrize('page_size', [20, 100])
+def test_read_serializer_list(benchmark, dataset, page_size):
+    def serialize():
+        rows = Order.objects.order_by('-id').values(*OrderReadSerializer.FIELDS)[:page_size]
+        return OrderReadSerializer.many(rows)
+
+    assert len(benchmark(serialize)) == page_size
@@ -0,0 +1,55 @@
+"""
+Бенчмарки обработки заказов из HTML-форм (OrderService).
+"""
+import pytest
+
+from orders.models import Order
+from orders.services import OrderService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def upload_limit(settings):
+    # Заказ на 500 блюд с новыми блюдами — больше 1000 полей формы (лимит Django по умолчанию)
+    settings.DATA_UPLOAD_MAX_NUMBER_FIELDS = None
+
+
+def dish_fields(items, prefix='dish') -> dict:
+    data = {}
+    for number, item in enumerate(items):
+        data[f'{prefix}_name_{number}'] = item['name']
+        data[f'{prefix}_price_{number}'] = str(item['price'])
+    return data
+
+
+def test_process_dishes(benchmark, dataset, make_request):
+    existing_items = dataset.items()
+    request = make_request('post', data={
+        **dish_fields(existing_items),
+        **dish_fields(dataset.items(offset=3, count=max(dataset.items_count // 10, 1)), prefix='new_dish'),
+    })
+    benchmark(OrderService.process_dishes, request, existing_items=existing_items)
+
+
+def test_create_order_from_request(benchmark, dataset, make_request, table_numbers):
+    request = make_request('post', data=dish_fields(dataset.items()))
+
+    def create():
+        return OrderService.create_order_from_request(request, {'table_number': next(table_numbers)})
+
+    order = benchmark(create)
+    assert order.items_count == dataset.items_count
+
+
+def test_update_order_from_request(benchmark, dataset, make_request, table_numbers):
+    items = dataset.items()
+    new_items = [{'name': f"{item['name']} (двойная порция)", 'price': item['price'] * 2}
+                 for item in items[:max(dataset.items_count // 10, 1)]]
+    request = make_request('post', data={**dish_fields(items), **dish_fields(new_items, prefix='new_dish')})
+
+    def setup():
+        order = Order.objects.create(table_number=next(table_numbers), items=items, total_price=0)
+        return (request, order, {'table_number': order.table_number, 'version': order.version}), {}
+
+    benchmark.pedantic(OrderService.update_order_from_request, setup=setup, rounds=50)
@@ -0,0 +1,111 @@
+"""
+Общие данные для микробенчмарков (benchmarks/bench_*.py).
+
+Наборы данных: 1k и 100k заказов по 10 блюд и 1k заказов по 500 блюд. Набор на 100k
+заказов по 500 блюд (50 млн позиций) не используется: объем на порядки больше реальной
+нагрузки кафе, а зависимость от размера заказа видна и на 1k заказов.
+Каждый набор создается один раз за запуск в тестовой базе; бенчмарки, которые
+пишут в базу, выполняются в транзакции теста и откатываются.
+"""
+import itertools
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone
+
+from orders.items import OrderItemService
+from orders.models import Order
+from orders.revenue import RevenueService
+from orders.search import DishSearchService
+
+MENU = [
+    ('Борщ', '5.00'), ('Солянка', '6.00'), ('Пельмени', '7.50'), ('Вареники', '6.50'), ('Блины', '4.00'),
+    ('Сырники', '4.50'), ('Оливье', '5.50'), ('Винегрет', '3.50'), ('Котлета', '6.00'), ('Плов', '8.00'),
+    ('Шашлык', '12.00'), ('Уха', '7.00'), ('Окрошка', '5.00'), ('Голубцы', '7.00'), ('Жаркое', '9.00'),
+    ('Чай', '2.00'), ('Кофе', '3.00'), ('Компот', '1.50'), ('Морс', '2.00'), ('Квас', '2.50'),
+]
+
+DATASETS = [(1000, 10), (1000, 500), (100000, 10)]
+
+STATUSES = ('waiting', 'ready', 'paid')
+
+
+@dataclass
+class Dataset:
+    orders_count: int
+    items_count: int
+
+    def items(self, offset=0, count=None) -> list:
+        return [
+            {'name': MENU[(offset + number) % len(MENU)][0], 'price': float(MENU[(offset + number) % len(MENU)][1])}
+            for number in range(self.items_count if count is None else count)
+        ]
+
+
+def dataset_id(params) -> str:
+    orders_count, items_count = params
+    return f'{orders_count // 1000}k-orders-{items_count}-items'
+
+
+def fill(dataset, batch_size=5000) -> None:
+    """
+    Заполняет базу пакетно, затем пересобирает позиции, агрегаты выручки и индекс блюд
+    теми же командами обслуживания, что и на рабочей базе.
+    """
+    call_command('flush', interactive=False, verbosity=0)
+    now = timezone.now()
+    for start in range(0, dataset.orders_count, batch_size):
+        orders = []
+        for number in range(start, min(start + batch_size, dataset.orders_count)):
+            items = dataset.items(offset=number)
+            status = STATUSES[number % len(STATUSES)]
+            orders.append(Order(
+                table_number=number % 20 + 1,
+                items=items,
+                items_count=len(items),
+                total_price=sum(Decimal(str(item['price'])) for item in items),
+                status=status,
+                paid_at=now - timedelta(hours=number % (24 * 90)) if status == 'paid' else None,
+            ))
+        Order.objects.bulk_create(orders)
+    OrderItemService.backfill(batch_size=batch_size)
+    RevenueService.rebuild_rollups()
+    DishSearchService.rebuild(batch_size=batch_size)
+
+
+@pytest.fixture(scope='session', params=DATASETS, ids=dataset_id)
+def dataset(request, django_db_setup, django_db_blocker):
+    dataset = Dataset(*request.param)
+    with django_db_blocker.unblock():
+        fill(dataset)
+    return dataset
+
+
+@pytest.fixture
+def table_numbers():
+    """
+    Номера столов вне зала, чтобы каждый новый заказ занимал свободный стол.
+    """
+    return itertools.count(1000)
+
+
+@pytest.fixture
+def make_request():
+    factory = RequestFactory()
+
+    def make_request(method='get', path='/', data=None):
+        request = getattr(factory, method)(path, data or {})
+        request.user = AnonymousUser()
+        request.worker = None
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request
+
+    return make_request
@@ -0,0 +1,104 @@
+"""
+Запуск микробенчмарков (benchmarks/bench_*.py) и сравнение с базовой линией.
+
+Запуск из корня проекта:
+    python benchmarks/run.py             # замер и сравнение с сохраненной базовой линией
+    python benchmarks/run.py --save      # замер и сохранение новой базовой линии
+    python benchmarks/run.py --quick     # без набора на 100k заказов
+
+Базовая линия хранится в benchmarks/baseline.json. При сравнении запуск завершается
+с кодом 1, если минимальное время какого-либо бенчмарка (наименее шумная оценка)
+выросло больше чем на --threshold процентов. Базовую линию стоит обновлять на той же
+машине, на которой проходят сравнения.
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCHMARKS_DIR / 'baseline.json'
+
+
+def load_stats(path) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return {benchmark['fullname']: benchmark['stats'] for benchmark in json.load(file)['benchmarks']}
+
+
+def save(current_path) -> None:
+    """
+    Записывает результаты в базовую линию; при выборочном запуске (-k, --quick)
+    остальные бенчмарки базовой линии сохраняются.
+    """
+    with open(current_path, encoding='utf-8') as file:
+        current = json.load(file)
+    for benchmark in current['benchmarks']:
+        benchmark['stats'].pop('data', None)  # Сырые замеры для сравнения не нужны
+    if BASELINE_PATH.exists():
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            benchmarks = {benchmark['fullname']: benchmark for benchmark in json.load(file)['benchmarks']}
+        benchmarks.update((benchmark['fullname'], benchmark) for benchmark in current['benchmarks'])
+        current['benchmarks'] = sorted(benchmarks.values(), key=lambda benchmark: benchmark['fullname'])
+    with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+        json.dump(current, file, ensure_ascii=False, indent=2)
+
+
+def compare(baseline_path, current_path, threshold, stat='min') -> list:
+    """
+    Печатает изменение времени каждого бенчмарка относительно базовой линии
+    и возвращает имена бенчмарков, замедлившихся больше чем на threshold процентов.
+    """
+    baseline = load_stats(baseline_path)
+    regressions = []
+    print(f'\nСравнение с {baseline_path.name} по {stat}:')
+    for name, stats in sorted(load_stats(current_path).items()):
+        if name not in baseline:
+            print(f'  {name}: нет в базовой линии')
+            continue
+        change = (stats[stat] / baseline[name][stat] - 1) * 100
+        mark = ''
+        if change > threshold:
+            regressions.append(name)
+            mark = '  <-- РЕГРЕССИЯ'
+        print(f'  {name}: {baseline[name][stat] * 1000:.3f} мс -> {stats[stat] * 1000:.3f} мс ({change:+.1f}%){mark}')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--save', action='store_true', help='Сохранить результат как новую базовую линию')
+    parser.add_argument('--quick', action='store_true', help='Пропустить набор на 100k заказов')
+    parser.add_argument('--threshold', type=int, default=25, help='Допустимый рост времени, в процентах')
+    parser.add_argument('-k', dest='keyword', help='Выбрать бенчмарки по имени (как pytest -k)')
+    args = parser.parse_args()
+
+    keywords = [keyword for keyword in (args.keyword, args.quick and 'not 100k') if keyword]
+    pytest_args = [
+        str(BENCHMARKS_DIR),
+        '-o', 'python_files=bench_*.py',
+        '-p', 'no:cacheprovider',
+        '--benchmark-columns=min,median,mean,stddev,rounds',
+        '--benchmark-sort=name',
+    ]
+    if keywords:
+        pytest_args += ['-k', ' and '.join(f'({keyword})' for keyword in keywords)]
+    with tempfile.TemporaryDirectory() as directory:
+        current_path = Path(directory) / 'current.json'
+        exit_code = pytest.main([*pytest_args, f'--benchmark-json={current_path}'])
+        if exit_code:
+            return exit_code
+        if args.save:
+            save(current_path)
+            return 0
+        regressions = compare(BASELINE_PATH, current_path, args.threshold)
+    if regressions:
+        print(f'\nЗамедлились больше чем на {args.threshold}%: {len(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
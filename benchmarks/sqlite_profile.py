@@ -0,0 +1,144 @@
+"""
+Сравнение пропускной способности SQLite с настройками по умолчанию и с производственным
+профилем (SQLITE_PRODUCTION_OPTIONS) при одновременной записи и чтении из нескольких процессов.
+
+Запуск из корня проекта:
+    python benchmarks/sqlite_profile.py --writers 4 --readers 4 --duration 10
+
+Для каждого варианта создается отдельная временная база: процессы-писатели создают
+оплаченные заказы (с выручкой, позициями и индексом блюд, как при создании через сайт),
+процессы-читатели запрашивают страницы списка заказов. Ошибки "database is locked"
+считаются отдельно.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cafe_order_system.settings')
+
+ITEMS = [{"name": "Борщ", "price": 5.00}, {"name": "Чай", "price": 2.00}]
+
+
+def setup_django(db_name, production) -> None:
+    """
+    Направляет соединение на временную базу с нужным профилем до первого обращения к ней.
+    """
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_name
+    settings.DATABASES['default']['OPTIONS'] = settings.SQLITE_PRODUCTION_OPTIONS if production else {}
+    django.setup()
+
+
+def prepare(db_name, production, orders) -> None:
+    setup_django(db_name, production)
+    from django.core.management import call_command
+
+    from orders.models import Order
+    from orders.signals import orders_bulk_created
+
+    call_command('migrate', verbosity=0)
+    created = Order.objects.bulk_create(
+        Order(table_number=number % 20 + 1, items=ITEMS, total_price=7.00, status='paid')
+        for number in range(orders)
+    )
+    orders_bulk_created.send(sender=Order, orders=created)
+
+
+def write(db_name, production, started, deadline, number, results) -> None:
+    setup_django(db_name, production)
+    from django.db import OperationalError, transaction
+
+    from orders.models import Order
+
+    done = locked = 0
+    time.sleep(max(0, started - time.time()))
+    while time.time() < deadline:
+        try:
+            with transaction.atomic():
+                Order.objects.create(table_number=number % 20 + 1, items=ITEMS, total_price=7.00, status='paid')
+            done += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    results.put(('write', done, locked))
+
+
+def read(db_name, production, started, deadline, number, results) -> None:
+    setup_django(db_name, production)
+    from django.db import OperationalError
+
+    from orders.models import Order
+
+    done = locked = 0
+    time.sleep(max(0, started - time.time()))
+    while time.time() < deadline:
+        try:
+            list(Order.objects.filter(table_number=number % 20 + 1).order_by('-id')[:20])
+            Order.objects.filter(status='paid').count()
+            done += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    results.put(('read', done, locked))
+
+
+def run(name, production, args, directory) -> None:
+    context = multiprocessing.get_context('spawn')
+    db_name = os.path.join(directory, f'{name}.sqlite3')
+
+    process = context.Process(target=prepare, args=(db_name, production, args.orders))
+    process.start()
+    process.join()
+    if process.exitcode:
+        sys.exit(process.exitcode)
+
+    results = context.Queue()
+    # Запас на запуск процессов, чтобы все начали одновременно
+    started = time.time() + 3
+    processes = [
+        context.Process(target=target, args=(db_name, production, started, started + args.duration, number, results))
+        for target, count in ((write, args.writers), (read, args.readers))
+        for number in range(count)
+    ]
+    for process in processes:
+        process.start()
+    totals = {'write': [0, 0], 'read': [0, 0]}
+    for _ in processes:
+        kind, done, locked = results.get()
+        totals[kind][0] += done
+        totals[kind][1] += locked
+    for process in processes:
+        process.join()
+
+    print(
+        f'{name:<10} создание {totals["write"][0] / args.duration:8.1f} заказ/с   '
+        f'чтение {totals["read"][0] / args.duration:8.1f} запр/с   '
+        f'"database is locked": {totals["write"][1] + totals["read"][1]}'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=2000, help='Заказов в базе перед замером')
+    parser.add_argument('--writers', type=int, default=4, help='Процессов, создающих заказы')
+    parser.add_argument('--readers', type=int, default=4, help='Процессов, читающих заказы')
+    parser.add_argument('--duration', type=int, default=10, help='Длительность замера (в секундах)')
+    args = parser.parse_args()
+
+    print(f'Заказов: {args.orders}, писателей: {args.writers}, читателей: {args.readers}, секунд: {args.duration}')
+    with tempfile.TemporaryDirectory() as directory:
+        run('default', False, args, directory)
+        run('production', True, args, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+from importlib.util import find_spec
 import os
 from pathlib import Path
 
@@ -28,6 +29,25 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 # Админ, которому приходят уведомления
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 
+# Сводка входов работников: интервал отправки (в секундах) и максимум входов в одном письме
+LOGIN_DIGEST_INTERVAL = int(os.getenv('LOGIN_DIGEST_INTERVAL', 300))
+LOGIN_DIGEST_BATCH_SIZE = int(os.getenv('LOGIN_DIGEST_BATCH_SIZE', 100))
+
+# Количество столов в зале (для подбора свободного стола и схемы зала)
+CAFE_TABLES_COUNT = int(os.getenv('CAFE_TABLES_COUNT', 20))
+
+# Размер страницы списка заказов и его верхняя граница для параметра page_size
+ORDER_LIST_PAGE_SIZE = int(os.getenv('ORDER_LIST_PAGE_SIZE', 20))
+ORDER_LIST_MAX_PAGE_SIZE = 100
+
+# Архивация: оплаченные заказы старше ORDER_ARCHIVE_AFTER_DAYS дней переносятся
+# в архив пачками по ORDER_ARCHIVE_BATCH_SIZE заказов
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 30))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', 500))
+
+# Интервал пинга (в секундах) в потоке событий заказов
+LIVE_EVENTS_HEARTBEAT = 15
+
 # Разрешенные хосты
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split()
 
@@ -45,16 +65,19 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'corsheaders',
     'drf_yasg',
+    'django_celery_beat',
 ]
 
 
 # Настройки middleware
 MIDDLEWARE = [
+    'orders.metrics.MetricsMiddleware',  # Первым, чтобы время ответа включало остальные middleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'orders.auth.WorkerMiddleware',  # request.worker — вошедший работник
     'django.contrib.messages.middleware.MessageMiddleware',  # Один раз
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +117,55 @@ DATABASES = {
     }
 }
 
+# Производственный профиль SQLite для нескольких процессов (gunicorn, Celery):
+# WAL — читатели не ждут писателя, timeout — ожидание блокировки (в секундах)
+# вместо ошибки "database is locked", IMMEDIATE — транзакция сразу берет блокировку
+# записи и не упирается в нее на середине. Прагмы выполняются на каждом новом соединении.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION', 'False') == 'True'
+SQLITE_PRODUCTION_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))};"
+        f"PRAGMA cache_size={-int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))};"
+        'PRAGMA temp_store=MEMORY;'
+    ),
+}
+if SQLITE_PRODUCTION:
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+
+
+# Кэш: Redis, если указан REDIS_CACHE_URL, иначе память процесса
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Сессии читаются из кэша, в БД — только запись и промахи кэша. Кэш памяти процесса
+# не видит выход из сессии в других процессах, поэтому без Redis сессия хранится
+# в подписанной cookie (SECRET_KEY) и ее чтение не обращается ни к кэшу, ни к БД
+if os.getenv('REDIS_CACHE_URL'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+# Время жизни (в секундах) данных работников и токенов в общем кэше (Redis)
+WORKER_AUTH_CACHE_TIMEOUT = 60 * 60
+# То же для кэша памяти процесса: в своем процессе изменение работника и отзыв токена
+# сбрасывают кэш сразу, другие процессы увидят их не позже чем через это время
+WORKER_AUTH_LOCAL_CACHE_TIMEOUT = int(os.getenv('WORKER_AUTH_LOCAL_CACHE_TIMEOUT', 30))
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -138,10 +210,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Пагинация и CORS для REST
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.WorkerTokenAuthentication',
+        'api.authentication.WorkerSessionAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # Количество элементов на странице
+    # JSON через orjson (без него — стандартный json)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack по Accept / Content-Type: application/msgpack, если установлен msgpack
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('api.parsers.MessagePackParser')
+
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",  # Заменить на адрес фронта если на разных портах(нужно для csrf)
@@ -162,4 +255,15 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TIMEZONE = 'Europe/Moscow'  
 
 # Включить обработку периодических задач
-CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
\ No newline at end of file
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-login-digest': {
+        'task': 'orders.tasks.flush_login_digest',
+        'schedule': LOGIN_DIGEST_INTERVAL,
+    },
+    'archive-orders': {
+        'task': 'orders.tasks.archive_orders',
+        'schedule': 60 * 60,
+    },
+}
\ No newline at end of file
@@ -1,19 +1,35 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Order, Worker
+from .models import DishSalesRollup, DishSalesTotal, Order, OrderArchive, Table, Worker
+from .services import OrderService
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'table_number', 'status', 'total_price', 'get_items_count')
+    list_display = ('id', 'table_number', 'status', 'total_price', 'items_count')
     list_filter = ('status','table_number')
-    search_fields = ('table_number', 'status')
-    readonly_fields = ('total_price',)
+    search_fields = ('table_number', 'status', 'order_items__name')
+    readonly_fields = ('total_price', 'items_count')
+    actions = ('mark_ready', 'mark_paid')
 
-    # Метод для отображения количества блюд в заказе
-    def get_items_count(self, obj) -> int:
-        return len(obj.items)
-    get_items_count.short_description = 'Количество блюд'
+    # Массовая смена статуса одним условным UPDATE
+    def transition(self, request, queryset, status) -> None:
+        updated, skipped = OrderService.bulk_transition(queryset, status)
+        self.message_user(request, f"Статус изменен у заказов: {len(updated)}.", messages.SUCCESS)
+        if skipped:
+            self.message_user(
+                request,
+                f"Пропущены заказы (недопустимый переход): {', '.join(map(str, skipped))}.",
+                messages.WARNING
+            )
+
+    @admin.action(description='Отметить как готовые')
+    def mark_ready(self, request, queryset) -> None:
+        self.transition(request, queryset, 'ready')
+
+    @admin.action(description='Отметить как оплаченные')
+    def mark_paid(self, request, queryset) -> None:
+        self.transition(request, queryset, 'paid')
 
     # Группировка полей
     fieldsets = (
@@ -27,6 +43,60 @@ class OrderAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(OrderArchive)
+class OrderArchiveAdmin(admin.ModelAdmin):
+    """
+    Архив заказов только для просмотра: заказы попадают сюда через archive_orders.
+    """
+    list_display = ('id', 'table_number', 'status', 'total_price', 'paid_at', 'archived_at')
+    list_filter = ('table_number',)
+    search_fields = ('id', 'table_number')
+    date_hierarchy = 'paid_at'
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(DishSalesTotal)
+class DishSalesTotalAdmin(admin.ModelAdmin):
+    """
+    Продажи блюд за все время; счетчики ведутся сигналами и пересчитываются rebuild_dish_stats.
+    """
+    list_display = ('name', 'quantity', 'revenue')
+    search_fields = ('name',)
+    ordering = ('-quantity', 'name')
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(DishSalesRollup)
+class DishSalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'table_number', 'name', 'quantity', 'revenue')
+    list_filter = ('table_number',)
+    search_fields = ('name',)
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(Table)
+class TableAdmin(admin.ModelAdmin):
+    list_display = ('number', 'active_order')
+    search_fields = ('number',)
+    raw_id_fields = ('active_order',)
+
+
 @admin.register(Worker)
 class WorkerAdmin(admin.ModelAdmin):
     list_display = ('identifier', 'password')
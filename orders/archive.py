@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, OrderArchive
+from .search import DishSearchService
+
+# Заказы удаляются из рабочей таблицы при переносе в архив (см. archive_batch)
+archiving = ContextVar('archiving', default=False)
+
+
+class OrderArchiveService:
+    """
+    Архивация закрытых заказов и чтение заказов вместе с архивом.
+    Рабочие запросы (список заказов, занятость столов, админка, API) читают только Order;
+    выгрузка, детали заказа и пересчет выручки видят и архив через history, querysets и get_order.
+    """
+    FIELDS = (
+        'id', 'table_number', 'items', 'items_count', 'version', 'total_price',
+        'status', 'created_at', 'updated_at', 'paid_at',
+    )
+
+    @staticmethod
+    def get_cutoff(days=None):
+        """
+        Граница архивации: заказы, оплаченные раньше, переносятся в архив.
+        """
+        return timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS if days is None else days)
+
+    @staticmethod
+    def is_archiving() -> bool:
+        """
+        Идет ли перенос в архив: обработчики post_delete заказа в это время ничего не делают —
+        заказ остается в агрегатах выручки и счетчиках блюд и не уходит с доски как удаленный.
+        """
+        return archiving.get()
+
+    @staticmethod
+    @contextmanager
+    def moving():
+        token = archiving.set(True)
+        try:
+            yield
+        finally:
+            archiving.reset(token)
+
+    @staticmethod
+    def archive_batch(cutoff, batch_size) -> int:
+        """
+        Переносит в архив одну пачку заказов, оплаченных до cutoff, одной транзакцией.
+        Возвращает количество перенесенных заказов.
+        """
+        with transaction.atomic():
+            rows = list(
+                Order.objects
+                .filter(status='paid', paid_at__lt=cutoff)
+                .order_by('paid_at')
+                .values(*OrderArchiveService.FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+            order_ids = [row['id'] for row in rows]
+            OrderArchive.objects.bulk_create([OrderArchive(**row) for row in rows])
+            # Обычное удаление: позиции заказов удаляются каскадом, столы освобождаются (SET_NULL);
+            # обработчики post_delete пропускают перенесенные заказы (is_archiving)
+            with OrderArchiveService.moving():
+                Order.objects.filter(pk__in=order_ids).only('pk').delete()
+            DishSearchService.remove_orders(order_ids)
+        return len(rows)
+
+    @staticmethod
+    def archive(cutoff=None, batch_size=None, stdout=None) -> int:
+        """
+        Переносит в архив все заказы, оплаченные до cutoff, пачками по batch_size,
+        каждая пачка — в своей транзакции. Возвращает количество заказов.
+        """
+        cutoff = cutoff or OrderArchiveService.get_cutoff()
+        batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+        archived = 0
+        while True:
+            moved = OrderArchiveService.archive_batch(cutoff, batch_size)
+            archived += moved
+            if moved and stdout:
+                stdout.write(f"Перенесено в архив заказов: {archived}")
+            if moved < batch_size:
+                return archived
+
+    @staticmethod
+    def querysets(condition=Q()) -> tuple:
+        """
+        Заказы по условию в рабочей таблице и в архиве — для агрегатов по обеим таблицам.
+        """
+        return Order.objects.filter(condition), OrderArchive.objects.filter(condition)
+
+    @staticmethod
+    def history(condition=Q(), fields=FIELDS):
+        """
+        Заказы по условию из рабочей таблицы и архива одним запросом (UNION ALL) в виде словарей.
+        """
+        orders, archived = OrderArchiveService.querysets(condition)
+        return orders.values(*fields).union(archived.values(*fields), all=True)
+
+    @staticmethod
+    def get_order(pk):
+        """
+        Заказ по ID: рабочий (Order) или архивный (OrderArchive); None, если нет ни того, ни другого.
+        """
+        return Order.objects.filter(pk=pk).first() or OrderArchive.objects.filter(pk=pk).first()
@@ -0,0 +1,215 @@
+import secrets
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Worker, WorkerToken
+
+
+class WorkerIdentity:
+    """
+    Аутентифицированный работник. Собирается из кэша, без обращения к БД.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_worker = True
+
+    def __init__(self, id, identifier):
+        self.id = self.pk = id
+        self.identifier = identifier
+
+    def __str__(self) -> str:
+        return f"Worker {self.identifier}"
+
+
+class WorkerAuthService:
+    """
+    Аутентификация работников для HTML-страниц (сессия) и API (токен).
+    Данные работника и токены читаются сначала из кэша, поэтому
+    проверка уже вошедшего работника не обращается к БД.
+    Кэш памяти процесса не сбрасывается в других процессах при отзыве токена
+    или удалении работника, поэтому с ним данные хранятся не дольше
+    WORKER_AUTH_LOCAL_CACHE_TIMEOUT (по умолчанию 30 секунд).
+    """
+    # Кэши, которые видит только текущий процесс
+    LOCAL_CACHE_BACKENDS = (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+    # Больший срок в кэше памяти процесса — предупреждение при запуске (orders.W001)
+    LOCAL_CACHE_MAX_TIMEOUT = 60
+
+    @staticmethod
+    def is_cache_shared() -> bool:
+        return settings.CACHES['default']['BACKEND'] not in WorkerAuthService.LOCAL_CACHE_BACKENDS
+
+    @staticmethod
+    def get_cache_timeout() -> int:
+        """
+        Время жизни данных работников и токенов в кэше; 0 — не кэшировать.
+        """
+        if WorkerAuthService.is_cache_shared():
+            return settings.WORKER_AUTH_CACHE_TIMEOUT
+        return settings.WORKER_AUTH_LOCAL_CACHE_TIMEOUT
+
+    @staticmethod
+    def cache_get(key):
+        return cache.get(key) if WorkerAuthService.get_cache_timeout() else None
+
+    @staticmethod
+    def cache_set(key, value) -> None:
+        timeout = WorkerAuthService.get_cache_timeout()
+        if timeout:
+            cache.set(key, value, timeout)
+
+    @staticmethod
+    def worker_cache_key(worker_id) -> str:
+        return f"worker:{worker_id}"
+
+    @staticmethod
+    def token_cache_key(key) -> str:
+        return f"worker_token:{key}"
+
+    @staticmethod
+    def cache_worker(worker) -> None:
+        WorkerAuthService.cache_set(WorkerAuthService.worker_cache_key(worker.pk), worker.identifier)
+
+    @staticmethod
+    def get_worker(worker_id):
+        """
+        Возвращает WorkerIdentity по ID или None, если работник не найден.
+        """
+        cache_key = WorkerAuthService.worker_cache_key(worker_id)
+        identifier = WorkerAuthService.cache_get(cache_key)
+        if identifier is None:
+            identifier = Worker.objects.filter(pk=worker_id).values_list('identifier', flat=True).first()
+            if identifier is None:
+                return None
+            WorkerAuthService.cache_set(cache_key, identifier)
+        return WorkerIdentity(worker_id, identifier)
+
+    @staticmethod
+    async def aget_worker(worker_id):
+        """
+        То же, что get_worker, через асинхронные API кэша и ORM.
+        """
+        cache_key = WorkerAuthService.worker_cache_key(worker_id)
+        timeout = WorkerAuthService.get_cache_timeout()
+        identifier = await cache.aget(cache_key) if timeout else None
+        if identifier is None:
+            identifier = await Worker.objects.filter(pk=worker_id).values_list('identifier', flat=True).afirst()
+            if identifier is None:
+                return None
+            if timeout:
+                await cache.aset(cache_key, identifier, timeout)
+        return WorkerIdentity(worker_id, identifier)
+
+    @staticmethod
+    def get_session_worker(request):
+        """
+        Работник, вошедший через форму авторизации (ID хранится в сессии).
+        """
+        worker_id = request.session.get('worker_id')
+        if not worker_id:
+            return None
+        return WorkerAuthService.get_worker(worker_id)
+
+    @staticmethod
+    async def aget_session_worker(request):
+        worker_id = await request.session.aget('worker_id')
+        if not worker_id:
+            return None
+        return await WorkerAuthService.aget_worker(worker_id)
+
+    @staticmethod
+    def login(request, worker) -> None:
+        # Новый ключ сессии после входа, чтобы старый ключ нельзя было переиспользовать
+        request.session.cycle_key()
+        request.session['worker_id'] = worker.id
+        request.session['worker_identifier'] = worker.identifier
+        WorkerAuthService.cache_worker(worker)
+
+    @staticmethod
+    def logout(request) -> None:
+        request.session.pop('worker_id', None)
+        request.session.pop('worker_identifier', None)
+
+    @staticmethod
+    def create_token(worker) -> str:
+        token = WorkerToken.objects.create(key=secrets.token_hex(20), worker=worker)
+        WorkerAuthService.cache_worker(worker)
+        WorkerAuthService.cache_set(WorkerAuthService.token_cache_key(token.key), worker.id)
+        return token.key
+
+    @staticmethod
+    def get_token_worker(key):
+        """
+        Возвращает WorkerIdentity по ключу токена или None, если токен не найден.
+        """
+        cache_key = WorkerAuthService.token_cache_key(key)
+        worker_id = WorkerAuthService.cache_get(cache_key)
+        if worker_id is None:
+            worker_id = WorkerToken.objects.filter(key=key).values_list('worker_id', flat=True).first()
+            if worker_id is None:
+                return None
+            WorkerAuthService.cache_set(cache_key, worker_id)
+        return WorkerAuthService.get_worker(worker_id)
+
+    @staticmethod
+    def revoke_token(key) -> None:
+        WorkerToken.objects.filter(key=key).delete()
+        cache.delete(WorkerAuthService.token_cache_key(key))
+
+
+@checks.register(checks.Tags.security)
+def check_worker_auth_cache(app_configs, **kwargs) -> list:
+    """
+    Предупреждает при запуске, что с кэшем памяти процесса данные работников
+    кэшируются дольше LOCAL_CACHE_MAX_TIMEOUT: отзыв токена другие процессы увидят поздно.
+    """
+    if (
+        WorkerAuthService.is_cache_shared()
+        or settings.WORKER_AUTH_LOCAL_CACHE_TIMEOUT <= WorkerAuthService.LOCAL_CACHE_MAX_TIMEOUT
+    ):
+        return []
+    return [checks.Warning(
+        "Данные работников и токены кэшируются в памяти процесса: отозванный токен или удаленный "
+        f"работник действуют в других процессах еще до {settings.WORKER_AUTH_LOCAL_CACHE_TIMEOUT} с.",
+        hint=f"Укажите REDIS_CACHE_URL или WORKER_AUTH_LOCAL_CACHE_TIMEOUT не больше {WorkerAuthService.LOCAL_CACHE_MAX_TIMEOUT}.",
+        id='orders.W001',
+    )]
+
+
+class WorkerMiddleware:
+    """
+    Добавляет в запрос request.worker — вошедшего работника или None — и корутину
+    request.aworker() для асинхронного кода, как AuthenticationMiddleware для request.user.
+    Работник определяется лениво, при первом обращении, поэтому запросы, которым
+    он не нужен, не читают ни сессию, ни данные работника.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.set_worker(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_worker(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def set_worker(request) -> None:
+        request.worker = SimpleLazyObject(lambda: WorkerAuthService.get_session_worker(request))
+        request.aworker = partial(WorkerAuthService.aget_session_worker, request)
@@ -0,0 +1,168 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .archive import OrderArchiveService
+from .expressions import increment_or_create
+from .items import OrderItemService
+from .models import DishSalesRollup, DishSalesTotal, Order
+
+
+class DishStatsService:
+    """
+    Счетчики продаж блюд в оплаченных заказах: по дням и столам (DishSalesRollup)
+    и за все время (DishSalesTotal). Ведутся инкрементально при оплате, изменении
+    и удалении заказа, как агрегаты выручки, поэтому отчеты не читают заказы.
+    """
+
+    @staticmethod
+    def count_dishes(items) -> dict:
+        """
+        Продажи по названиям блюд: {название: (количество, выручка)}.
+        """
+        dishes = defaultdict(lambda: (0, Decimal('0.00')))
+        for (name, price), quantity in OrderItemService.group_items(items).items():
+            total_quantity, total_revenue = dishes[name]
+            dishes[name] = (total_quantity + quantity, total_revenue + price * quantity)
+        return dict(dishes)
+
+    @staticmethod
+    def get_contribution(state):
+        """
+        Вклад заказа в счетчики: (день оплаты, стол, продажи блюд) или None, если заказ не оплачен.
+        """
+        if not state or state['status'] != 'paid' or state['paid_at'] is None:
+            return None
+        day = timezone.localtime(state['paid_at']).date()
+        return day, state['table_number'], DishStatsService.count_dishes(state['items'])
+
+    @staticmethod
+    def apply_delta(day, table_number, dishes, sign=1) -> None:
+        """
+        Добавляет (sign=1) или снимает (sign=-1) продажи блюд в дневных и общих счетчиках.
+        """
+        for name, (quantity, revenue) in dishes.items():
+            if not quantity and not revenue:
+                continue
+            increment_or_create(
+                DishSalesRollup, {'day': day, 'table_number': table_number, 'name': name},
+                quantity=sign * quantity, revenue=sign * revenue
+            )
+            increment_or_create(DishSalesTotal, {'name': name}, quantity=sign * quantity, revenue=sign * revenue)
+
+    @staticmethod
+    def track_order_change(old_state, new_state) -> None:
+        """
+        Переносит изменение заказа в счетчики: при том же дне и столе — только разницу по блюдам.
+        """
+        old = DishStatsService.get_contribution(old_state)
+        new = DishStatsService.get_contribution(new_state)
+        if old == new:
+            return
+        if old and new and old[:2] == new[:2]:
+            changes = {}
+            for name in old[2].keys() | new[2].keys():
+                old_quantity, old_revenue = old[2].get(name, (0, Decimal('0.00')))
+                new_quantity, new_revenue = new[2].get(name, (0, Decimal('0.00')))
+                changes[name] = (new_quantity - old_quantity, new_revenue - old_revenue)
+            DishStatsService.apply_delta(new[0], new[1], changes)
+            return
+        if old:
+            DishStatsService.apply_delta(*old, sign=-1)
+        if new:
+            DishStatsService.apply_delta(*new)
+
+    @staticmethod
+    def add_items(order, items) -> None:
+        """
+        Добавляет в счетчики блюда, дописанные к оплаченному заказу.
+        """
+        if order.status == 'paid' and order.paid_at is not None:
+            day = timezone.localtime(order.paid_at).date()
+            DishStatsService.apply_delta(day, order.table_number, DishStatsService.count_dishes(items))
+
+    @staticmethod
+    def track_bulk_paid(order_ids, paid_at) -> None:
+        """
+        Добавляет в счетчики заказы, массово переведенные в статус "paid".
+        """
+        day = timezone.localtime(paid_at).date()
+        by_table = defaultdict(list)
+        for table_number, items in Order.objects.filter(pk__in=order_ids).values_list('table_number', 'items'):
+            by_table[table_number].extend(items or [])
+        for table_number, items in by_table.items():
+            DishStatsService.apply_delta(day, table_number, DishStatsService.count_dishes(items))
+
+    @staticmethod
+    def get_top(limit=10, date_from=None, date_to=None, table_number=None) -> list:
+        """
+        Самые продаваемые блюда. Без фильтров — из общих счетчиков (чтение по индексу),
+        за период или по столу — из дневных счетчиков (объем зависит от длины периода).
+        """
+        if date_from is None and date_to is None and table_number is None:
+            dishes = DishSalesTotal.objects.filter(quantity__gt=0).values('name', 'quantity', 'revenue')
+        else:
+            condition = Q()
+            if date_from:
+                condition &= Q(day__gte=date_from)
+            if date_to:
+                condition &= Q(day__lte=date_to)
+            if table_number is not None:
+                condition &= Q(table_number=table_number)
+            dishes = (
+                DishSalesRollup.objects
+                .filter(condition)
+                .values('name')
+                .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+                .filter(quantity__gt=0)
+            )
+        return list(dishes.order_by('-quantity', 'name')[:limit])
+
+    @staticmethod
+    def rebuild(batch_size=2000, stdout=None) -> int:
+        """
+        Пересчитывает счетчики с нуля за один проход по оплаченным заказам и архиву,
+        читая их пачками по batch_size. В памяти держатся только счетчики.
+        Возвращает количество учтенных заказов.
+        """
+        rollups = defaultdict(lambda: [0, Decimal('0.00')])
+        totals = defaultdict(lambda: [0, Decimal('0.00')])
+        condition = Q(status='paid', paid_at__isnull=False)
+        fields = ('id', 'status', 'table_number', 'items', 'paid_at')
+        processed = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                OrderArchiveService.history(condition & Q(pk__gt=last_pk), fields).order_by('id')[:batch_size]
+            )
+            if not rows:
+                break
+            for row in rows:
+                day, table_number, dishes = DishStatsService.get_contribution(row)
+                for name, (quantity, revenue) in dishes.items():
+                    for counter in (rollups[(day, table_number, name)], totals[name]):
+                        counter[0] += quantity
+                        counter[1] += revenue
+            last_pk = rows[-1]['id']
+            processed += len(rows)
+            if stdout:
+                stdout.write(f"Обработано заказов: {processed}")
+
+        with transaction.atomic():
+            DishSalesRollup.objects.all().delete()
+            DishSalesTotal.objects.all().delete()
+            DishSalesRollup.objects.bulk_create(
+                [
+                    DishSalesRollup(day=day, table_number=table_number, name=name, quantity=quantity, revenue=revenue)
+                    for (day, table_number, name), (quantity, revenue) in rollups.items()
+                ],
+                batch_size=1000
+            )
+            DishSalesTotal.objects.bulk_create(
+                [DishSalesTotal(name=name, quantity=quantity, revenue=revenue) for name, (quantity, revenue) in totals.items()],
+                batch_size=1000
+            )
+        return processed
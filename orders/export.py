@@ -0,0 +1,80 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .archive import OrderArchiveService
+from .revenue import RevenueService
+
+
+class Echo:
+    """
+    Псевдобуфер для csv.writer: возвращает строку вместо записи.
+    """
+    def write(self, value):
+        return value
+
+
+class OrderExportService:
+    """
+    Потоковая выгрузка заказов (вместе с архивными) в CSV и NDJSON. Заказы читаются
+    пачками по ID, поэтому расход памяти не зависит от размера выгрузки.
+    """
+    FIELDS = ('id', 'table_number', 'status', 'total_price', 'items', 'created_at', 'updated_at', 'paid_at')
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+    }
+
+    @staticmethod
+    def build_filter(status=None, table_number=None, date_from=None, date_to=None) -> Q:
+        """
+        Условие выгрузки по тем же фильтрам, что и OrderViewSet, плюс период создания (даты включительно).
+        """
+        condition = Q()
+        if status:
+            condition &= Q(status=status)
+        if table_number:
+            condition &= Q(table_number=table_number)
+        start, end = RevenueService.period_from_dates(date_from, date_to)
+        if start:
+            condition &= Q(created_at__gte=start)
+        if end:
+            condition &= Q(created_at__lt=end)
+        return condition
+
+    @staticmethod
+    def iter_rows(condition, chunk_size=2000):
+        """
+        Возвращает строки заказов и архива словарями, читая их пачками по chunk_size.
+        """
+        last_pk = 0
+        while True:
+            rows = list(
+                OrderArchiveService.history(condition & Q(pk__gt=last_pk), OrderExportService.FIELDS)
+                .order_by('id')[:chunk_size]
+            )
+            if not rows:
+                return
+            yield from rows
+            last_pk = rows[-1]['id']
+
+    @staticmethod
+    def iter_csv(condition, chunk_size=2000):
+        writer = csv.writer(Echo())
+        yield writer.writerow(OrderExportService.FIELDS)
+        for row in OrderExportService.iter_rows(condition, chunk_size):
+            row['items'] = json.dumps(row['items'], ensure_ascii=False)
+            yield writer.writerow(row[field] if row[field] is not None else '' for field in OrderExportService.FIELDS)
+
+    @staticmethod
+    def iter_ndjson(condition, chunk_size=2000):
+        for row in OrderExportService.iter_rows(condition, chunk_size):
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    @staticmethod
+    def iter_export(condition, export_format, chunk_size=2000):
+        if export_format == 'csv':
+            return OrderExportService.iter_csv(condition, chunk_size)
+        return OrderExportService.iter_ndjson(condition, chunk_size)
@@ -0,0 +1,48 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, NotSupportedError, models, transaction
+from django.db.models import F, Func
+
+
+class JSONArrayAppend(Func):
+    """
+    Добавляет элементы в конец JSON-массива на стороне БД,
+    не читая и не перезаписывая массив целиком.
+    """
+    output_field = models.JSONField()
+
+    def __init__(self, expression, values, **extra):
+        self.values = list(values)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f'JSONArrayAppend не поддерживается для {connection.vendor}.')
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        # Путь '$[#]' — позиция сразу за последним элементом; вставки выполняются по порядку
+        paths = ', '.join("'$[#]', json(%s)" for _ in self.values)
+        values = [json.dumps(value, cls=DjangoJSONEncoder) for value in self.values]
+        return f'json_insert({sql}, {paths})', (*params, *values)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f'({sql} || %s::jsonb)', (*params, json.dumps(self.values, cls=DjangoJSONEncoder))
+
+
+def increment_or_create(model, lookup, **deltas) -> None:
+    """
+    Прибавляет deltas к полям-счетчикам строки model, найденной по lookup, одним UPDATE
+    на стороне БД; если строки нет — создает ее со значениями deltas. Поля lookup
+    должны составлять уникальный ключ: строку, которую успел создать параллельный
+    запрос, обновляет повторный UPDATE.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
@@ -5,12 +5,17 @@ from django.core.exceptions import ValidationError
 from django.db.models import Q
 
 from .models import Order
+from .revenue import RevenueService
+from .search import DishSearchService
 
 
 class OrderForm(forms.ModelForm):
     """
     Форма для создания и редактирования заказа.
     """
+    # Версия заказа на момент открытия формы (для проверки параллельных изменений)
+    version = forms.IntegerField(widget=forms.HiddenInput(), required=False)
+
     class Meta:
         model = Order
         fields = ['table_number', 'status']  # Включаем table_number
@@ -20,6 +25,7 @@ class OrderForm(forms.ModelForm):
         # Скрываем поле table_number при редактировании
         if self.instance.pk:  # Если заказ уже существует (редактирование)
             self.fields['table_number'].widget = forms.HiddenInput()
+            self.fields['version'].initial = self.instance.version
 
     def clean_table_number(self)-> int:
         table_number = self.cleaned_data.get('table_number')
@@ -35,8 +41,26 @@ class OrderSearchForm(forms.Form):
     query = forms.CharField(
         label="Поиск заказов",
         required=False,
-        widget=forms.TextInput(attrs={'placeholder': 'Введите номер стола, ID заказа или статус'})
+        widget=forms.TextInput(attrs={'placeholder': 'Введите номер стола, ID заказа, статус или блюдо'})
+    )
+
+    status = forms.ChoiceField(
+        label="Статус",
+        required=False,
+        choices=[('', 'По умолчанию'), ('open', 'Открытые'), ('all', 'Все')] + Order.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select w-auto ms-2'})
     )
+
+    @staticmethod
+    def filter_status(queryset, status):
+        """
+        Фильтрует заказы по статусу: 'open' — неоплаченные, 'all' — все.
+        """
+        if status == 'open':
+            return queryset.filter(status__in=Order.OPEN_STATUSES)
+        if status and status != 'all':
+            return queryset.filter(status=status)
+        return queryset
     
     def filter_queryset(self, queryset) -> Q:
         query = self.cleaned_data.get('query', '').strip()
@@ -60,12 +84,48 @@ class OrderSearchForm(forms.Form):
             query_lower = query.lower()
             # Преобразуем русский запрос в английский статус
             status = status_mapping.get(query_lower, query_lower)
-            q_objects |= Q(status__iexact=status)  # Поиск по статусу (без учёта регистра)
+            if status not in dict(Order.STATUS_CHOICES):
+                # Не статус — ищем по названиям блюд через полнотекстовый индекс
+                return DishSearchService.filter_orders(queryset, query)
+            q_objects |= Q(status=status)  # Статусы хранятся в нижнем регистре — точное совпадение по индексу
 
         # Фильтруем queryset
         return queryset.filter(q_objects)
     
 
+class RevenueFilterForm(forms.Form):
+    """
+    Форма для выбора периода расчета выручки.
+    """
+    date_from = forms.DateField(
+        label="С",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    date_to = forms.DateField(
+        label="По",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+
+    def clean(self) -> dict:
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError("Дата начала периода не может быть позже даты окончания.")
+        return cleaned_data
+
+    def get_period(self) -> tuple:
+        """
+        Возвращает период [начало, конец) в виде datetime; дата окончания включается целиком.
+        """
+        return RevenueService.period_from_dates(
+            self.cleaned_data.get('date_from'),
+            self.cleaned_data.get('date_to')
+        )
+
+
 class WorkerLoginForm(forms.Form):
     """
     Форма для авторизации сотрудника.
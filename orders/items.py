@@ -0,0 +1,106 @@
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .expressions import increment_or_create
+from .models import Order, OrderItem
+
+
+class OrderItemService:
+    """
+    Синхронизация нормализованных позиций (OrderItem) со списком блюд Order.items
+    и агрегаты по ним.
+    """
+
+    @staticmethod
+    def group_items(items) -> Counter:
+        """
+        Группирует блюда из JSON по (название, цена); некорректные позиции пропускаются.
+        """
+        grouped = Counter()
+        for item in items or []:
+            try:
+                name = str(item['name'])[:255]
+                price = Decimal(str(item['price'])).quantize(Decimal('0.01'))
+            except (KeyError, TypeError, InvalidOperation):
+                continue
+            grouped[(name, price)] += 1
+        return grouped
+
+    @staticmethod
+    def build_rows(order_id, items) -> list:
+        return [
+            OrderItem(order_id=order_id, name=name, price=price, quantity=quantity)
+            for (name, price), quantity in OrderItemService.group_items(items).items()
+        ]
+
+    @staticmethod
+    def sync_order(order, old_items, new_items) -> None:
+        """
+        Пересобирает позиции заказа, если список блюд изменился.
+        """
+        if old_items == new_items:
+            return
+        OrderItem.objects.filter(order=order).delete()
+        OrderItem.objects.bulk_create(OrderItemService.build_rows(order.pk, new_items))
+
+    @staticmethod
+    def add_items(order_id, items) -> None:
+        """
+        Увеличивает количество позиций заказа на добавленные блюда, не пересобирая остальные.
+        """
+        for (name, price), quantity in OrderItemService.group_items(items).items():
+            increment_or_create(OrderItem, {'order_id': order_id, 'name': name, 'price': price}, quantity=quantity)
+
+    @staticmethod
+    def create_for_orders(orders) -> None:
+        """
+        Создает позиции для пакета новых заказов одним bulk_create.
+        """
+        rows = [row for order in orders for row in OrderItemService.build_rows(order.pk, order.items)]
+        OrderItem.objects.bulk_create(rows, batch_size=1000)
+
+    @staticmethod
+    def backfill(batch_size=1000, stdout=None) -> int:
+        """
+        Пересобирает позиции всех заказов пачками по batch_size заказов,
+        каждая пачка — в своей транзакции. Возвращает количество заказов.
+        """
+        processed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Order.objects
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'items')[:batch_size]
+            )
+            if not batch:
+                return processed
+            with transaction.atomic():
+                OrderItem.objects.filter(order_id__in=[pk for pk, _ in batch]).delete()
+                OrderItem.objects.bulk_create(
+                    [row for pk, items in batch for row in OrderItemService.build_rows(pk, items)],
+                    batch_size=1000
+                )
+            last_pk = batch[-1][0]
+            processed += len(batch)
+            if stdout:
+                stdout.write(f"Обработано заказов: {processed}")
+
+    @staticmethod
+    def get_dish_report(orders=None):
+        """
+        Отчет по блюдам: количество и выручка по каждому названию.
+        """
+        items = OrderItem.objects.all()
+        if orders is not None:
+            items = items.filter(order__in=orders)
+        return (
+            items
+            .values('name')
+            .annotate(total_quantity=Sum('quantity'), total_revenue=Sum(F('price') * F('quantity')))
+            .order_by('-total_quantity', 'name')
+        )
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Order
+
+
+class OrderEventBroker:
+    """
+    Рассылка событий заказов подключенным доскам внутри процесса.
+    Каждое подключение — корутина с собственной очередью, поэтому простаивающие
+    подключения не занимают потоков. События публикуются из синхронного кода
+    (сигналы моделей) потокобезопасно через call_soon_threadsafe.
+    """
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, loop=None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers[queue] = loop or asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue) -> None:
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def publish(self, event) -> None:
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for queue, loop in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self.deliver, queue, event)
+
+    @staticmethod
+    def deliver(queue, event) -> None:
+        if queue.full():
+            # Доска не успевает читать события — просим её перечитать список целиком
+            while not queue.empty():
+                queue.get_nowait()
+            event = {'type': 'resync'}
+        queue.put_nowait(event)
+
+    def publish_on_commit(self, event) -> None:
+        """
+        Публикует событие после фиксации транзакции, чтобы доски не увидели откаченные изменения.
+        """
+        transaction.on_commit(lambda: self.publish(event))
+
+
+broker = OrderEventBroker()
+
+
+class OrderEventService:
+    """
+    Построение событий заказов (небольших диффов) и формат server-sent events.
+    """
+    STATUS_DISPLAY = dict(Order.STATUS_CHOICES)
+
+    @staticmethod
+    def build_save_event(order, old_state, new_state):
+        """
+        Событие создания или изменения заказа; None, если видимые поля не изменились.
+        """
+        if old_state is None:
+            return {
+                'type': 'order.created',
+                'id': order.pk,
+                'changes': OrderEventService.with_status_display(new_state),
+            }
+        changes = {field: value for field, value in new_state.items() if old_state.get(field) != value}
+        if not changes:
+            return None
+        return {
+            'type': 'order.status_changed' if 'status' in changes else 'order.updated',
+            'id': order.pk,
+            'changes': OrderEventService.with_status_display(changes),
+        }
+
+    @staticmethod
+    def with_status_display(changes) -> dict:
+        changes = dict(changes)
+        if 'status' in changes:
+            changes['status_display'] = OrderEventService.STATUS_DISPLAY.get(changes['status'], changes['status'])
+        return changes
+
+    @staticmethod
+    def format_sse(event) -> str:
+        data = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return f"event: {event['type']}\ndata: {data}\n\n"
+
+    @staticmethod
+    def is_available(request) -> bool:
+        """
+        Поток событий отдается только под ASGI. Под WSGI Django собирает асинхронный
+        поток в список до отправки ответа: бесконечный поток не отправил бы ни байта
+        и навсегда занял бы поток сервера.
+        """
+        return isinstance(request, ASGIRequest)
+
+    @staticmethod
+    async def stream():
+        """
+        Подписывается на события и отдает их в формате SSE; при простое — комментарий-пинг,
+        чтобы прокси не закрывали соединение.
+        """
+        queue = broker.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield OrderEventService.format_sse(event)
+        finally:
+            broker.unsubscribe(queue)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from orders.archive import OrderArchiveService
+
+
+class Command(BaseCommand):
+    help = "Переносит старые оплаченные заказы в архив (OrderArchive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help="Переносить заказы, оплаченные больше указанного числа дней назад (по умолчанию ORDER_ARCHIVE_AFTER_DAYS)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Количество заказов в одной транзакции (по умолчанию ORDER_ARCHIVE_BATCH_SIZE)"
+        )
+
+    def handle(self, *args, **options):
+        archived = OrderArchiveService.archive(
+            OrderArchiveService.get_cutoff(options['days']),
+            options['batch_size'],
+            stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f"Перенесено в архив заказов: {archived}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.items import OrderItemService
+
+
+class Command(BaseCommand):
+    help = "Заполняет нормализованные позиции заказов (OrderItem) по Order.items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество заказов в одной транзакции"
+        )
+
+    def handle(self, *args, **options):
+        processed = OrderItemService.backfill(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Позиции пересобраны для заказов: {processed}"))
@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from orders.export import OrderExportService
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка заказов в CSV или NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=OrderExportService.FORMATS, default='csv', help="Формат выгрузки")
+        parser.add_argument('--output', help="Файл для выгрузки (по умолчанию — stdout)")
+        parser.add_argument('--status', help="Статус заказов")
+        parser.add_argument('--table-number', type=int, help="Номер стола")
+        parser.add_argument('--date-from', type=date.fromisoformat, help="Дата создания с (YYYY-MM-DD)")
+        parser.add_argument('--date-to', type=date.fromisoformat, help="Дата создания по (YYYY-MM-DD)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Количество заказов в одном запросе")
+
+    def handle(self, *args, **options):
+        condition = OrderExportService.build_filter(
+            status=options['status'],
+            table_number=options['table_number'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+        )
+        chunks = OrderExportService.iter_export(condition, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from orders.search import DishSearchService
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс блюд для поиска заказов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество заказов в одной пачке"
+        )
+
+    def handle(self, *args, **options):
+        if not DishSearchService.is_available():
+            self.stdout.write("Полнотекстовый индекс доступен только для SQLite, поиск идет по позициям заказов")
+            return
+        processed = DishSearchService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Индекс блюд пересобран для заказов: {processed}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.dishes import DishStatsService
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики продаж блюд по оплаченным заказам и архиву"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help="Количество заказов в одной пачке"
+        )
+
+    def handle(self, *args, **options):
+        processed = DishStatsService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Счетчики продаж блюд пересчитаны по заказам: {processed}"))
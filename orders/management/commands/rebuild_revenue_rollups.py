@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.revenue import RevenueService
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает агрегаты выручки по оплаченным заказам"
+
+    def handle(self, *args, **options):
+        created = RevenueService.rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Агрегатов выручки пересчитано: {created}"))
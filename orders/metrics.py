@@ -0,0 +1,164 @@
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Метки — имя маршрута (orders:order_list, order-list, ...), а не путь запроса,
+# чтобы число рядов не росло с количеством заказов
+REQUESTS = Counter('cafe_http_requests', 'Количество запросов', ['view', 'method', 'status'])
+REQUEST_DURATION = Histogram(
+    'cafe_http_request_duration_seconds', 'Время обработки запроса', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'cafe_http_request_db_queries', 'Количество SQL-запросов за запрос', ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_DURATION = Histogram(
+    'cafe_http_request_db_duration_seconds', 'Время SQL-запросов за запрос', ['view'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    'cafe_http_response_size_bytes', 'Размер тела ответа (без потоковых ответов)', ['view'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+TASK_DURATION = Histogram(
+    'cafe_celery_task_duration_seconds', 'Время выполнения задачи Celery', ['task', 'state'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+# Счетчик SQL-запросов текущего HTTP-запроса. Контекст переходит в потоки sync_to_async,
+# поэтому запросы асинхронных представлений тоже попадают в счетчик
+current_queries = ContextVar('current_queries', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL на каждом соединении (ставится при его открытии):
+    передает запрос счетчику текущего HTTP-запроса, если он есть.
+    """
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+class QueryCounter:
+    """
+    Счетчик SQL-запросов и их времени за один HTTP-запрос (см. count_queries).
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsService:
+    """
+    Метрики запросов и задач Celery в формате Prometheus.
+    """
+    _task_started = {}
+
+    @staticmethod
+    def get_view_name(request) -> str:
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unresolved'
+
+    @staticmethod
+    def install_query_counter(connection) -> None:
+        """
+        Подключает count_queries к соединению с БД в любом потоке, в том числе
+        в потоках sync_to_async, где выполняется асинхронный ORM.
+        """
+        if count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_queries)
+
+    @staticmethod
+    def observe_request(request, response, duration, queries) -> None:
+        view = MetricsService.get_view_name(request)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(view, request.method).observe(duration)
+        REQUEST_QUERIES.labels(view).observe(queries.count)
+        REQUEST_DB_DURATION.labels(view).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+
+    @staticmethod
+    def task_started(task_id) -> None:
+        MetricsService._task_started[task_id] = time.perf_counter()
+
+    @staticmethod
+    def task_finished(task_id, task_name, state) -> None:
+        started = MetricsService._task_started.pop(task_id, None)
+        if started is not None:
+            TASK_DURATION.labels(task_name, state or 'UNKNOWN').observe(time.perf_counter() - started)
+
+    @staticmethod
+    def render() -> tuple:
+        """
+        Текст метрик и его content type. Если задан PROMETHEUS_MULTIPROC_DIR, метрики
+        собираются со всех процессов (воркеры gunicorn, воркер Celery) на этой машине.
+        """
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Записывает время ответа, количество и время SQL-запросов и размер ответа
+    по имени маршрута. Работает и в синхронном, и в асинхронном стеке.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        MetricsService.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        MetricsService.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
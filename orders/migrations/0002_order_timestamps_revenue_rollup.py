@@ -0,0 +1,71 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+
+def backfill_paid_orders(apps, schema_editor):
+    """
+    Проставляет дату оплаты существующим оплаченным заказам и строит агрегаты выручки.
+    Точный момент оплаты старых заказов неизвестен, ближайшая оценка — дата последнего изменения.
+    """
+    Order = apps.get_model('orders', 'Order')
+    RevenueRollup = apps.get_model('orders', 'RevenueRollup')
+
+    Order.objects.filter(status='paid', paid_at__isnull=True).update(paid_at=F('updated_at'))
+
+    rollups = []
+    for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+        rows = (
+            Order.objects
+            .filter(status='paid')
+            .annotate(period_start=trunc('paid_at'))
+            .values('period_start', 'table_number')
+            .annotate(revenue=Sum('total_price'), orders_count=Count('id'))
+            .order_by()
+        )
+        rollups.extend(RevenueRollup(granularity=granularity, **row) for row in rows)
+    RevenueRollup.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата создания'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата оплаты'),
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Час'), ('day', 'День')], max_length=4, verbose_name='Период агрегации')),
+                ('period_start', models.DateTimeField(verbose_name='Начало периода')),
+                ('table_number', models.IntegerField(verbose_name='Номер стола')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='Количество оплаченных заказов')),
+            ],
+            options={
+                'verbose_name': 'Агрегат выручки',
+                'verbose_name_plural': 'Агрегаты выручки',
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'period_start', 'table_number'), name='unique_revenue_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_paid_orders, migrations.RunPython.noop),
+    ]
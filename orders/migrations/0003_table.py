@@ -0,0 +1,49 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tables(apps, schema_editor):
+    """
+    Создает столы по существующим заказам; текущим заказом стола становится самый поздний.
+    """
+    Order = apps.get_model('orders', 'Order')
+    Table = apps.get_model('orders', 'Table')
+
+    active_orders = {}
+    for order_id, table_number in (
+        Order.objects
+        .filter(status__in=['waiting', 'ready', 'paid'])
+        .order_by('id')
+        .values_list('id', 'table_number')
+        .iterator()
+    ):
+        active_orders[table_number] = order_id
+
+    Table.objects.bulk_create(
+        [Table(number=number, active_order_id=order_id) for number, order_id in active_orders.items()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_timestamps_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.IntegerField(unique=True, validators=[django.core.validators.MinValueValidator(limit_value=1, message='Номер стола должен быть больше или равен 1')], verbose_name='Номер стола')),
+                ('active_order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occupied_table', to='orders.order', verbose_name='Текущий заказ')),
+            ],
+            options={
+                'verbose_name': 'Стол',
+                'verbose_name_plural': 'Столы',
+            },
+        ),
+        migrations.RunPython(backfill_tables, migrations.RunPython.noop),
+    ]
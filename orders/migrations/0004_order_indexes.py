@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def canonicalize_statuses(apps, schema_editor):
+    """
+    Приводит статусы существующих заказов к каноническому виду (без пробелов, в нижнем регистре).
+    """
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.update(status=Lower(Trim('status')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_statuses, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'id'], name='order_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('paid_at__isnull', False)), fields=['paid_at'], name='order_paid_at_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+def fill_items_count(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    batch = []
+    for order in Order.objects.only('id', 'items').iterator(chunk_size=1000):
+        order.items_count = len(order.items) if isinstance(order.items, list) else 0
+        batch.append(order)
+        if len(batch) == 1000:
+            Order.objects.bulk_update(batch, ['items_count'])
+            batch = []
+    Order.objects.bulk_update(batch, ['items_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_orderitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество блюд'),
+        ),
+        migrations.RunPython(fill_items_count, migrations.RunPython.noop),
+    ]
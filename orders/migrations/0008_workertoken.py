@@ -0,0 +1,24 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='orders.worker', verbose_name='Работник')),
+            ],
+            options={
+                'verbose_name': 'Токен работника',
+                'verbose_name_plural': 'Токены работников',
+            },
+        ),
+    ]
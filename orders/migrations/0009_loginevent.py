@@ -0,0 +1,25 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_workertoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker_identifier', models.CharField(max_length=8, verbose_name='Идентификатор работника')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP-адрес')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время входа')),
+            ],
+            options={
+                'verbose_name': 'Вход работника',
+                'verbose_name_plural': 'Входы работников',
+            },
+        ),
+    ]
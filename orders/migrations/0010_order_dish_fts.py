@@ -0,0 +1,43 @@
+from django.db import migrations
+
+TABLE = 'orders_order_dish_fts'
+
+
+def get_document(items):
+    names = dict.fromkeys(str(item.get('name', '')) for item in items or [] if isinstance(item, dict))
+    return '\n'.join(name for name in names if name)
+
+
+def create_dish_index(apps, schema_editor):
+    """
+    Индекс FTS5 по названиям блюд (только для SQLite) и его первичное заполнение.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Order = apps.get_model('orders', 'Order')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {TABLE} USING fts5(names, tokenize='unicode61 remove_diacritics 2')"
+    )
+    batch = []
+    for pk, items in Order.objects.order_by('pk').values_list('pk', 'items').iterator(chunk_size=1000):
+        document = get_document(items)
+        if document:
+            batch.append((pk, document))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {TABLE} (rowid, names) VALUES (%s, %s)', batch)
+
+
+def drop_dish_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_loginevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_dish_index, drop_dish_index),
+    ]
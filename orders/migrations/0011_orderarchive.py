@@ -0,0 +1,33 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_dish_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('table_number', models.IntegerField(verbose_name='Номер стола')),
+                ('items', models.JSONField(default=list, verbose_name='Список блюд с ценами')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='Количество блюд')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая стоимость заказа')),
+                ('status', models.CharField(choices=[('waiting', 'В ожидании'), ('ready', 'Готов'), ('paid', 'Оплачено')], max_length=10, verbose_name='Статус заказа')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата изменения')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата оплаты')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+                'indexes': [models.Index(fields=['paid_at'], name='order_archive_paid_at_idx'), models.Index(fields=['created_at'], name='order_archive_created_at_idx'), models.Index(fields=['table_number', 'status'], name='order_archive_table_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_dish_sales(apps, schema_editor):
+    """
+    Строит счетчики продаж блюд по оплаченным заказам и архиву заказов.
+    """
+    DishSalesRollup = apps.get_model('orders', 'DishSalesRollup')
+    DishSalesTotal = apps.get_model('orders', 'DishSalesTotal')
+
+    rollups = defaultdict(lambda: [0, Decimal('0.00')])
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    for model_name in ('Order', 'OrderArchive'):
+        orders = (
+            apps.get_model('orders', model_name).objects
+            .filter(status='paid', paid_at__isnull=False)
+            .values_list('table_number', 'items', 'paid_at')
+        )
+        for table_number, items, paid_at in orders.iterator(chunk_size=2000):
+            day = timezone.localtime(paid_at).date()
+            for item in items or []:
+                try:
+                    name = str(item['name'])[:255]
+                    price = Decimal(str(item['price'])).quantize(Decimal('0.01'))
+                except (KeyError, TypeError, InvalidOperation):
+                    continue
+                for counter in (rollups[(day, table_number, name)], totals[name]):
+                    counter[0] += 1
+                    counter[1] += price
+
+    DishSalesRollup.objects.bulk_create(
+        [
+            DishSalesRollup(day=day, table_number=table_number, name=name, quantity=quantity, revenue=revenue)
+            for (day, table_number, name), (quantity, revenue) in rollups.items()
+        ],
+        batch_size=1000
+    )
+    DishSalesTotal.objects.bulk_create(
+        [DishSalesTotal(name=name, quantity=quantity, revenue=revenue) for name, (quantity, revenue) in totals.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_orderarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('table_number', models.IntegerField(verbose_name='Номер стола')),
+                ('name', models.CharField(max_length=255, verbose_name='Название блюда')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Продано, шт.')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Продажи блюда за день',
+                'verbose_name_plural': 'Продажи блюд по дням',
+                'constraints': [models.UniqueConstraint(fields=('day', 'table_number', 'name'), name='unique_dish_sales_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DishSalesTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Название блюда')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Продано, шт.')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Продажи блюда',
+                'verbose_name_plural': 'Продажи блюд за все время',
+                'indexes': [models.Index(fields=['-quantity', 'name'], name='dish_sales_total_top_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_dish_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_dish_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loginevent',
+            name='claim',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True, verbose_name='Метка отправки'),
+        ),
+        migrations.AddField(
+            model_name='loginevent',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взят в отправку'),
+        ),
+    ]
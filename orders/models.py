@@ -1,6 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+
+class OrderConflictError(ValueError):
+    """
+    Заказ изменили после того, как его прочитали: сохранение отменено.
+    Наследуется от ValueError, поэтому в HTML-формах выводится как обычная ошибка сервиса.
+    """
+    def __init__(self, message='Заказ был изменен другим пользователем. Обновите страницу и повторите.'):
+        super().__init__(message)
 
 
 class Order(models.Model):
@@ -10,6 +20,19 @@ class Order(models.Model):
         ('paid', 'Оплачено') 
     ]
 
+    # Статусы, в которых заказ занимает стол
+    OCCUPYING_STATUSES = ('waiting', 'ready', 'paid')
+
+    # Открытые (ещё не оплаченные) заказы
+    OPEN_STATUSES = ('waiting', 'ready')
+
+    # Допустимые переходы статусов при массовой смене статуса
+    ALLOWED_TRANSITIONS = {
+        'waiting': ('ready', 'paid'),
+        'ready': ('paid',),
+        'paid': (),
+    }
+
     table_number = models.IntegerField(
         verbose_name="Номер стола",
         validators=[
@@ -21,6 +44,11 @@ class Order(models.Model):
     )
 
     items = models.JSONField(verbose_name="Список блюд с ценами", default=list)
+
+    items_count = models.PositiveIntegerField(verbose_name="Количество блюд", default=0, editable=False)
+
+    # Версия строки для оптимистичных блокировок: растет при каждом изменении заказа
+    version = models.PositiveIntegerField(verbose_name="Версия", default=1, editable=False)
     
     total_price = models.DecimalField(
         verbose_name="Общая стоимость заказа",
@@ -37,16 +65,354 @@ class Order(models.Model):
         default='waiting'
     )
 
+    created_at = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
+
+    updated_at = models.DateTimeField(verbose_name="Дата изменения", auto_now=True)
+
+    paid_at = models.DateTimeField(
+        verbose_name="Дата оплаты",
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    # Поля, изменения которых отслеживают инкрементальные агрегаты (выручка и т.д.)
+    TRACKED_FIELDS = ('table_number', 'status', 'total_price', 'paid_at', 'items')
+
+    # Поля, исходные значения которых запоминаются при загрузке заказа. Копировать список
+    # блюд при каждом чтении дорого, поэтому его исходное значение читается из БД
+    # только при сохранении, которое перезаписывает список блюд
+    SNAPSHOT_FIELDS = ('table_number', 'status', 'total_price', 'paid_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._original_state = None  # Состояние заказа в БД до сохранения
+        self._saved_state = None  # Состояние заказа в БД после сохранения
+        self._expected_version = None  # Версия, с которой заказ был прочитан (при обновлении)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем исходное состояние, только если все поля снимка загружены
+        if all(field in field_names for field in cls.SNAPSHOT_FIELDS):
+            instance._original_state = instance.get_tracked_state(cls.SNAPSHOT_FIELDS)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or all(field in fields for field in self.SNAPSHOT_FIELDS):
+            self._original_state = self.get_tracked_state(self.SNAPSHOT_FIELDS)
+
+    def get_tracked_state(self, fields=None) -> dict:
+        """
+        Возвращает значения отслеживаемых полей заказа (по умолчанию всех TRACKED_FIELDS).
+        """
+        return {field: getattr(self, field) for field in fields or self.TRACKED_FIELDS}
+
+    def get_stored_state(self) -> dict:
+        """
+        Состояние заказа в БД по снимку; список блюд — текущий (например, для удаляемого заказа).
+        """
+        return {**self.get_tracked_state(), **(self._original_state or {})}
+
+    def get_original_items(self, update_fields=None):
+        """
+        Список блюд в БД до сохранения. Если сохранение не перезаписывает список блюд,
+        он не читается: в БД остается тот же список, что загружен в заказ.
+        """
+        if update_fields is not None and 'items' not in update_fields:
+            return self.items
+        return Order.objects.filter(pk=self.pk).values_list('items', flat=True).first()
+
+    def get_state_change(self) -> tuple:
+        """
+        Возвращает пару (состояние до сохранения, состояние после сохранения).
+        """
+        return self._original_state, self._saved_state
+
     def save(self, *args, **kwargs):
+        # Статус хранится в каноническом виде, чтобы поиск по нему шел точным совпадением по индексу
+        if isinstance(self.status, str):
+            self.status = self.status.strip().lower()
         self.full_clean()
-        super().save(*args, **kwargs)
-        
+
+        # Фиксируем момент оплаты при переходе в статус "paid" и сбрасываем при выходе из него
+        if self.status == 'paid' and self.paid_at is None:
+            self.paid_at = timezone.now()
+        elif self.status != 'paid':
+            self.paid_at = None
+
+        if isinstance(self.items, list):
+            self.items_count = len(self.items)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'status' in update_fields:
+                update_fields.add('paid_at')
+            if 'items' in update_fields:
+                update_fields.add('items_count')
+            update_fields.update(('updated_at', 'version'))
+            kwargs['update_fields'] = update_fields
+
+        if not self._state.adding:
+            if self._original_state is None:
+                self._original_state = Order.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first()
+            elif 'items' not in self._original_state:
+                self._original_state['items'] = self.get_original_items(update_fields)
+
+        self._saved_state = self.get_tracked_state()
+        if update_fields is not None and self._original_state is not None:
+            # При частичном сохранении в БД попадают только перечисленные поля
+            self._saved_state = {
+                field: self._saved_state[field] if field in update_fields else value
+                for field, value in self._original_state.items()
+            }
+
+        # UPDATE выполняется условием по версии, с которой заказ был прочитан (см. _do_update)
+        if not self._state.adding:
+            self._expected_version = self.version
+            self.version += 1
+
+        # Заказ и зависящие от него агрегаты сохраняются в одной транзакции
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except Exception:
+            if self._expected_version is not None:
+                self.version = self._expected_version
+            raise
+        finally:
+            self._expected_version = None
+        # Список блюд могут изменить на месте (extend), поэтому в снимок он не попадает
+        self._original_state = {field: self._saved_state[field] for field in self.SNAPSHOT_FIELDS}
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        UPDATE ... WHERE id = ? AND version = ?: если заказ успели изменить,
+        строка не обновится и сохранение завершится OrderConflictError.
+        """
+        if self._expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        updated = super()._do_update(
+            base_qs.filter(version=self._expected_version), using, pk_val, values, update_fields, forced_update
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise OrderConflictError()
+        return updated
+
     def __str__(self) -> str:
         return f"Order {self.id} - Table {self.table_number}"
     
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        indexes = [
+            # Фильтры по статусу с сортировкой по ID (список заказов, API, админка, поиск)
+            models.Index(fields=['status', 'id'], name='order_status_id_idx'),
+            # Фильтры по столу и по столу со статусом
+            models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+            # Выручка и архивация по дате оплаты: дата заполнена только у оплаченных заказов
+            models.Index(fields=['paid_at'], condition=models.Q(paid_at__isnull=False), name='order_paid_at_idx'),
+        ]
+
+
+class OrderArchive(models.Model):
+    """
+    Архив закрытых заказов. Старые оплаченные заказы переносятся сюда из Order
+    (см. OrderArchiveService), чтобы рабочие запросы читали только живые заказы.
+    ID заказа сохраняется. Агрегаты выручки при переносе не меняются.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID заказа")
+
+    table_number = models.IntegerField(verbose_name="Номер стола")
+
+    items = models.JSONField(verbose_name="Список блюд с ценами", default=list)
+
+    items_count = models.PositiveIntegerField(verbose_name="Количество блюд", default=0)
+
+    version = models.PositiveIntegerField(verbose_name="Версия", default=1)
+
+    total_price = models.DecimalField(verbose_name="Общая стоимость заказа", max_digits=10, decimal_places=2)
+
+    status = models.CharField(verbose_name="Статус заказа", max_length=10, choices=Order.STATUS_CHOICES)
+
+    created_at = models.DateTimeField(verbose_name="Дата создания")
+
+    updated_at = models.DateTimeField(verbose_name="Дата изменения")
+
+    paid_at = models.DateTimeField(verbose_name="Дата оплаты", null=True, blank=True)
+
+    archived_at = models.DateTimeField(verbose_name="Дата архивации", default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"Archived order {self.id} - Table {self.table_number}"
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архив заказов"
+        indexes = [
+            models.Index(fields=['paid_at'], name='order_archive_paid_at_idx'),
+            models.Index(fields=['created_at'], name='order_archive_created_at_idx'),
+            models.Index(fields=['table_number', 'status'], name='order_archive_table_idx'),
+        ]
+
+
+class OrderItem(models.Model):
+    """
+    Позиция заказа в нормализованном виде. Синхронизируется с Order.items
+    при сохранении заказа, чтобы итоги и отчеты по блюдам считались SQL-агрегатами.
+    Одинаковые блюда с одной ценой хранятся одной строкой с количеством.
+    """
+    order = models.ForeignKey(
+        Order,
+        verbose_name="Заказ",
+        on_delete=models.CASCADE,
+        related_name='order_items'
+    )
+
+    name = models.CharField(verbose_name="Название блюда", max_length=255)
+
+    price = models.DecimalField(verbose_name="Цена", max_digits=10, decimal_places=2)
+
+    quantity = models.PositiveIntegerField(verbose_name="Количество", default=1)
+
+    def __str__(self) -> str:
+        return f"{self.name} x{self.quantity} - Order {self.order_id}"
+
+    class Meta:
+        verbose_name = "Позиция заказа"
+        verbose_name_plural = "Позиции заказов"
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'name', 'price'], name='unique_order_item'),
+        ]
+        indexes = [
+            models.Index(fields=['name'], name='order_item_name_idx'),
+        ]
+
+
+class Table(models.Model):
+    """
+    Стол кафе. Текущий заказ стола хранится в active_order: уникальность
+    связи гарантирует, что заказ занимает не больше одного стола,
+    а стол занимается условным UPDATE только если он свободен.
+    """
+    number = models.IntegerField(
+        verbose_name="Номер стола",
+        unique=True,
+        validators=[
+            MinValueValidator(
+                limit_value=1,
+                message="Номер стола должен быть больше или равен 1"
+            )
+        ]
+    )
+
+    active_order = models.OneToOneField(
+        Order,
+        verbose_name="Текущий заказ",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='occupied_table'
+    )
+
+    def __str__(self) -> str:
+        return f"Table {self.number}"
+
+    class Meta:
+        verbose_name = "Стол"
+        verbose_name_plural = "Столы"
+
+
+class RevenueRollup(models.Model):
+    """
+    Выручка оплаченных заказов, агрегированная по часу или дню и по столу.
+    Обновляется инкрементально при переходе заказа в статус "paid" и из него.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Час'),
+        ('day', 'День'),
+    ]
+
+    granularity = models.CharField(
+        verbose_name="Период агрегации",
+        max_length=4,
+        choices=GRANULARITY_CHOICES
+    )
+
+    period_start = models.DateTimeField(verbose_name="Начало периода")
+
+    table_number = models.IntegerField(verbose_name="Номер стола")
+
+    revenue = models.DecimalField(
+        verbose_name="Выручка",
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+
+    orders_count = models.IntegerField(verbose_name="Количество оплаченных заказов", default=0)
+
+    def __str__(self) -> str:
+        return f"Revenue {self.granularity} {self.period_start} - Table {self.table_number}"
+
+    class Meta:
+        verbose_name = "Агрегат выручки"
+        verbose_name_plural = "Агрегаты выручки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'period_start', 'table_number'],
+                name='unique_revenue_rollup_bucket'
+            ),
+        ]
+
+
+class DishSalesRollup(models.Model):
+    """
+    Продажи блюда в оплаченных заказах за день (по дате оплаты) за столом.
+    Обновляется инкрементально, как агрегаты выручки (см. DishStatsService).
+    """
+    day = models.DateField(verbose_name="День")
+
+    table_number = models.IntegerField(verbose_name="Номер стола")
+
+    name = models.CharField(verbose_name="Название блюда", max_length=255)
+
+    quantity = models.IntegerField(verbose_name="Продано, шт.", default=0)
+
+    revenue = models.DecimalField(verbose_name="Выручка", max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name} {self.day} - Table {self.table_number}"
+
+    class Meta:
+        verbose_name = "Продажи блюда за день"
+        verbose_name_plural = "Продажи блюд по дням"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'table_number', 'name'], name='unique_dish_sales_rollup'),
+        ]
+
+
+class DishSalesTotal(models.Model):
+    """
+    Продажи блюда за все время: топ блюд читается по индексу без агрегации.
+    """
+    name = models.CharField(verbose_name="Название блюда", max_length=255, unique=True)
+
+    quantity = models.IntegerField(verbose_name="Продано, шт.", default=0)
+
+    revenue = models.DecimalField(verbose_name="Выручка", max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.quantity}"
+
+    class Meta:
+        verbose_name = "Продажи блюда"
+        verbose_name_plural = "Продажи блюд за все время"
+        indexes = [
+            models.Index(fields=['-quantity', 'name'], name='dish_sales_total_top_idx'),
+        ]
 
 
 class Worker(models.Model):
@@ -79,3 +445,49 @@ class Worker(models.Model):
     class Meta:
         verbose_name = "Работник"
         verbose_name_plural = "Работники"
+
+
+class WorkerToken(models.Model):
+    """
+    Токен работника для API. Проверяется через кэш (см. orders.auth.WorkerAuthService).
+    """
+    key = models.CharField(verbose_name="Ключ", max_length=40, primary_key=True)
+
+    worker = models.ForeignKey(
+        Worker,
+        verbose_name="Работник",
+        on_delete=models.CASCADE,
+        related_name='tokens'
+    )
+
+    created_at = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Token {self.worker}"
+
+    class Meta:
+        verbose_name = "Токен работника"
+        verbose_name_plural = "Токены работников"
+
+
+class LoginEvent(models.Model):
+    """
+    Вход работника, ожидающий отправки в сводном письме администратору.
+    """
+    worker_identifier = models.CharField(verbose_name="Идентификатор работника", max_length=8)
+
+    ip_address = models.GenericIPAddressField(verbose_name="IP-адрес", null=True, blank=True)
+
+    created_at = models.DateTimeField(verbose_name="Время входа", default=timezone.now)
+
+    # Запуск рассылки, который забрал вход в письмо (см. LoginDigestService.claim_batch)
+    claim = models.CharField(verbose_name="Метка отправки", max_length=32, null=True, blank=True, db_index=True)
+
+    claimed_at = models.DateTimeField(verbose_name="Взят в отправку", null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Login {self.worker_identifier} at {self.created_at}"
+
+    class Meta:
+        verbose_name = "Вход работника"
+        verbose_name_plural = "Входы работников"
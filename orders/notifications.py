@@ -0,0 +1,87 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LoginEvent
+
+
+class LoginDigestService:
+    """
+    Сводные письма о входах работников. Вход только записывается в очередь (LoginEvent),
+    а периодическая задача отправляет накопленные входы пачками через одно соединение с почтой.
+    Пачку забирает условный UPDATE в БД, поэтому параллельные запуски (несколько воркеров
+    Celery) не отправляют один вход дважды, а письмо уходит уже вне транзакции.
+    """
+    # Через сколько забранные, но не удаленные входы (упавший воркер) снова идут в отправку
+    CLAIM_TIMEOUT = timedelta(minutes=10)
+
+    @staticmethod
+    def record(worker_identifier, ip_address=None) -> LoginEvent:
+        return LoginEvent.objects.create(worker_identifier=worker_identifier, ip_address=ip_address)
+
+    @staticmethod
+    def build_message(events, connection) -> EmailMessage:
+        lines = [
+            f"{timezone.localtime(event.created_at).strftime('%d.%m.%Y %H:%M:%S')} — "
+            f"сотрудник {event.worker_identifier}, IP-адрес: {event.ip_address or 'неизвестен'}"
+            for event in events
+        ]
+        return EmailMessage(
+            subject=f"Входы работников: {len(events)}",
+            body="\n".join(lines) + "\n\nСистема: Управление кафе",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[settings.ADMIN_EMAIL],
+            connection=connection,
+        )
+
+    @staticmethod
+    def claim_batch(batch_size) -> tuple:
+        """
+        Забирает до batch_size входов из очереди одной короткой транзакцией.
+        Входы, уже забранные другим запуском, пропускаются условием в UPDATE.
+        Возвращает (метка запуска, входы).
+        """
+        now = timezone.now()
+        available = Q(claim__isnull=True) | Q(claimed_at__lt=now - LoginDigestService.CLAIM_TIMEOUT)
+        claim = uuid4().hex
+        with transaction.atomic():
+            pks = list(LoginEvent.objects.filter(available).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return claim, []
+            LoginEvent.objects.filter(available, pk__in=pks).update(claim=claim, claimed_at=now)
+        return claim, list(LoginEvent.objects.filter(claim=claim).order_by('pk'))
+
+    @staticmethod
+    def flush(batch_size=None) -> int:
+        """
+        Отправляет накопленные входы письмами по batch_size входов и удаляет отправленные.
+        Если письмо не ушло, его входы возвращаются в очередь до следующего запуска.
+        Возвращает количество отправленных входов.
+        """
+        batch_size = batch_size or settings.LOGIN_DIGEST_BATCH_SIZE
+        sent = 0
+        connection = None
+        try:
+            while True:
+                claim, events = LoginDigestService.claim_batch(batch_size)
+                if not events:
+                    break
+                try:
+                    if connection is None:
+                        connection = get_connection()
+                        connection.open()
+                    LoginDigestService.build_message(events, connection).send()
+                except Exception:
+                    LoginEvent.objects.filter(claim=claim).update(claim=None, claimed_at=None)
+                    raise
+                LoginEvent.objects.filter(claim=claim).delete()
+                sent += len(events)
+        finally:
+            if connection is not None:
+                connection.close()
+        return sent
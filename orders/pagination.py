@@ -0,0 +1,75 @@
+from django.conf import settings
+
+
+class KeysetPage:
+    """
+    Страница заказов, выбранная по ключу.
+    """
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        # Курсоры — ID крайних заказов страницы
+        self.next_cursor = object_list[-1].pk if has_next else None
+        self.previous_cursor = object_list[0].pk if has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу (seek pagination): страница выбирается условием
+    по ID вместо OFFSET, поэтому её стоимость не зависит от глубины.
+    Заказы идут от новых к старым.
+    """
+    def __init__(self, page_size=None):
+        self.page_size = page_size or settings.ORDER_LIST_PAGE_SIZE
+
+    @staticmethod
+    def get_page_size(request) -> int:
+        """
+        Размер страницы из параметра page_size, ограниченный ORDER_LIST_MAX_PAGE_SIZE.
+        """
+        try:
+            page_size = int(request.GET.get('page_size', settings.ORDER_LIST_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.ORDER_LIST_PAGE_SIZE
+        return max(1, min(page_size, settings.ORDER_LIST_MAX_PAGE_SIZE))
+
+    @staticmethod
+    def get_cursor(request, name):
+        value = request.GET.get(name, '')
+        return int(value) if value.isdigit() else None
+
+    def paginate(self, queryset, after=None, before=None) -> KeysetPage:
+        """
+        Возвращает страницу после заказа after или перед заказом before.
+        """
+        if before is not None:
+            # Предыдущая страница: идем по возрастанию ID и разворачиваем результат
+            rows = list(queryset.filter(pk__gt=before).order_by('pk')[:self.page_size + 1])
+            has_previous = len(rows) > self.page_size
+            object_list = rows[:self.page_size][::-1]
+            has_next = True
+        else:
+            if after is not None:
+                queryset = queryset.filter(pk__lt=after)
+            rows = list(queryset.order_by('-pk')[:self.page_size + 1])
+            has_next = len(rows) > self.page_size
+            object_list = rows[:self.page_size]
+            has_previous = after is not None
+
+        if not object_list:
+            return KeysetPage([], False, False)
+        return KeysetPage(object_list, has_next, has_previous)
+
+    def paginate_request(self, request, queryset) -> KeysetPage:
+        return self.paginate(
+            queryset,
+            after=self.get_cursor(request, 'after'),
+            before=self.get_cursor(request, 'before')
+        )
@@ -0,0 +1,197 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .archive import OrderArchiveService
+from .expressions import increment_or_create
+from .models import RevenueRollup
+
+
+class RevenueService:
+    """
+    Расчет выручки по агрегатам RevenueRollup.
+    Агрегаты ведутся по часам и по дням в разрезе столов, поэтому стоимость
+    запроса зависит от длины периода, а не от количества заказов.
+    """
+
+    @staticmethod
+    def hour_start(moment) -> datetime:
+        """
+        Начало часа (в локальной таймзоне), в который попадает момент.
+        """
+        return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def day_start(moment) -> datetime:
+        """
+        Начало суток (в локальной таймзоне), в которые попадает момент.
+        """
+        local_date = timezone.localtime(moment).date()
+        return timezone.make_aware(datetime.combine(local_date, time.min))
+
+    @staticmethod
+    def next_day_start(moment) -> datetime:
+        """
+        Начало следующих суток после суток, в которые попадает момент.
+        """
+        local_date = timezone.localtime(moment).date() + timedelta(days=1)
+        return timezone.make_aware(datetime.combine(local_date, time.min))
+
+    @staticmethod
+    def period_from_dates(date_from=None, date_to=None) -> tuple:
+        """
+        Переводит даты в период [начало, конец); дата окончания включается целиком.
+        """
+        start = timezone.make_aware(datetime.combine(date_from, time.min)) if date_from else None
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)) if date_to else None
+        return start, end
+
+    @staticmethod
+    def get_contribution(state):
+        """
+        Возвращает вклад заказа в выручку: (момент оплаты, стол, сумма)
+        или None, если заказ не оплачен.
+        """
+        if not state or state['status'] != 'paid' or state['paid_at'] is None:
+            return None
+        return state['paid_at'], state['table_number'], Decimal(str(state['total_price']))
+
+    @staticmethod
+    def apply_delta(paid_at, table_number, revenue_delta, count_delta) -> None:
+        """
+        Добавляет изменение выручки в часовой и дневной агрегаты.
+        """
+        buckets = (
+            ('hour', RevenueService.hour_start(paid_at)),
+            ('day', RevenueService.day_start(paid_at)),
+        )
+        for granularity, period_start in buckets:
+            increment_or_create(
+                RevenueRollup,
+                {'granularity': granularity, 'period_start': period_start, 'table_number': table_number},
+                revenue=revenue_delta,
+                orders_count=count_delta,
+            )
+
+    @staticmethod
+    def track_order_change(old_state, new_state) -> None:
+        """
+        Переносит изменение заказа в агрегаты: снимает старый вклад и добавляет новый.
+        """
+        old = RevenueService.get_contribution(old_state)
+        new = RevenueService.get_contribution(new_state)
+        if old == new:
+            return
+        if old:
+            RevenueService.apply_delta(old[0], old[1], -old[2], -1)
+        if new:
+            RevenueService.apply_delta(new[0], new[1], new[2], 1)
+
+    @staticmethod
+    def get_rollup_filter(date_from=None, date_to=None) -> Q:
+        """
+        Условие выборки агрегатов за период [date_from, date_to).
+        Целые сутки берутся из дневных агрегатов, края периода — из часовых.
+        Границы округляются до часа.
+        """
+        start = RevenueService.hour_start(date_from) if date_from else None
+        end = None
+        if date_to:
+            end = RevenueService.hour_start(date_to)
+            if end < date_to:
+                end += timedelta(hours=1)
+
+        if start is None and end is None:
+            return Q(granularity='day')
+
+        first_day = None
+        if start is not None:
+            first_day = start if start == RevenueService.day_start(start) else RevenueService.next_day_start(start)
+        last_day = RevenueService.day_start(end) if end is not None else None
+
+        if first_day is not None and last_day is not None and first_day >= last_day:
+            # Период короче суток — только часовые агрегаты
+            return Q(granularity='hour', period_start__gte=start, period_start__lt=end)
+
+        days = Q(granularity='day')
+        if first_day is not None:
+            days &= Q(period_start__gte=first_day)
+        if last_day is not None:
+            days &= Q(period_start__lt=last_day)
+
+        condition = days
+        if start is not None:
+            condition |= Q(granularity='hour', period_start__gte=start, period_start__lt=first_day)
+        if end is not None:
+            condition |= Q(granularity='hour', period_start__gte=last_day, period_start__lt=end)
+        return condition
+
+    @staticmethod
+    def get_revenue(date_from=None, date_to=None) -> dict:
+        """
+        Выручка за период с разбивкой по столам.
+        """
+        by_table = list(
+            RevenueRollup.objects
+            .filter(RevenueService.get_rollup_filter(date_from, date_to))
+            .values('table_number')
+            .annotate(revenue=Sum('revenue'), orders_count=Sum('orders_count'))
+            .filter(orders_count__gt=0)
+            .order_by('table_number')
+        )
+        return {
+            'total_revenue': sum((row['revenue'] for row in by_table), Decimal('0.00')),
+            'orders_count': sum(row['orders_count'] for row in by_table),
+            'by_table': by_table,
+        }
+
+    @staticmethod
+    def aggregate_orders(date_from=None, date_to=None) -> dict:
+        """
+        Выручка за период, посчитанная агрегатом по заказам и архиву заказов (без агрегатов).
+        """
+        condition = Q(status='paid')
+        if date_from:
+            condition &= Q(paid_at__gte=date_from)
+        if date_to:
+            condition &= Q(paid_at__lt=date_to)
+        total = {'total_revenue': Decimal('0.00'), 'orders_count': 0}
+        for orders in OrderArchiveService.querysets(condition):
+            result = orders.aggregate(total_revenue=Sum('total_price'), orders_count=Count('id'))
+            total['total_revenue'] += result['total_revenue'] or Decimal('0.00')
+            total['orders_count'] += result['orders_count']
+        return total
+
+    @staticmethod
+    def rebuild_rollups() -> int:
+        """
+        Пересчитывает все агрегаты с нуля группировкой на стороне БД
+        по заказам и архиву заказов. Возвращает количество созданных агрегатов.
+        """
+        buckets = {}
+        for orders in OrderArchiveService.querysets(Q(status='paid', paid_at__isnull=False)):
+            for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+                rows = (
+                    orders
+                    .annotate(period_start=trunc('paid_at'))
+                    .values('period_start', 'table_number')
+                    .annotate(revenue=Sum('total_price'), orders_count=Count('id'))
+                    .order_by()
+                )
+                for row in rows:
+                    key = (granularity, row['period_start'], row['table_number'])
+                    if key in buckets:
+                        buckets[key].revenue += row['revenue']
+                        buckets[key].orders_count += row['orders_count']
+                    else:
+                        buckets[key] = RevenueRollup(granularity=granularity, **row)
+        rollups = list(buckets.values())
+
+        with transaction.atomic():
+            RevenueRollup.objects.all().delete()
+            RevenueRollup.objects.bulk_create(rollups, batch_size=500)
+        return len(rollups)
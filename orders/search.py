@@ -0,0 +1,117 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Order, OrderItem
+
+
+class DishSearchService:
+    """
+    Полнотекстовый поиск заказов по названиям блюд.
+    На SQLite используется индекс FTS5 (таблица orders_order_dish_fts, rowid = ID заказа),
+    который ведется сигналами при сохранении, пакетных операциях и удалении заказов.
+    На других базах — поиск по позициям заказа (OrderItem.name) без учета регистра.
+    """
+    TABLE = 'orders_order_dish_fts'
+    WORD_RE = re.compile(r'\w+')
+
+    @staticmethod
+    def is_available() -> bool:
+        # Таблицу индекса миграция 0010 создает только на SQLite
+        return connection.vendor == 'sqlite'
+
+    @staticmethod
+    def get_document(items) -> str:
+        """
+        Текст для индекса: уникальные названия блюд заказа.
+        """
+        names = dict.fromkeys(str(item.get('name', '')) for item in items or [] if isinstance(item, dict))
+        return '\n'.join(name for name in names if name)
+
+    @staticmethod
+    def build_match(query) -> str:
+        """
+        Запрос FTS5: все слова запроса как префиксы ("борщ" найдет "Борщ" и "борща").
+        """
+        return ' '.join(f'"{word}"*' for word in DishSearchService.WORD_RE.findall(query))
+
+    @staticmethod
+    def index_orders(orders, created=False) -> None:
+        """
+        Добавляет или обновляет заказы в индексе; orders — пары (ID заказа, список блюд).
+        Для только что созданных заказов (created=True) старые записи не удаляются.
+        """
+        rows = [(order_id, DishSearchService.get_document(items)) for order_id, items in orders]
+        if not rows or not DishSearchService.is_available():
+            return
+        with connection.cursor() as cursor:
+            if not created:
+                cursor.executemany(f'DELETE FROM {DishSearchService.TABLE} WHERE rowid = %s', [(pk,) for pk, _ in rows])
+            cursor.executemany(
+                f'INSERT INTO {DishSearchService.TABLE} (rowid, names) VALUES (%s, %s)',
+                [row for row in rows if row[1]]
+            )
+
+    @staticmethod
+    def append_items(order_id, items) -> None:
+        """
+        Дописывает в запись заказа названия добавленных блюд, которых в ней еще нет,
+        не собирая документ заново из всего списка блюд.
+        """
+        document = DishSearchService.get_document(items)
+        if not document or not DishSearchService.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT names FROM {DishSearchService.TABLE} WHERE rowid = %s', [order_id])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(f'INSERT INTO {DishSearchService.TABLE} (rowid, names) VALUES (%s, %s)', [order_id, document])
+                return
+            indexed = set(row[0].split('\n'))
+            names = [name for name in document.split('\n') if name not in indexed]
+            if names:
+                cursor.execute(
+                    f'UPDATE {DishSearchService.TABLE} SET names = %s WHERE rowid = %s',
+                    ['\n'.join([row[0], *names]), order_id]
+                )
+
+    @staticmethod
+    def remove_orders(order_ids) -> None:
+        if not order_ids or not DishSearchService.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {DishSearchService.TABLE} WHERE rowid = %s', [(pk,) for pk in order_ids])
+
+    @staticmethod
+    def filter_orders(queryset, query):
+        """
+        Заказы, в которых есть блюда, подходящие под запрос.
+        """
+        match = DishSearchService.build_match(query)
+        if not match:
+            return queryset.none()
+        if DishSearchService.is_available():
+            return queryset.filter(
+                pk__in=RawSQL(f'SELECT rowid FROM {DishSearchService.TABLE} WHERE {DishSearchService.TABLE} MATCH %s', [match])
+            )
+        return queryset.filter(pk__in=OrderItem.objects.filter(name__icontains=query).values('order_id'))
+
+    @staticmethod
+    def rebuild(batch_size=1000) -> int:
+        """
+        Пересобирает индекс по всем заказам пачками. Возвращает количество заказов.
+        """
+        if not DishSearchService.is_available():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {DishSearchService.TABLE}')
+        processed = 0
+        last_pk = 0
+        while True:
+            batch = list(Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'items')[:batch_size])
+            if not batch:
+                return processed
+            DishSearchService.index_orders(batch, created=True)
+            last_pk = batch[-1][0]
+            processed += len(batch)
@@ -1,20 +1,35 @@
+import ipaddress
+from decimal import Decimal
+
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Value, When
 from django.shortcuts import get_object_or_404, redirect, render
-from orders.tasks import notify_admin_worker_login 
-from django.core.cache import cache
 from django.utils import timezone
 
-from .forms import OrderForm, OrderSearchForm, WorkerLoginForm
-from .models import Order, Worker
+from .auth import WorkerAuthService
+from .expressions import JSONArrayAppend
+from .forms import OrderForm, OrderSearchForm, RevenueFilterForm, WorkerLoginForm
+from .live import OrderEventService
+from .models import Order, OrderConflictError, Table, Worker
+from .notifications import LoginDigestService
+from .pagination import KeysetPaginator
+from .revenue import RevenueService
+from .signals import order_items_appended, orders_bulk_created, orders_bulk_status_changed
+from .tables import TableService
 
 
 class OrderService:
+    # ID заказов в одном UPDATE массовой смены статуса (ниже лимита параметров SQLite)
+    TRANSITION_BATCH_SIZE = 500
+
     @staticmethod
     def get_occupied_tables() -> list[int]:
         """
         Возвращает список занятых столов.
         """
-        return Order.objects.filter(status__in=['waiting', 'ready', 'paid']).values_list('table_number', flat=True)
+        return Table.objects.filter(active_order__isnull=False).values_list('number', flat=True)
 
     @staticmethod
     def process_dishes(request, existing_items=None) -> list:
@@ -60,23 +75,151 @@ class OrderService:
         Создает заказ на основе данных из запроса.
         """
         table_number = cleaned_data.get('table_number')
-        occupied_tables = OrderService.get_occupied_tables()
 
-        if table_number in occupied_tables:
+        if TableService.is_occupied(table_number):
             raise ValueError(f'Стол {table_number} уже занят. Выберите другой стол.')
 
         items = OrderService.process_dishes(request)
         if not items:
             raise ValueError('В заказе должна быть хотя бы одна позиция.')
 
-        order = Order.objects.create(
-            table_number=table_number,
-            items=items,
-            total_price=sum(item['price'] for item in items),
-            status='waiting',  # Пример статуса по умолчанию
-        )
+        with transaction.atomic():
+            order = Order.objects.create(
+                table_number=table_number,
+                items=items,
+                total_price=sum(item['price'] for item in items),
+                status='waiting',  # Пример статуса по умолчанию
+            )
+            # Стол мог занять параллельный запрос — тогда откатываем создание заказа
+            if not TableService.claim(order):
+                raise ValueError(f'Стол {table_number} уже занят. Выберите другой стол.')
         return order  # Возвращаем созданный заказ
 
+    @staticmethod
+    def bulk_create_orders(orders) -> list:
+        """
+        Создает пакет заказов одной транзакцией: занятость столов проверяется одним запросом,
+        заказы вставляются пакетно, столы занимаются одним условным UPDATE.
+        Возвращает для каждого заказа None при успехе или ошибки по полям ({поле: [тексты]}).
+        """
+        errors = [None] * len(orders)
+        occupied = set(
+            Table.objects
+            .filter(number__in={order.table_number for order in orders}, active_order__isnull=False)
+            .values_list('number', flat=True)
+        )
+        pending = []
+        for index, order in enumerate(orders):
+            if order.table_number in occupied:
+                errors[index] = {'table_number': [f'Стол {order.table_number} уже занят. Выберите другой стол.']}
+                continue
+            order.status = order.status.strip().lower()
+            try:
+                order.full_clean()
+            except ValidationError as e:
+                errors[index] = e.message_dict
+                continue
+            order.paid_at = timezone.now() if order.status == 'paid' else None
+            order.items_count = len(order.items)
+            occupied.add(order.table_number)  # Конфликты столов внутри пакета
+            pending.append((index, order))
+
+        if not pending:
+            return errors
+
+        with transaction.atomic():
+            new_orders = [order for _, order in pending]
+            Order.objects.bulk_create(new_orders, batch_size=500)
+            numbers = [order.table_number for order in new_orders]
+            Table.objects.bulk_create([Table(number=number) for number in numbers], ignore_conflicts=True)
+            Table.objects.filter(number__in=numbers, active_order__isnull=True).update(
+                active_order=Case(*[When(number=order.table_number, then=Value(order.pk)) for order in new_orders])
+            )
+
+            for order in new_orders:
+                order._original_state = order.get_tracked_state(Order.SNAPSHOT_FIELDS)
+            orders_bulk_created.send(sender=Order, orders=new_orders)
+
+            # Стол мог занять параллельный запрос — такие заказы удаляем
+            claimed = dict(Table.objects.filter(number__in=numbers).values_list('number', 'active_order'))
+            lost = [(index, order) for index, order in pending if claimed.get(order.table_number) != order.pk]
+            if lost:
+                Order.objects.filter(pk__in=[order.pk for _, order in lost]).delete()
+                for index, order in lost:
+                    errors[index] = {'table_number': [f'Стол {order.table_number} уже занят. Выберите другой стол.']}
+        return errors
+
+    @staticmethod
+    def bulk_transition(orders, status) -> tuple:
+        """
+        Массово переводит заказы в статус условным UPDATE: меняются только заказы,
+        для которых переход допустим. В транзакции сначала выбираются (и блокируются)
+        ID заказов в допустимых исходных статусах — это и есть измененные заказы,
+        затем они обновляются пачками по TRANSITION_BATCH_SIZE ID.
+        orders — queryset или список ID. Возвращает (ID измененных, ID пропущенных).
+        """
+        sources = [source for source, targets in Order.ALLOWED_TRANSITIONS.items() if status in targets]
+        if hasattr(orders, 'values_list'):
+            requested = None
+            candidates = orders.filter(status__in=sources)
+        else:
+            requested = list(dict.fromkeys(orders))
+            candidates = Order.objects.filter(pk__in=requested, status__in=sources)
+
+        now = timezone.now()
+        changes = {'status': status, 'updated_at': now, 'version': F('version') + 1}
+        if status == 'paid':
+            changes['paid_at'] = now
+
+        with transaction.atomic():
+            updated = list(candidates.select_for_update().order_by('pk').values_list('pk', flat=True))
+            if requested is None:
+                skipped = list(orders.exclude(status__in=sources).order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(updated), OrderService.TRANSITION_BATCH_SIZE):
+                batch = updated[start:start + OrderService.TRANSITION_BATCH_SIZE]
+                Order.objects.filter(pk__in=batch).update(**changes)
+            if updated:
+                orders_bulk_status_changed.send(sender=Order, order_ids=updated, status=status, changed_at=now)
+
+        if requested is None:
+            return updated, skipped
+        updated_ids = set(updated)
+        return (
+            [pk for pk in requested if pk in updated_ids],
+            [pk for pk in requested if pk not in updated_ids],
+        )
+
+    @staticmethod
+    def append_items(order, items, expected_version=None) -> Order:
+        """
+        Добавляет блюда в конец заказа одним UPDATE: список блюд, сумма и количество
+        меняются на стороне БД, поэтому параллельные добавления не теряются,
+        а стоимость операции не зависит от длины заказа.
+        Если передана expected_version, заказ меняется только в этой версии.
+        Скалярные поля заказа обновляются значениями из БД, а список блюд
+        перечитывается, только если к нему обратятся.
+        """
+        price_delta = sum((Decimal(str(item['price'])) for item in items), Decimal('0'))
+        orders = Order.objects.filter(pk=order.pk)
+        if expected_version is not None:
+            orders = orders.filter(version=expected_version)
+        with transaction.atomic():
+            updated = orders.update(
+                items=JSONArrayAppend('items', items),
+                total_price=F('total_price') + price_delta,
+                items_count=F('items_count') + len(items),
+                updated_at=timezone.now(),
+                version=F('version') + 1,
+            )
+            if not updated:
+                raise OrderConflictError()
+            order.refresh_from_db(fields=[*Order.SNAPSHOT_FIELDS, 'items_count', 'updated_at', 'version'])
+            # Список блюд в памяти устарел: без значения в __dict__ поле считается отложенным
+            # и при обращении загрузится из БД
+            order.__dict__.pop('items', None)
+            order_items_appended.send(sender=Order, order=order, items=items, price_delta=price_delta)
+        return order
+
     @staticmethod
     def update_order_from_request(request, order, cleaned_data) -> Order:
         """
@@ -85,19 +228,24 @@ class OrderService:
         """
         # Получаем новые блюда, исключая те, которые уже есть в заказе
         new_items = OrderService.process_dishes(request, existing_items=order.items)
-        
-        # Если новые блюда переданы, добавляем их к существующим
-        if new_items:
-            order.items.extend(new_items)  # Добавляем только новые блюда
 
         # Проверяем, что в заказе есть хотя бы одна позиция
-        if not order.items:
+        if not order.items and not new_items:
             raise ValueError('В заказе должна быть хотя бы одна позиция.')
 
-        # Обновляем данные заказа
-        order.table_number = cleaned_data.get('table_number')
-        order.total_price = sum(item['price'] for item in order.items)
-        order.save()
+        with transaction.atomic():
+            # Смена стола — обычное сохранение с проверкой версии, которую видел пользователь
+            table_number = cleaned_data.get('table_number')
+            if table_number != order.table_number:
+                if cleaned_data.get('version'):
+                    order.version = cleaned_data['version']
+                order.table_number = table_number
+                order.save(update_fields=['table_number'])
+
+            # Новые блюда дописываются в БД атомарно, без перезаписи всего списка;
+            # добавления не конфликтуют друг с другом, поэтому версию не проверяем
+            if new_items:
+                OrderService.append_items(order, new_items)
         return order
     
     @staticmethod
@@ -118,10 +266,16 @@ class OrderService:
                         raise ValueError("Не удалось создать или обновить заказ.")
                     
                     return redirect(redirect_view, pk=order.pk)
+                except OrderConflictError as e:
+                    messages.error(request, str(e))
+                    order.refresh_from_db()
+                    form = OrderForm(instance=order)  # Форма с актуальными данными и версией
                 except ValueError as e:
                     messages.error(request, str(e))
         else:
-            form = OrderForm(instance=order)
+            # Для нового заказа предлагаем ближайший свободный стол
+            initial = {} if order else {'table_number': TableService.get_next_free_table()}
+            form = OrderForm(instance=order, initial=initial)
 
         return render(request, template_name, {
             'form': form,
@@ -133,30 +287,51 @@ class OrderService:
     def order_list_request(request) -> render:
         """
         Обрабатывает запросы для списка заказов.
+        По умолчанию показываются открытые заказы, результаты поиска — во всех статусах.
         """
         form = OrderSearchForm(request.GET or None)
         orders = Order.objects.all()
         search_performed = False  # Флаг, указывающий, был ли выполнен поиск
+        status = ''
 
         if form.is_valid():
             query = form.cleaned_data.get('query', '').strip()
+            status = form.cleaned_data.get('status')
             if query:
                 search_performed = True  # Меняем флаг на True(поиск выполнен)
                 orders = form.filter_queryset(orders)  # Фильтруем заказы
 
+        orders = OrderSearchForm.filter_status(orders, status or ('all' if search_performed else 'open'))
+        page = KeysetPaginator(KeysetPaginator.get_page_size(request)).paginate_request(request, orders)
+
         return render(request, 'orders/order_list.html', {
-            'orders': orders,
+            'orders': page,
+            'page': page,
+            'next_url': OrderService.get_page_url(request, after=page.next_cursor) if page.has_next else None,
+            'previous_url': OrderService.get_page_url(request, before=page.previous_cursor) if page.has_previous else None,
             'search_form': form,
             'search_performed': search_performed,  # Передаём флаг в шаблон
+            'live_events': OrderEventService.is_available(request),  # Живая доска — только под ASGI
         })
 
+    @staticmethod
+    def get_page_url(request, **cursor) -> str:
+        """
+        Ссылка на соседнюю страницу с сохранением параметров поиска.
+        """
+        params = request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params.update(cursor)
+        return f'?{params.urlencode()}'
+
 
 """Логика работы с заказами для работника"""
 class WorkerOrderService(OrderService):
     @staticmethod
     def worker_update_order_from_request(request, order, template_name=None, redirect_view=None):
         if request.method == 'POST':
-            if not request.session.get('worker_id'):
+            if not request.worker:
                 messages.error(request, "Вы не авторизованы как работник.")
                 return redirect('orders:worker_login')
 
@@ -180,7 +355,10 @@ class WorkerOrderService(OrderService):
                     if not order.items:
                         raise ValueError('В заказе должна быть хотя бы одна позиция.')
                     
-                    # Обновляем данные заказа
+                    # Обновляем данные заказа; сохранение пройдет, только если заказ
+                    # не меняли с момента открытия формы
+                    if form.cleaned_data.get('version'):
+                        order.version = form.cleaned_data['version']
                     order.table_number = form.cleaned_data.get('table_number')
                     order.status = form.cleaned_data.get('status')  # Обновляем статус
                     order.total_price = sum(item['price'] for item in order.items)
@@ -189,6 +367,10 @@ class WorkerOrderService(OrderService):
                     order.save(update_fields=['items', 'table_number', 'total_price', 'status'])  # Явно указываем поля для обновления
                     messages.success(request, "Заказ успешно обновлен.")
                     return redirect(redirect_view, pk=order.id)
+                except OrderConflictError as e:
+                    messages.error(request, str(e))
+                    order.refresh_from_db()
+                    form = OrderForm(instance=order)  # Форма с актуальными данными и версией
                 except ValueError as e:
                     messages.error(request, str(e))
             else:
@@ -206,8 +388,7 @@ class WorkerOrderService(OrderService):
         """
         Выход работника из системы.
         """
-        if 'worker_id' in request.session:
-            del request.session['worker_id']
+        WorkerAuthService.logout(request)
         return redirect('orders:order_list')
 
     @staticmethod
@@ -215,9 +396,15 @@ class WorkerOrderService(OrderService):
         """
         Обрабатывает запросы для расчета выручки.
         """
-        paid_orders = Order.objects.filter(status='paid')
-        total_revenue = sum(order.total_price for order in paid_orders)
-        return render(request, 'orders/revenue.html', {'total_revenue': total_revenue})
+        form = RevenueFilterForm(request.GET or None)
+        date_from, date_to = form.get_period() if form.is_valid() else (None, None)
+        revenue = RevenueService.get_revenue(date_from, date_to)
+        return render(request, 'orders/revenue.html', {
+            'form': form,
+            'total_revenue': revenue['total_revenue'],
+            'orders_count': revenue['orders_count'],
+            'revenue_by_table': revenue['by_table'],
+        })
 
     def worker_login_request(request):
         """
@@ -233,20 +420,10 @@ class WorkerOrderService(OrderService):
                     worker = Worker.objects.get(identifier=identifier)
                     if worker.check_password(password):
                         # Сохраняем идентификатор работника в сессии
-                        request.session['worker_id'] = worker.id
-                        request.session['worker_identifier'] = worker.identifier
-                        
-                        ip = WorkerOrderService.get_client_ip(request)
-                        timestamp = timezone.now().strftime("%d.%m.%Y %H:%M:%S")
+                        WorkerAuthService.login(request, worker)
                         
-                        cache_key = f"login_notify_{worker.id}"
-                        if not cache.get(cache_key):
-                            notify_admin_worker_login.delay(
-                                worker_identifier=identifier,
-                                timestamp=timestamp,
-                                ip_address=ip
-                            )
-                            cache.set(cache_key, True, 60 * 5)  # 5 минут 
+                        # Вход попадает в сводное письмо администратору (задача flush_login_digest)
+                        LoginDigestService.record(identifier, WorkerOrderService.get_client_ip(request))
                         messages.success(request, "Вы успешно авторизовались!")
                         return redirect('orders:order_list')  # Используем именованный URL-адрес
                     else:
@@ -259,11 +436,24 @@ class WorkerOrderService(OrderService):
         return render(request, 'workers/login.html', {'form': form})
 
 
+    @staticmethod
+    def parse_ip(value):
+        """
+        Нормализованный IP-адрес или None, если строка не является адресом.
+        """
+        try:
+            return str(ipaddress.ip_address((value or '').strip()))
+        except ValueError:
+            return None
+
     @staticmethod
     def get_client_ip(request):
+        """
+        IP-адрес клиента: первый адрес из X-Forwarded-For, если он корректен, иначе REMOTE_ADDR.
+        """
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
\ No newline at end of file
+            ip = WorkerOrderService.parse_ip(x_forwarded_for.split(',')[0])
+            if ip:
+                return ip
+        return WorkerOrderService.parse_ip(request.META.get('REMOTE_ADDR'))
\ No newline at end of file
@@ -0,0 +1,250 @@
+from celery.signals import task_postrun, task_prerun
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .archive import OrderArchiveService
+from .auth import WorkerAuthService
+from .dishes import DishStatsService
+from .items import OrderItemService
+from .live import OrderEventService, broker
+from .metrics import MetricsService
+from .models import Order, Worker, WorkerToken
+from .revenue import RevenueService
+from .search import DishSearchService
+from .tables import TableService
+
+
+# Пакетные операции обходят Model.save, поэтому отправляют собственные сигналы
+orders_bulk_created = Signal()  # orders: список созданных заказов
+orders_bulk_status_changed = Signal()  # order_ids, status, changed_at
+order_items_appended = Signal()  # order (скалярные поля из БД после добавления), items, price_delta
+
+
+@receiver(post_save, sender=Order)
+def track_revenue_on_save(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Обновляет агрегаты выручки после сохранения заказа.
+    """
+    if raw:
+        return
+    RevenueService.track_order_change(*instance.get_state_change())
+
+
+@receiver(post_save, sender=Order)
+def track_dishes_on_save(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Обновляет счетчики продаж блюд после оплаты или изменения оплаченного заказа.
+    """
+    if raw:
+        return
+    DishStatsService.track_order_change(*instance.get_state_change())
+
+
+@receiver(post_save, sender=Order)
+def track_table_on_save(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Занимает или освобождает стол после сохранения заказа.
+    """
+    if raw:
+        return
+    TableService.track_order_change(instance, *instance.get_state_change())
+
+
+@receiver(post_save, sender=Order)
+def sync_items_on_save(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Синхронизирует нормализованные позиции заказа со списком блюд.
+    """
+    if raw:
+        return
+    old_state, new_state = instance.get_state_change()
+    OrderItemService.sync_order(instance, old_state['items'] if old_state else None, new_state['items'])
+
+
+@receiver(post_save, sender=Order)
+def index_dishes_on_save(sender, instance, created=False, raw=False, **kwargs) -> None:
+    """
+    Обновляет полнотекстовый индекс блюд, если список блюд изменился.
+    """
+    if raw:
+        return
+    old_state, new_state = instance.get_state_change()
+    if old_state is None or old_state['items'] != new_state['items']:
+        DishSearchService.index_orders([(instance.pk, new_state['items'])], created=created)
+
+
+@receiver(post_save, sender=Order)
+def publish_event_on_save(sender, instance, raw=False, **kwargs) -> None:
+    """
+    Отправляет доскам заказов изменения сохраненного заказа.
+    """
+    if raw:
+        return
+    event = OrderEventService.build_save_event(instance, *instance.get_state_change())
+    if event:
+        broker.publish_on_commit(event)
+
+
+@receiver(post_delete, sender=Order)
+def publish_event_on_delete(sender, instance, **kwargs) -> None:
+    if OrderArchiveService.is_archiving():
+        return
+    broker.publish_on_commit({'type': 'order.deleted', 'id': instance.pk})
+
+
+@receiver(post_delete, sender=Order)
+def remove_dishes_on_delete(sender, instance, **kwargs) -> None:
+    if OrderArchiveService.is_archiving():
+        return  # Архивация снимает заказы с индекса одной пачкой
+    DishSearchService.remove_orders([instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def track_revenue_on_delete(sender, instance, **kwargs) -> None:
+    """
+    Снимает вклад удаленного заказа из агрегатов выручки. Перенесенный в архив заказ остается в них.
+    """
+    if OrderArchiveService.is_archiving():
+        return
+    RevenueService.track_order_change(instance.get_stored_state(), None)
+
+
+@receiver(post_delete, sender=Order)
+def track_dishes_on_delete(sender, instance, **kwargs) -> None:
+    if OrderArchiveService.is_archiving():
+        return
+    DishStatsService.track_order_change(instance.get_stored_state(), None)
+
+
+@receiver(orders_bulk_created)
+def track_revenue_on_bulk_create(sender, orders, **kwargs) -> None:
+    """
+    Добавляет в агрегаты выручки оплаченные заказы, созданные пакетом.
+    """
+    for order in orders:
+        RevenueService.track_order_change(None, order.get_tracked_state())
+
+
+@receiver(orders_bulk_created)
+def track_dishes_on_bulk_create(sender, orders, **kwargs) -> None:
+    for order in orders:
+        DishStatsService.track_order_change(None, order.get_tracked_state())
+
+
+@receiver(orders_bulk_created)
+def create_items_on_bulk_create(sender, orders, **kwargs) -> None:
+    """
+    Создает нормализованные позиции для заказов, созданных пакетом.
+    """
+    OrderItemService.create_for_orders(orders)
+
+
+@receiver(orders_bulk_created)
+def index_dishes_on_bulk_create(sender, orders, **kwargs) -> None:
+    DishSearchService.index_orders([(order.pk, order.items) for order in orders], created=True)
+
+
+@receiver(orders_bulk_status_changed)
+def track_revenue_on_bulk_status_change(sender, order_ids, status, changed_at, **kwargs) -> None:
+    """
+    Добавляет в агрегаты выручки заказы, массово переведенные в статус "paid".
+    Массовые переходы не выводят заказ из статуса "paid" (см. Order.ALLOWED_TRANSITIONS).
+    """
+    if status != 'paid':
+        return
+    rows = (
+        Order.objects
+        .filter(pk__in=order_ids)
+        .values('table_number')
+        .annotate(revenue=Sum('total_price'), orders_count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        RevenueService.apply_delta(changed_at, row['table_number'], row['revenue'], row['orders_count'])
+
+
+@receiver(orders_bulk_status_changed)
+def track_dishes_on_bulk_status_change(sender, order_ids, status, changed_at, **kwargs) -> None:
+    if status == 'paid':
+        DishStatsService.track_bulk_paid(order_ids, changed_at)
+
+
+@receiver(orders_bulk_created)
+def publish_events_on_bulk_create(sender, orders, **kwargs) -> None:
+    for order in orders:
+        broker.publish_on_commit(OrderEventService.build_save_event(order, None, order.get_tracked_state()))
+
+
+@receiver(orders_bulk_status_changed)
+def publish_events_on_bulk_status_change(sender, order_ids, status, changed_at, **kwargs) -> None:
+    changes = OrderEventService.with_status_display({'status': status})
+    for order_id in order_ids:
+        broker.publish_on_commit({'type': 'order.status_changed', 'id': order_id, 'changes': changes})
+
+
+@receiver(order_items_appended)
+def track_revenue_on_items_appended(sender, order, items, price_delta, **kwargs) -> None:
+    """
+    Добавляет стоимость новых блюд оплаченного заказа в агрегаты выручки.
+    """
+    if order.status == 'paid' and order.paid_at is not None:
+        RevenueService.apply_delta(order.paid_at, order.table_number, price_delta, 0)
+
+
+@receiver(order_items_appended)
+def track_dishes_on_items_appended(sender, order, items, **kwargs) -> None:
+    DishStatsService.add_items(order, items)
+
+
+@receiver(order_items_appended)
+def add_items_on_items_appended(sender, order, items, **kwargs) -> None:
+    OrderItemService.add_items(order.pk, items)
+
+
+@receiver(order_items_appended)
+def index_dishes_on_items_appended(sender, order, items, **kwargs) -> None:
+    DishSearchService.append_items(order.pk, items)
+
+
+@receiver(order_items_appended)
+def publish_event_on_items_appended(sender, order, items, **kwargs) -> None:
+    broker.publish_on_commit({
+        'type': 'order.updated',
+        'id': order.pk,
+        'changes': {'total_price': order.total_price, 'items_count': order.items_count},
+    })
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+def invalidate_worker_cache(sender, instance, **kwargs) -> None:
+    """
+    Сбрасывает закэшированные данные работника после изменения или удаления.
+    """
+    cache.delete(WorkerAuthService.worker_cache_key(instance.pk))
+
+
+@receiver(post_delete, sender=WorkerToken)
+def invalidate_token_cache(sender, instance, **kwargs) -> None:
+    cache.delete(WorkerAuthService.token_cache_key(instance.key))
+
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs) -> None:
+    MetricsService.install_query_counter(connection)
+
+
+@task_prerun.connect
+def start_task_timer(sender=None, task_id=None, **kwargs) -> None:
+    MetricsService.task_started(task_id)
+
+
+@task_postrun.connect
+def observe_task_duration(sender=None, task_id=None, state=None, **kwargs) -> None:
+    """
+    Записывает время выполнения задачи Celery (например, notify_admin_worker_login).
+    """
+    MetricsService.task_finished(task_id, sender.name, state)
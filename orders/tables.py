@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Order, Table
+
+
+class TableService:
+    """
+    Занятость столов. Проверка занятости — один запрос по уникальному индексу,
+    занятие стола — условный UPDATE, поэтому два параллельных заказа
+    не могут получить один и тот же стол.
+    """
+
+    @staticmethod
+    def is_occupied(table_number) -> bool:
+        """
+        Проверяет, занят ли стол.
+        """
+        return Table.objects.filter(number=table_number, active_order__isnull=False).exists()
+
+    @staticmethod
+    def claim(order) -> bool:
+        """
+        Занимает стол заказа, если он свободен или уже занят этим заказом.
+        Возвращает True, если стол закреплен за заказом.
+        """
+        TableService.release(order, keep_table_number=order.table_number)
+        Table.objects.get_or_create(number=order.table_number)
+        return bool(
+            Table.objects
+            .filter(number=order.table_number)
+            .filter(Q(active_order__isnull=True) | Q(active_order=order))
+            .update(active_order=order)
+        )
+
+    @staticmethod
+    def release(order, keep_table_number=None) -> None:
+        """
+        Освобождает стол(ы), занятые заказом, кроме keep_table_number.
+        """
+        tables = Table.objects.filter(active_order=order)
+        if keep_table_number is not None:
+            tables = tables.exclude(number=keep_table_number)
+        tables.update(active_order=None)
+
+    @staticmethod
+    def track_order_change(order, old_state, new_state) -> None:
+        """
+        Переносит занятость стола при создании заказа, смене стола или статуса.
+        """
+        old_occupies = bool(old_state) and old_state['status'] in Order.OCCUPYING_STATUSES
+        new_occupies = bool(new_state) and new_state['status'] in Order.OCCUPYING_STATUSES
+        table_changed = bool(old_state) and bool(new_state) and old_state['table_number'] != new_state['table_number']
+
+        if old_occupies and (not new_occupies or table_changed):
+            TableService.release(order)
+        if new_occupies and (not old_occupies or table_changed):
+            TableService.claim(order)
+
+    @staticmethod
+    def get_next_free_table():
+        """
+        Возвращает наименьший свободный номер стола в пределах CAFE_TABLES_COUNT
+        или None, если свободных столов нет.
+        """
+        limit = settings.CAFE_TABLES_COUNT
+        free_number = (
+            Table.objects
+            .filter(active_order__isnull=True, number__lte=limit)
+            .order_by('number')
+            .values_list('number', flat=True)
+            .first()
+        )
+        if free_number is not None:
+            return free_number
+
+        # Столы без записи в Table ещё ни разу не занимались
+        known_numbers = set(Table.objects.filter(number__lte=limit).values_list('number', flat=True))
+        return next((number for number in range(1, limit + 1) if number not in known_numbers), None)
+
+    @staticmethod
+    def get_floor_map() -> list[dict]:
+        """
+        Возвращает схему зала: все столы с их текущими заказами.
+        """
+        tables = {
+            table.number: table
+            for table in Table.objects.select_related('active_order').order_by('number')
+        }
+        numbers = sorted(set(range(1, settings.CAFE_TABLES_COUNT + 1)) | tables.keys())
+
+        floor_map = []
+        for number in numbers:
+            order = tables[number].active_order if number in tables else None
+            floor_map.append({
+                'number': number,
+                'is_occupied': order is not None,
+                'active_order': order.id if order else None,
+                'active_order_status': order.status if order else None,
+            })
+        return floor_map
@@ -4,6 +4,29 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 
+from .archive import OrderArchiveService
+from .notifications import LoginDigestService
+
+@shared_task
+def flush_login_digest(batch_size=None):
+    """
+    Периодическая отправка сводного письма о входах работников (см. CELERY_BEAT_SCHEDULE).
+    """
+    sent = LoginDigestService.flush(batch_size)
+    return f"Отправлено входов в сводке: {sent}"
+
+
+@shared_task
+def archive_orders(days=None, batch_size=None):
+    """
+    Периодический перенос старых оплаченных заказов в архив (см. CELERY_BEAT_SCHEDULE).
+    """
+    cutoff = OrderArchiveService.get_cutoff(days)
+    archived = OrderArchiveService.archive(cutoff, batch_size)
+    return f"Перенесено в архив заказов: {archived}"
+
+
+# Оставлена для задач, поставленных в очередь до перехода на сводные письма
 @shared_task
 def notify_admin_worker_login(worker_identifier, timestamp, ip_address=None):
     subject = f" Работник {worker_identifier}: вошёл в систему. "
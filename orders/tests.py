@@ -1,12 +1,59 @@
+import asyncio
+import csv
+import json
+import tempfile
+import threading
+import time
+from base64 import urlsafe_b64encode
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+import msgpack
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import F, Q, Sum
 from unittest.mock import patch
-from django.test import Client, RequestFactory, TestCase
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 import pytest
 
-from api.serializers import OrderSerializer
+from api.authentication import WorkerTokenAuthentication
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.serializers import OrderReadSerializer, OrderSerializer
+from orders.archive import OrderArchiveService
+from orders.auth import WorkerAuthService, check_worker_auth_cache
+from orders.dishes import DishStatsService
+from orders.export import OrderExportService
+from orders.expressions import increment_or_create
+from orders.forms import OrderSearchForm
+from orders.items import OrderItemService
+from orders.live import OrderEventService, broker
+from orders.metrics import QueryCounter, current_queries
+from orders.notifications import LoginDigestService
+from orders.pagination import KeysetPaginator
+from orders.revenue import RevenueService
+from orders.search import DishSearchService
 from orders.services import OrderService, WorkerOrderService
-from .models import Order, Worker
+from orders.tasks import archive_orders, notify_admin_worker_login
+from orders.tables import TableService
+from .models import DishSalesRollup, DishSalesTotal, LoginEvent, Order, OrderArchive, OrderConflictError, OrderItem, Table, Worker
 
 
 """Тесты для Модели"""
@@ -443,3 +490,1586 @@ class OrderSerializerTest(TestCase):
             self.assertEqual(updated_order.status, 'ready')  # Статус обновлен
 
 
+
+
+"""Тесты для агрегатов выручки"""
+
+class RevenueRollupTest(TestCase):
+    def create_paid_order(self, table_number, price):
+        return Order.objects.create(
+            table_number=table_number,
+            items=[{"name": "Coffee", "price": price}],
+            total_price=price,
+            status='paid'
+        )
+
+    def test_rollups_follow_paid_status(self):
+        order = self.create_paid_order(1, 5.00)
+        self.create_paid_order(2, 3.00)
+        self.assertEqual(RevenueService.get_revenue()['total_revenue'], Decimal('8.00'))
+
+        # Выход из статуса "paid" снимает вклад заказа
+        order.status = 'ready'
+        order.save()
+        revenue = RevenueService.get_revenue()
+        self.assertEqual(revenue['total_revenue'], Decimal('3.00'))
+        self.assertEqual(revenue['orders_count'], 1)
+
+        # Удаление оплаченного заказа тоже снимает вклад
+        Order.objects.get(table_number=2).delete()
+        self.assertEqual(RevenueService.get_revenue()['total_revenue'], Decimal('0.00'))
+
+    def test_revenue_by_period_matches_orders(self):
+        order = self.create_paid_order(1, 5.00)
+        yesterday = timezone.now() - timedelta(days=1)
+        Order.objects.filter(pk=order.pk).update(paid_at=yesterday)
+        self.create_paid_order(2, 3.00)
+        RevenueService.rebuild_rollups()
+
+        today = timezone.localdate()
+        for date_from, date_to in [(today, today), (today - timedelta(days=1), today), (None, today - timedelta(days=1))]:
+            period = RevenueService.period_from_dates(date_from, date_to)
+            self.assertEqual(
+                RevenueService.get_revenue(*period)['total_revenue'],
+                RevenueService.aggregate_orders(*period)['total_revenue']
+            )
+
+        start = timezone.now() - timedelta(hours=1)
+        self.assertEqual(RevenueService.get_revenue(start, None)['total_revenue'], Decimal('3.00'))
+
+    def test_revenue_api(self):
+        self.create_paid_order(1, 5.00)
+        self.create_paid_order(2, 3.00)
+        self.assertEqual(self.client.get('/api/revenue/').status_code, 401)
+
+        worker = Worker.objects.create(identifier='W001')
+        token = WorkerAuthService.create_token(worker)
+        response = self.client.get('/api/revenue/', HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_revenue'], '8.00')
+        self.assertEqual([row['table_number'] for row in response.json()['by_table']], [1, 2])
+
+
+"""Тесты для столов"""
+
+class TableServiceTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def create_order_request(self, table_number):
+        request = self.factory.post('/fake-url/', data={
+            'table_number': table_number,
+            'dish_name_0': 'Coffee',
+            'dish_price_0': '5.00',
+        })
+        return OrderService.create_order_from_request(request, {'table_number': table_number})
+
+    def test_order_occupies_and_moves_table(self):
+        order = self.create_order_request(3)
+        self.assertTrue(TableService.is_occupied(3))
+        self.assertEqual(Table.objects.get(number=3).active_order, order)
+
+        order.table_number = 4
+        order.save()
+        self.assertFalse(TableService.is_occupied(3))
+        self.assertTrue(TableService.is_occupied(4))
+
+        order.delete()
+        self.assertFalse(TableService.is_occupied(4))
+
+    def test_concurrent_create_gets_conflict(self):
+        self.create_order_request(3)
+        # Параллельный запрос не увидел занятость стола при предварительной проверке
+        with patch('orders.services.TableService.is_occupied', return_value=False):
+            with self.assertRaises(ValueError):
+                self.create_order_request(3)
+        self.assertEqual(Order.objects.filter(table_number=3).count(), 1)
+
+    def test_next_free_table_and_floor_map(self):
+        self.create_order_request(1)
+        self.create_order_request(3)
+        self.assertEqual(TableService.get_next_free_table(), 2)
+
+        response = self.client.get('/api/tables/next-free/')
+        self.assertEqual(response.json(), {'number': 2})
+
+        floor_map = self.client.get('/api/tables/').json()
+        self.assertEqual(len(floor_map), settings.CAFE_TABLES_COUNT)
+        self.assertEqual([table['number'] for table in floor_map if table['is_occupied']], [1, 3])
+
+
+"""Тесты для индексов"""
+
+class OrderQueryPlanTest(TestCase):
+    def assert_uses_index(self, queryset):
+        """
+        Проверяет, что запрос к заказам не читает таблицу целиком.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        for step in plan:
+            self.assertFalse(step.startswith('SCAN orders_order'), f'Полное сканирование: {plan}')
+
+    def search(self, query):
+        form = OrderSearchForm({'query': query})
+        self.assertTrue(form.is_valid())
+        return form.filter_queryset(Order.objects.all())
+
+    def test_hot_queries_use_indexes(self):
+        hot_queries = [
+            Order.objects.filter(status='waiting'),
+            Order.objects.filter(table_number=1),
+            Order.objects.filter(table_number=1, status='waiting'),
+            Order.objects.filter(status='waiting').order_by('-id'),
+            Order.objects.filter(status='paid', paid_at__gte=timezone.now()),
+            Order.objects.filter(paid_at__lt=timezone.now()),
+            self.search('5'),
+            self.search('Готов'),
+        ]
+        for queryset in hot_queries:
+            with self.subTest(sql=str(queryset.query)):
+                self.assert_uses_index(queryset)
+
+    def test_status_is_stored_in_canonical_form(self):
+        order = Order.objects.create(
+            table_number=1,
+            items=[{"name": "Coffee", "price": 5.00}],
+            total_price=5.00,
+            status=' READY '
+        )
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'ready')
+        self.assertEqual(list(self.search('ГОТОВ')), [order])
+
+
+"""Тесты для постраничного списка заказов"""
+
+class OrderListPaginationTest(TestCase):
+    def setUp(self):
+        self.orders = [
+            Order.objects.create(
+                table_number=number,
+                items=[{"name": f"Dish {number}", "price": 5.00}],
+                total_price=5.00,
+                status='waiting'
+            )
+            for number in range(1, 6)
+        ]
+        self.paid_order = Order.objects.create(
+            table_number=10,
+            items=[{"name": "Paid dish", "price": 5.00}],
+            total_price=5.00,
+            status='paid'
+        )
+
+    def test_keyset_pages_are_stable(self):
+        paginator = KeysetPaginator(page_size=2)
+        open_orders = Order.objects.filter(status__in=Order.OPEN_STATUSES)
+
+        first = paginator.paginate(open_orders)
+        self.assertEqual([order.table_number for order in first], [5, 4])
+        self.assertTrue(first.has_next)
+        self.assertFalse(first.has_previous)
+
+        second = paginator.paginate(open_orders, after=first.next_cursor)
+        self.assertEqual([order.table_number for order in second], [3, 2])
+
+        back = paginator.paginate(open_orders, before=second.previous_cursor)
+        self.assertEqual([order.table_number for order in back], [5, 4])
+
+        last = paginator.paginate(open_orders, after=second.next_cursor)
+        self.assertEqual([order.table_number for order in last], [1])
+        self.assertFalse(last.has_next)
+        self.assertTrue(last.has_previous)
+
+    def test_list_view_shows_open_orders_by_default(self):
+        response = self.client.get(reverse('orders:order_list'), {'page_size': 2})
+        self.assertEqual([order.table_number for order in response.context['orders']], [5, 4])
+        self.assertNotContains(response, "Paid dish")
+        self.assertIn('after=', response.context['next_url'])
+
+        response = self.client.get(reverse('orders:order_list'), {'status': 'all', 'page_size': 2})
+        self.assertContains(response, "Paid dish")
+
+    def test_search_results_are_paginated(self):
+        response = self.client.get(reverse('orders:order_list'), {'query': 'оплачено'})
+        self.assertTrue(response.context['search_performed'])
+        self.assertEqual(list(response.context['orders']), [self.paid_order])
+
+        response = self.client.get(reverse('orders:order_list'), {'query': 'в ожидании', 'page_size': 3})
+        self.assertEqual(len(response.context['orders']), 3)
+        self.assertIn('query=', response.context['next_url'])
+
+
+"""Тесты для курсорной пагинации API"""
+
+class OrderCursorPaginationTest(TestCase):
+    def setUp(self):
+        for number, status in enumerate(['waiting', 'ready', 'waiting', 'paid', 'ready', 'waiting', 'paid'], start=1):
+            Order.objects.create(
+                table_number=number,
+                items=[{"name": "Coffee", "price": 5.00}],
+                total_price=5.00 * number,
+                status=status
+            )
+
+    def collect_pages(self, params):
+        """
+        Проходит все страницы вперед по ссылкам next и возвращает ID заказов.
+        """
+        ids = []
+        response = self.client.get('/api/orders/', params)
+        while True:
+            payload = response.json()
+            self.assertNotIn('count', payload)
+            ids.extend(order['id'] for order in payload['results'])
+            if not payload['next']:
+                return ids, payload
+            response = self.client.get(payload['next'])
+
+    def test_cursor_pages_follow_ordering(self):
+        for ordering in ['-id', 'status', '-total_price', 'table_number']:
+            with self.subTest(ordering=ordering):
+                ids, _ = self.collect_pages({'ordering': ordering, 'page_size': 2})
+                expected = list(Order.objects.order_by(ordering, 'id' if not ordering.startswith('-') else '-id').values_list('id', flat=True))
+                self.assertEqual(ids, expected)
+
+    def test_cursor_pages_with_filters_and_previous_link(self):
+        ids, last_page = self.collect_pages({'status': 'waiting', 'page_size': 2})
+        self.assertEqual(ids, list(Order.objects.filter(status='waiting').order_by('-id').values_list('id', flat=True)))
+
+        previous = self.client.get(last_page['previous']).json()
+        self.assertEqual([order['id'] for order in previous['results']], ids[:2])
+
+    def test_page_number_mode_is_kept(self):
+        response = self.client.get('/api/orders/', {'page': 1})
+        self.assertEqual(response.json()['count'], 7)
+
+        response = self.client.get('/api/orders/', {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_values(self):
+        def encode(payload):
+            return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        cases = [
+            {'cursor': encode({'p': ['abc'], 'r': 0})},
+            {'cursor': encode({'p': [{'x': 1}], 'r': 0})},
+            {'cursor': encode({'p': [None], 'r': 0})},
+            {'cursor': encode(['p', 'r'])},
+            {'cursor': encode({'p': ['bogus', 1], 'r': 0}), 'ordering': 'created_at'},
+            {'cursor': encode({'p': ['1.2.3', 1], 'r': 0}), 'ordering': '-total_price'},
+        ]
+        for params in cases:
+            response = self.client.get('/api/orders/', params)
+            self.assertEqual(response.status_code, 404, params)
+            self.assertEqual(response.json(), {'detail': 'Неверный курсор.'})
+
+        # Корректный курсор по дате создания по-прежнему работает
+        first = self.client.get('/api/orders/', {'ordering': 'created_at', 'page_size': 2}).json()
+        self.assertEqual(self.client.get(first['next']).status_code, 200)
+
+
+"""Тесты для пакетного создания заказов"""
+
+class OrderBulkCreateTest(TestCase):
+    def test_bulk_create_reports_each_order(self):
+        Order.objects.create(
+            table_number=1,
+            items=[{"name": "Coffee", "price": 5.00}],
+            total_price=5.00,
+            status='waiting'
+        )
+        payload = [
+            {'table_number': 2, 'items': [{"name": "Tea", "price": 3.00}], 'status': 'waiting'},
+            {'table_number': 1, 'items': [{"name": "Tea", "price": 3.00}], 'status': 'waiting'},  # Стол занят
+            {'table_number': 2, 'items': [{"name": "Soup", "price": 4.00}], 'status': 'waiting'},  # Конфликт в пакете
+            {'table_number': 3, 'items': [], 'status': 'waiting'},  # Пустой заказ
+            {'table_number': 4, 'items': [{"name": "Soup", "price": 4.00}, {"name": "Tea", "price": 3.00}], 'status': 'paid'},
+        ]
+
+        response = self.client.post('/api/orders/bulk/', payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 207)
+        results = response.json()
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'error', 'error', 'created'])
+        self.assertIn('table_number', results[1]['errors'])
+        self.assertIn('table_number', results[2]['errors'])
+        self.assertIn('items', results[3]['errors'])
+        self.assertEqual(results[4]['order']['total_price'], '7.00')
+
+        self.assertTrue(TableService.is_occupied(2))
+        self.assertTrue(TableService.is_occupied(4))
+        self.assertEqual(RevenueService.get_revenue()['total_revenue'], Decimal('7.00'))
+
+    def test_bulk_create_query_count_does_not_grow(self):
+        payload = [
+            {'table_number': number, 'items': [{"name": "Tea", "price": 3.00}], 'status': 'waiting'}
+            for number in range(1, 21)
+        ]
+        # Проверка столов, вставка заказов, столов, позиций и индекса блюд, занятие столов,
+        # проверка занятия + SAVEPOINT/RELEASE
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/orders/bulk/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Table.objects.filter(active_order__isnull=False).count(), 20)
+
+    def test_bulk_create_reports_model_errors_by_field(self):
+        payload = [{'table_number': 1, 'items': [{"name": "Tea", "price": 1.001}]}]
+        response = self.client.post('/api/orders/bulk/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(list(response.json()[0]['errors']), ['total_price'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_bulk_create_ignores_client_version(self):
+        payload = [{'table_number': 1, 'items': [{"name": "Tea", "price": 3.00}], 'version': 7}]
+        response = self.client.post('/api/orders/bulk/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()[0]['order']['version'], 1)
+        self.assertEqual(Order.objects.get().version, 1)
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post('/api/orders/bulk/', {'table_number': 2}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+"""Тесты для массовой смены статуса"""
+
+class OrderBulkTransitionTest(TestCase):
+    def setUp(self):
+        self.orders = {
+            status: Order.objects.create(
+                table_number=number,
+                items=[{"name": "Coffee", "price": 5.00}],
+                total_price=5.00,
+                status=status
+            )
+            for number, status in enumerate(['waiting', 'ready', 'paid'], start=1)
+        }
+
+    def test_bulk_transition_skips_disallowed(self):
+        ids = [order.pk for order in self.orders.values()] + [999]
+        # Выборка допустимых ID и условный UPDATE + SAVEPOINT/RELEASE
+        with self.assertNumQueries(4):
+            updated, skipped = OrderService.bulk_transition(ids, 'ready')
+        self.assertEqual(updated, [self.orders['waiting'].pk])
+        self.assertEqual(skipped, [self.orders['ready'].pk, self.orders['paid'].pk, 999])
+
+    def test_bulk_transition_result_does_not_depend_on_timestamps(self):
+        # Заказ, уже измененный в ту же метку времени, не считается измененным этим переходом
+        now = timezone.now()
+        Order.objects.filter(pk=self.orders['ready'].pk).update(updated_at=now)
+        with patch('orders.services.timezone.now', return_value=now):
+            updated, skipped = OrderService.bulk_transition(Order.objects.all(), 'ready')
+        self.assertEqual(updated, [self.orders['waiting'].pk])
+        self.assertEqual(skipped, [self.orders['ready'].pk, self.orders['paid'].pk])
+
+    def test_bulk_transition_by_filter_in_batches(self):
+        orders = [
+            Order.objects.create(table_number=number, items=[{"name": "Coffee", "price": 5.00}], total_price=5.00)
+            for number in range(10, 15)
+        ]
+        with patch.object(OrderService, 'TRANSITION_BATCH_SIZE', 2):
+            updated, skipped = OrderService.bulk_transition(Order.objects.filter(status='waiting'), 'ready')
+        self.assertEqual(updated, sorted([self.orders['waiting'].pk] + [order.pk for order in orders]))
+        self.assertEqual(skipped, [])
+        self.assertFalse(Order.objects.filter(status='waiting').exists())
+        self.assertEqual(set(Order.objects.filter(pk__in=updated).values_list('version', flat=True)), {2})
+
+    def test_bulk_transition_to_paid_updates_revenue(self):
+        worker = Worker.objects.create(identifier='W001')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {WorkerAuthService.create_token(worker)}'
+        response = self.client.post(
+            '/api/orders/transition/?status=ready',
+            {'status': 'paid'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'updated': [self.orders['ready'].pk], 'skipped': []})
+        paid = Order.objects.get(pk=self.orders['ready'].pk)
+        self.assertIsNotNone(paid.paid_at)
+        self.assertEqual(RevenueService.get_revenue()['total_revenue'], Decimal('10.00'))
+
+        response = self.client.post('/api/orders/transition/', {'status': 'paid'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_action(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:orders_order_changelist'), {
+            'action': 'mark_paid',
+            '_selected_action': [order.pk for order in self.orders.values()],
+        }, follow=True)
+        self.assertEqual(Order.objects.filter(status='paid').count(), 3)
+        self.assertContains(response, str(self.orders['paid'].pk))
+
+
+"""Тесты для нормализованных позиций заказа"""
+
+class OrderItemSyncTest(TestCase):
+    def test_items_follow_json_field(self):
+        order = Order.objects.create(
+            table_number=1,
+            items=[{"name": "Coffee", "price": 5.00}, {"name": "Coffee", "price": 5.00}, {"name": "Tea", "price": 3.00}],
+            total_price=13.00,
+            status='waiting'
+        )
+        self.assertEqual(
+            set(order.order_items.values_list('name', 'quantity')),
+            {('Coffee', 2), ('Tea', 1)}
+        )
+
+        order.items.append({"name": "Soup", "price": 4.50})
+        order.save()
+        self.assertEqual(order.order_items.aggregate(total=Sum(F('price') * F('quantity')))['total'], Decimal('17.50'))
+
+        report = {row['name']: row['total_quantity'] for row in OrderItemService.get_dish_report()}
+        self.assertEqual(report, {'Coffee': 2, 'Tea': 1, 'Soup': 1})
+
+        order.delete()
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_loaded_order_does_not_copy_items(self):
+        order = Order.objects.create(table_number=1, items=[{"name": "Tea", "price": 3.00}], total_price=3.00)
+        order = Order.objects.get(pk=order.pk)
+        self.assertNotIn('items', order.get_state_change()[0])
+
+        # Изменения списка блюд на месте все равно попадают в позиции и поисковый индекс
+        for name in ('Soup', 'Bread'):
+            order.items.append({"name": name, "price": 1.00})
+            order.save()
+        self.assertEqual(sorted(order.order_items.values_list('name', flat=True)), ['Bread', 'Soup', 'Tea'])
+        self.assertEqual(DishSearchService.filter_orders(Order.objects.all(), 'bread').get(), order)
+
+    def test_backfill_command(self):
+        order = Order.objects.create(
+            table_number=1,
+            items=[{"name": "Coffee", "price": 5.00}],
+            total_price=5.00,
+            status='waiting'
+        )
+        Order.objects.filter(pk=order.pk).update(items=[{"name": "Tea", "price": 3.00}, {"name": "Tea", "price": 3.00}])
+
+        call_command('backfill_order_items', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(order.order_items.values_list('name', 'quantity')), [('Tea', 2)])
+
+
+"""Тесты для выгрузки заказов"""
+
+class OrderExportTest(TestCase):
+    def setUp(self):
+        for number, status in enumerate(['waiting', 'paid', 'paid'], start=1):
+            Order.objects.create(
+                table_number=number,
+                items=[{"name": "Борщ", "price": 5.00}],
+                total_price=5.00,
+                status=status
+            )
+
+    def test_export_requires_worker(self):
+        params = {'export_format': 'csv'}
+        self.assertEqual(self.client.get('/api/orders/export/', params).status_code, 401)
+        self.client.force_login(User.objects.create_user('manager'))
+        self.assertEqual(self.client.get('/api/orders/export/', params).status_code, 403)
+
+    def test_export_streams_ndjson_with_filters(self):
+        worker = Worker.objects.create(identifier='W001')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {WorkerAuthService.create_token(worker)}'
+        response = self.client.get('/api/orders/export/', {'export_format': 'ndjson', 'status': 'paid'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['table_number'] for row in rows], [2, 3])
+        self.assertEqual(rows[0]['total_price'], '5.00')
+        self.assertEqual(rows[0]['items'], [{"name": "Борщ", "price": 5.0}])
+
+    def test_export_reads_in_chunks(self):
+        chunks = OrderExportService.iter_csv(Q(), chunk_size=2)
+        with self.assertNumQueries(3):  # Две полные пачки и пустая
+            rows = list(csv.reader(''.join(chunks).splitlines()))
+        self.assertEqual(rows[0], list(OrderExportService.FIELDS))
+        self.assertEqual(len(rows), 4)
+
+    def test_export_command(self):
+        stdout = StringIO()
+        call_command('export_orders', '--format', 'csv', '--table-number', '1', stdout=stdout)
+        rows = list(csv.reader(stdout.getvalue().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(json.loads(rows[1][4]), [{"name": "Борщ", "price": 5.0}])
+
+
+"""Тесты для живой доски заказов"""
+class OrderLiveEventsTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.queue = broker.subscribe(self.loop)
+
+    def tearDown(self):
+        broker.unsubscribe(self.queue)
+        self.loop.close()
+
+    def drain(self) -> list:
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def test_events_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(table_number=1, items=[{"name": "Борщ", "price": 5.00}], total_price=5.00)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'ready'
+            order.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()  # Видимые поля не изменились — события нет
+
+        events = self.drain()
+        self.assertEqual([event['type'] for event in events], ['order.created', 'order.status_changed'])
+        self.assertEqual(events[1]['id'], order.pk)
+        self.assertEqual(events[1]['changes'], {'status': 'ready', 'status_display': 'Готов'})
+
+    def test_no_events_without_commit(self):
+        Order.objects.create(table_number=1, items=[{"name": "Чай", "price": 2.00}], total_price=2.00)
+        self.assertEqual(self.drain(), [])
+
+    def test_bulk_transition_publishes_events(self):
+        orders = [Order.objects.create(table_number=number, items=[{"name": "Чай", "price": 2.00}], total_price=2.00) for number in (1, 2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.bulk_transition(Order.objects.all(), 'paid')
+        events = self.drain()
+        self.assertEqual(sorted(event['id'] for event in events), [order.pk for order in orders])
+        self.assertTrue(all(event['changes']['status'] == 'paid' for event in events))
+
+    def test_slow_board_gets_resync(self):
+        queue = broker.subscribe(self.loop)
+        try:
+            for _ in range(broker.queue_size + 1):
+                broker.deliver(queue, {'type': 'order.updated'})
+            self.assertEqual(queue.get_nowait(), {'type': 'resync'})
+        finally:
+            broker.unsubscribe(queue)
+
+    def test_format_sse(self):
+        message = OrderEventService.format_sse({'type': 'order.deleted', 'id': 7})
+        self.assertEqual(message, 'event: order.deleted\ndata: {"type": "order.deleted", "id": 7}\n\n')
+
+    def test_wsgi_request_does_not_hold_thread(self):
+        responses = []
+        thread = threading.Thread(target=lambda: responses.append(Client().get(reverse('orders:order_events'))), daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(responses[0].status_code, 204)
+        self.assertNotContains(self.client.get(reverse('orders:order_list')), 'EventSource')
+
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(reverse('orders:order_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        await stream.aclose()
+        page = await self.async_client.get(reverse('orders:order_list'))
+        self.assertContains(page, 'EventSource')
+
+
+"""Тесты для асинхронного чтения заказов через API"""
+class AsyncOrderApiTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        for number in range(1, 6):
+            Order.objects.create(
+                table_number=number,
+                items=[{"name": "Борщ", "price": 5.00}],
+                total_price=5.00,
+                status='paid' if number % 2 else 'waiting'
+            )
+
+    def assertSameResponse(self, path, params=None):
+        sync_response = self.client.get(f'/api/{path}', params or {}, HTTP_ACCEPT='application/json')
+        async_response = self.client.get(f'/api/async/{path}', params or {})
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # Ссылки пагинации ведут на тот же вариант API, остальное должно совпадать побайтно
+        self.assertEqual(async_response.content.replace(b'/api/async/', b'/api/'), sync_response.content)
+        return async_response
+
+    def test_list_matches_sync_api(self):
+        self.assertSameResponse('orders/')
+        self.assertSameResponse('orders/', {'status': 'paid', 'ordering': 'table_number'})
+        self.assertSameResponse('orders/', {'page': 1})
+        self.assertSameResponse('orders/', {'page': 2})
+        response = self.assertSameResponse('orders/', {'page_size': 2})
+        cursor = response.json()['next'].split('cursor=')[1].split('&')[0]
+        self.assertSameResponse('orders/', {'page_size': 2, 'cursor': cursor})
+
+    def test_retrieve_matches_sync_api(self):
+        order = Order.objects.first()
+        self.assertSameResponse(f'orders/{order.pk}/')
+        self.assertSameResponse('orders/0/')
+        self.assertSameResponse('orders/abc/')
+
+    def test_errors_match_sync_api(self):
+        self.assertSameResponse('orders/', {'cursor': 'bad'})
+        self.assertSameResponse('orders/', {'table_number': 'x'})
+
+
+"""Тесты для атомарного добавления блюд в заказ"""
+class OrderAppendItemsTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            table_number=1,
+            items=[{"name": "Борщ", "price": 5.00}],
+            total_price=5.00
+        )
+
+    def test_append_updates_items_total_and_count(self):
+        OrderService.append_items(self.order, [{"name": "Чай", "price": 2.50}, {"name": "Борщ", "price": 5.00}])
+        self.order.refresh_from_db()
+        self.assertEqual([item['name'] for item in self.order.items], ['Борщ', 'Чай', 'Борщ'])
+        self.assertEqual(self.order.total_price, Decimal('12.50'))
+        self.assertEqual(self.order.items_count, 3)
+        self.assertEqual(
+            dict(OrderItem.objects.filter(order=self.order).values_list('name', 'quantity')),
+            {'Борщ': 2, 'Чай': 1}
+        )
+
+    def test_concurrent_appends_are_not_lost(self):
+        # Два терминала загрузили заказ одновременно и добавляют блюда по очереди
+        first = Order.objects.get(pk=self.order.pk)
+        second = Order.objects.get(pk=self.order.pk)
+        OrderService.append_items(first, [{"name": "Чай", "price": 2.00}])
+        OrderService.append_items(second, [{"name": "Кофе", "price": 3.00}])
+
+        self.order.refresh_from_db()
+        self.assertEqual([item['name'] for item in self.order.items], ['Борщ', 'Чай', 'Кофе'])
+        self.assertEqual(self.order.total_price, Decimal('10.00'))
+        self.assertEqual(second.items_count, 3)
+
+    def test_append_cost_does_not_depend_on_order_size(self):
+        Order.objects.filter(pk=self.order.pk).update(items=[{"name": "Борщ", "price": 5.00}] * 500)
+        # Точка сохранения, UPDATE заказа, чтение скалярных полей, UPDATE позиции,
+        # чтение записи в индексе блюд (блюдо в ней уже есть), снятие точки сохранения
+        with CaptureQueriesContext(connection) as queries:
+            OrderService.append_items(self.order, [{"name": "Борщ", "price": 5.00}])
+        self.assertEqual(len(queries), 6)
+        # Список блюд меняется только внутри UPDATE и в Python не читается
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and '"orders_order"."items"' in query['sql'] for query in queries
+        ))
+
+        # Новое блюдо дописывается в индекс, список блюд перечитывается при обращении
+        OrderService.append_items(self.order, [{"name": "Чай", "price": 2.00}])
+        self.assertEqual(DishSearchService.filter_orders(Order.objects.all(), 'чай').get(), self.order)
+        self.assertEqual(DishSearchService.filter_orders(Order.objects.all(), 'борщ').get(), self.order)
+        self.assertEqual(len(self.order.items), 502)
+
+    def test_append_to_paid_order_updates_revenue(self):
+        self.order.status = 'paid'
+        self.order.save()
+        OrderService.append_items(self.order, [{"name": "Чай", "price": 2.00}])
+        revenue = RevenueService.get_revenue()
+        self.assertEqual(revenue['total_revenue'], Decimal('7.00'))
+        self.assertEqual(revenue['orders_count'], 1)
+
+    def test_serializer_update_appends_items(self):
+        request = RequestFactory().patch('/fake-url/', content_type='application/json')
+        serializer = OrderSerializer(
+            instance=self.order,
+            data={'items': [{"name": "Чай", "price": 2.00}], 'status': 'ready'},
+            partial=True,
+            context={'request': request}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.items_count, 2)
+        self.assertEqual(self.order.total_price, Decimal('7.00'))
+        self.assertEqual(self.order.status, 'ready')
+
+
+"""Тесты для оптимистичных блокировок заказа"""
+class OrderVersionTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            table_number=1,
+            items=[{"name": "Борщ", "price": 5.00}],
+            total_price=5.00
+        )
+
+    def test_stale_save_is_rejected(self):
+        first = Order.objects.get(pk=self.order.pk)
+        second = Order.objects.get(pk=self.order.pk)
+        first.status = 'ready'
+        first.save()
+        self.assertEqual(first.version, 2)
+
+        second.status = 'paid'
+        with self.assertRaises(OrderConflictError):
+            second.save()
+        self.assertEqual(second.version, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'ready')
+        self.assertEqual(RevenueService.get_revenue()['orders_count'], 0)
+
+    def test_interleaved_terminals_lose_no_updates(self):
+        # Терминалы читают заказ, по очереди дописывают блюдо целиком перезаписывая список
+        # и при конфликте перечитывают заказ и повторяют
+        terminals = [Order.objects.get(pk=self.order.pk) for _ in range(10)]
+        pending = list(range(len(terminals)))
+        conflicts = 0
+        while pending:
+            index = pending.pop(0)
+            order = terminals[index]
+            order.items = order.items + [{"name": f"Блюдо {index}", "price": 1.00}]
+            order.total_price = sum(item['price'] for item in order.items)
+            try:
+                order.save()
+            except OrderConflictError:
+                conflicts += 1
+                order.refresh_from_db()
+                pending.append(index)
+
+        self.order.refresh_from_db()
+        self.assertGreater(conflicts, 0)
+        self.assertEqual(self.order.items_count, 11)
+        self.assertEqual(self.order.total_price, Decimal('15.00'))
+        self.assertEqual(self.order.version, 11)
+        self.assertEqual(OrderItem.objects.filter(order=self.order).count(), 11)
+
+    def test_bulk_transition_bumps_version(self):
+        OrderService.bulk_transition([self.order.pk], 'ready')
+        self.order.status = 'paid'
+        with self.assertRaises(OrderConflictError):
+            self.order.save()
+
+    def test_api_returns_conflict_for_stale_version(self):
+        url = f'/api/orders/{self.order.pk}/'
+        response = self.client.patch(url, {'status': 'ready', 'version': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], 2)
+
+        response = self.client.patch(url, {'status': 'paid', 'version': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.patch(
+            url, {'items': [{"name": "Чай", "price": 2.00}], 'version': 1}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.items_count), ('ready', 1))
+
+    def test_worker_form_with_stale_version_shows_error(self):
+        worker = Worker(identifier='W001')
+        worker.set_password('secret')
+        worker.save()
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        url = reverse('orders:order_edit', args=[self.order.pk])
+        OrderService.bulk_transition([self.order.pk], 'ready')
+
+        response = self.client.post(url, {
+            'table_number': 1,
+            'status': 'paid',
+            'version': 1,
+            'dish_name_0': 'Борщ',
+            'dish_price_0': '5.00',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Заказ был изменен другим пользователем')
+        self.assertContains(response, 'name="version" value="2"')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'ready')
+
+
+"""Тесты для одновременного изменения заказа из нескольких потоков"""
+class OrderVersionRaceTest(TransactionTestCase):
+    def setUp(self):
+        self.order = Order.objects.create(table_number=1, items=[{"name": "Борщ", "price": 5.00}], total_price=5.00)
+
+    def tearDown(self):
+        Order.objects.all().delete()  # Снимает заказ и с индекса блюд, который не очищается между тестами
+
+    def test_one_of_two_concurrent_writers_wins(self):
+        # Оба запроса прочитали заказ в версии 1, прежде чем любой из них начал запись.
+        # Запись сериализуется блокировкой, как блокировкой записи SQLite с ожиданием:
+        # тестовая база в памяти с общим кэшем вместо ожидания сразу отвечает "table is locked"
+        both_read = threading.Barrier(2, timeout=5)
+        write_lock = threading.Lock()
+        update = OrderSerializer.update
+
+        def concurrent_update(serializer, instance, validated_data):
+            both_read.wait()
+            with write_lock:
+                return update(serializer, instance, validated_data)
+
+        results = {}
+
+        def write(status):
+            try:
+                results[status] = Client().patch(
+                    f'/api/orders/{self.order.pk}/', {'status': status, 'version': 1}, content_type='application/json'
+                ).status_code
+            finally:
+                connection.close()
+
+        with patch.object(OrderSerializer, 'update', concurrent_update):
+            threads = [threading.Thread(target=write, args=(status,)) for status in ('ready', 'paid')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(results.values()), [200, 409])
+        winner = next(status for status, code in results.items() if code == 200)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.version), (winner, 2))
+        self.assertEqual(RevenueService.get_revenue()['orders_count'], int(winner == 'paid'))
+
+
+"""Тесты для аутентификации работников"""
+class WorkerAuthTest(TestCase):
+    def setUp(self):
+        self.worker = Worker(identifier='W001')
+        self.worker.set_password('secret')
+        self.worker.save()
+
+    def test_token_issue_and_revoke(self):
+        response = self.client.post('/api/auth/token/', {'identifier': 'W001', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/auth/token/', {'identifier': 'W001', 'password': 'secret'})
+        self.assertEqual(response.status_code, 201)
+        headers = {'HTTP_AUTHORIZATION': f"Token {response.json()['token']}"}
+
+        self.assertEqual(self.client.get('/api/revenue/', **headers).status_code, 200)
+        self.assertEqual(self.client.delete('/api/auth/token/', **headers).status_code, 204)
+        self.assertEqual(self.client.get('/api/revenue/', **headers).status_code, 401)
+
+    @override_settings(WORKER_AUTH_LOCAL_CACHE_TIMEOUT=60)
+    def test_token_identity_without_queries(self):
+        token = WorkerAuthService.create_token(self.worker)
+        request = RequestFactory().get('/api/revenue/', HTTP_AUTHORIZATION=f'Token {token}')
+        with self.assertNumQueries(0):
+            worker, _ = WorkerTokenAuthentication().authenticate(Request(request))
+        self.assertEqual((worker.id, worker.identifier), (self.worker.pk, 'W001'))
+        self.assertTrue(worker.is_worker)
+
+    @override_settings(
+        WORKER_AUTH_LOCAL_CACHE_TIMEOUT=60, SESSION_ENGINE='django.contrib.sessions.backends.cached_db'
+    )
+    def test_session_identity_without_queries(self):
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        request = RequestFactory().get('/')
+        request.session = SessionStore(self.client.session.session_key)
+        with self.assertNumQueries(0):
+            worker = WorkerAuthService.get_session_worker(request)
+        self.assertEqual(worker.identifier, 'W001')
+
+    def test_deleted_worker_loses_access(self):
+        token = WorkerAuthService.create_token(self.worker)
+        self.assertIsNotNone(WorkerAuthService.get_token_worker(token))
+        self.worker.delete()
+        self.assertIsNone(WorkerAuthService.get_token_worker(token))
+
+    def test_local_cache_timeout(self):
+        # Другой процесс с кэшем в памяти мог закэшировать токен до отзыва
+        token = WorkerAuthService.create_token(self.worker)
+        WorkerAuthService.revoke_token(token)
+        cache.set(WorkerAuthService.token_cache_key(token), self.worker.pk)
+        with override_settings(WORKER_AUTH_LOCAL_CACHE_TIMEOUT=0):
+            self.assertIsNone(WorkerAuthService.get_token_worker(token))
+        self.assertEqual(check_worker_auth_cache(None), [])
+        with override_settings(WORKER_AUTH_LOCAL_CACHE_TIMEOUT=600):
+            self.assertEqual([warning.id for warning in check_worker_auth_cache(None)], ['orders.W001'])
+
+    def test_session_request_reads_no_identity_rows(self):
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/revenue/').status_code, 200)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('orders_worker', sql)
+
+    def test_worker_is_resolved_lazily(self):
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        with patch.object(WorkerAuthService, 'get_session_worker') as get_session_worker:
+            self.assertEqual(self.client.get(reverse('orders:metrics')).status_code, 200)
+        get_session_worker.assert_not_called()
+
+    async def test_async_middleware_sets_worker(self):
+        await self.async_client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        response = await self.async_client.get('/api/async/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.asgi_request.aworker()).identifier, 'W001')
+
+    def test_worker_session_in_api(self):
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        self.assertEqual(self.client.get('/api/revenue/').status_code, 200)
+        self.client.get(reverse('orders:worker_logout'))
+        self.assertEqual(self.client.get('/api/revenue/').status_code, 401)
+
+
+"""Тесты для сводных писем о входах работников"""
+@override_settings(ADMIN_EMAIL='admin@example.com')
+class LoginDigestTest(TestCase):
+    def test_login_is_queued_instead_of_sent(self):
+        worker = Worker(identifier='W001')
+        worker.set_password('secret')
+        worker.save()
+        self.client.post(reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'})
+        self.assertEqual(list(LoginEvent.objects.values_list('worker_identifier', flat=True)), ['W001'])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_client_ip_is_validated(self):
+        factory = RequestFactory()
+        cases = [
+            ({'HTTP_X_FORWARDED_FOR': ' 203.0.113.5 , 10.0.0.1'}, '203.0.113.5'),
+            ({'HTTP_X_FORWARDED_FOR': 'garbage, 10.0.0.1', 'REMOTE_ADDR': '10.0.0.2'}, '10.0.0.2'),
+            ({'HTTP_X_FORWARDED_FOR': '2001:DB8::1'}, '2001:db8::1'),
+            ({'REMOTE_ADDR': 'not-an-ip'}, None),
+        ]
+        for meta, expected in cases:
+            self.assertEqual(WorkerOrderService.get_client_ip(factory.get('/', **meta)), expected)
+
+        worker = Worker(identifier='W001')
+        worker.set_password('secret')
+        worker.save()
+        self.client.post(
+            reverse('orders:worker_login'), {'identifier': 'W001', 'password': 'secret'},
+            HTTP_X_FORWARDED_FOR='<script>, 10.0.0.1'
+        )
+        self.assertEqual(LoginEvent.objects.get().ip_address, '127.0.0.1')
+
+    def test_flush_sends_batches_over_one_connection(self):
+        for number in range(5):
+            LoginDigestService.record(f'W00{number}', '10.0.0.1')
+
+        with patch('orders.notifications.get_connection', wraps=mail.get_connection) as get_connection:
+            sent = LoginDigestService.flush(batch_size=2)
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual([message.subject for message in mail.outbox], [
+            'Входы работников: 2', 'Входы работников: 2', 'Входы работников: 1'
+        ])
+        self.assertIn('сотрудник W000, IP-адрес: 10.0.0.1', mail.outbox[0].body)
+        self.assertFalse(LoginEvent.objects.exists())
+
+    def test_failed_send_keeps_events(self):
+        LoginDigestService.record('W001')
+        with patch('django.core.mail.EmailMessage.send', side_effect=OSError):
+            with self.assertRaises(OSError):
+                LoginDigestService.flush()
+        self.assertEqual(LoginEvent.objects.filter(claim__isnull=True).count(), 1)
+        self.assertEqual(LoginDigestService.flush(), 1)
+
+    def test_claimed_events_are_not_sent_twice(self):
+        for number in range(3):
+            LoginDigestService.record(f'W00{number}')
+        # Другой запуск уже забрал первую пачку и отправляет ее
+        claim, events = LoginDigestService.claim_batch(2)
+        self.assertEqual(len(events), 2)
+
+        self.assertEqual(LoginDigestService.flush(), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Входы работников: 1')
+        self.assertEqual(LoginEvent.objects.filter(claim=claim).count(), 2)
+
+        # Забранные входы упавшего запуска снова уходят после CLAIM_TIMEOUT
+        LoginEvent.objects.update(claimed_at=timezone.now() - LoginDigestService.CLAIM_TIMEOUT * 2)
+        self.assertEqual(LoginDigestService.flush(), 2)
+        self.assertFalse(LoginEvent.objects.exists())
+
+    def test_flush_without_events_opens_no_connection(self):
+        with patch('orders.notifications.get_connection') as get_connection:
+            self.assertEqual(LoginDigestService.flush(), 0)
+        get_connection.assert_not_called()
+
+
+"""Тесты для условных GET-запросов к API заказов"""
+class OrderConditionalGetTest(TestCase):
+    def setUp(self):
+        self.orders = [
+            Order.objects.create(table_number=number, items=[{"name": "Борщ", "price": 5.00}], total_price=5.00)
+            for number in (1, 2, 3)
+        ]
+        self.url = f'/api/orders/{self.orders[0].pk}/'
+
+    def test_retrieve_not_modified_without_serialization(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(etag, f'"{self.orders[0].pk}-1-json"')
+        self.assertIn('Last-Modified', response)
+
+        with patch.object(OrderReadSerializer, 'to_representation') as to_representation:
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+        self.orders[0].status = 'ready'
+        self.orders[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.orders[0].pk}-2-json"')
+
+    def test_retrieve_etag_depends_on_format_and_fields(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', response['Vary'])
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+
+        response = self.client.get(self.url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': self.orders[0].pk})
+        self.assertEqual(self.client.get(self.url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_retrieve_if_modified_since(self):
+        changed_at = datetime(2024, 1, 1, 12, 0, 0, 500000, tzinfo=dt_timezone.utc)
+        Order.objects.filter(pk=self.orders[0].pk).update(updated_at=changed_at)
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(last_modified, 'Mon, 01 Jan 2024 12:00:01 GMT')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Изменение внутри секунды из If-Modified-Since не дает 304
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2024 12:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+        # Last-Modified только что измененного заказа не позже текущего момента
+        self.orders[1].save()
+        response = self.client.get(f'/api/orders/{self.orders[1].pk}/')
+        self.assertLessEqual(parse_http_date(response['Last-Modified']), time.time())
+        self.assertEqual(self.client.get('/api/orders/0/', HTTP_IF_NONE_MATCH='"0-1"').status_code, 404)
+
+    def test_list_not_modified_from_page_rows(self):
+        etag = self.client.get('/api/orders/')['ETag']
+        with patch.object(OrderReadSerializer, 'many') as many, CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        many.assert_not_called()
+        # Только запрос строк страницы, без агрегатов по всей таблице
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT', queries[0]['sql'])
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertNotIn('SUM(', queries[0]['sql'])
+
+        # Страница без измененного заказа сохраняет ETag
+        page_etag = self.client.get('/api/orders/?page_size=1')['ETag']
+        OrderService.append_items(self.orders[0], [{"name": "Чай", "price": 2.00}])
+        self.assertEqual(self.client.get('/api/orders/?page_size=1', HTTP_IF_NONE_MATCH=page_etag).status_code, 304)
+
+        self.assertNotEqual(self.client.get('/api/orders/?page_size=2')['ETag'], etag)
+
+        OrderService.append_items(self.orders[1], [{"name": "Чай", "price": 2.00}])
+        response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.orders[2].delete()
+        self.assertEqual(self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+"""Тесты для поиска заказов по блюдам"""
+class DishSearchTest(TestCase):
+    def setUp(self):
+        self.borscht = Order.objects.create(
+            table_number=1, items=[{"name": "Борщ украинский", "price": 5.00}], total_price=5.00
+        )
+        self.tea = Order.objects.create(table_number=2, items=[{"name": "Чай", "price": 2.00}], total_price=2.00)
+        self.paid = Order.objects.create(
+            table_number=3, items=[{"name": "борщ", "price": 5.00}], total_price=5.00, status='paid'
+        )
+
+    def search(self, query, queryset=None):
+        return sorted(DishSearchService.filter_orders(queryset or Order.objects.all(), query).values_list('pk', flat=True))
+
+    def test_search_is_case_insensitive_and_by_prefix(self):
+        self.assertEqual(self.search('БОРЩ'), [self.borscht.pk, self.paid.pk])
+        self.assertEqual(self.search('укр'), [self.borscht.pk])
+        self.assertEqual(self.search('борщ укр'), [self.borscht.pk])
+        self.assertEqual(self.search('"'), [])
+
+    def test_index_follows_changes(self):
+        OrderService.append_items(self.tea, [{"name": "Борщ", "price": 5.00}])
+        self.paid.items = [{"name": "Компот", "price": 1.00}]
+        self.paid.save()
+        OrderService.bulk_create_orders([Order(table_number=4, items=[{"name": "Борщ", "price": 5.00}])])
+        self.borscht.delete()
+
+        new_order = Order.objects.get(table_number=4)
+        self.assertEqual(self.search('борщ'), [self.tea.pk, new_order.pk])
+        self.assertEqual(self.search('компот'), [self.paid.pk])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {DishSearchService.TABLE}')
+        self.assertEqual(self.search('чай'), [])
+        self.assertEqual(DishSearchService.rebuild(batch_size=2), 3)
+        self.assertEqual(self.search('чай'), [self.tea.pk])
+
+    def test_html_search_box(self):
+        response = self.client.get(reverse('orders:order_list'), {'query': 'борщ', 'status': 'open'})
+        self.assertEqual([order.pk for order in response.context['orders']], [self.borscht.pk])
+
+    def test_api_dish_parameter(self):
+        response = self.client.get('/api/orders/', {'dish': 'борщ', 'status': 'paid'})
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.paid.pk])
+        response = self.client.get('/api/async/orders/', {'dish': 'чай'})
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.tea.pk])
+
+
+"""Тесты для производственного профиля SQLite"""
+class SqliteProductionProfileTest(TestCase):
+    def test_pragmas_are_applied_to_new_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {
+                **connection.settings_dict,
+                'NAME': f'{directory}/profile.sqlite3',
+                'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS,
+            }
+            profile_connection = DatabaseWrapper(settings_dict, alias='sqlite_profile')
+            try:
+                with profile_connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRODUCTION_OPTIONS['timeout'] * 1000)
+                    cursor.execute('PRAGMA cache_size')
+                    self.assertLess(cursor.fetchone()[0], 0)
+                self.assertEqual(profile_connection.transaction_mode, 'IMMEDIATE')
+            finally:
+                profile_connection.close()
+
+
+"""Тесты для метрик запросов и задач"""
+class MetricsTest(TestCase):
+    def setUp(self):
+        Order.objects.create(table_number=1, items=[{"name": "Суп", "price": 5.00}], total_price=5.00)
+
+    @staticmethod
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_metrics_by_route_name(self):
+        requests_before = self.sample('cafe_http_requests_total', view='orders:order_list', method='GET', status='200')
+        queries_before = self.sample('cafe_http_request_db_queries_sum', view='orders:order_list')
+        size_before = self.sample('cafe_http_response_size_bytes_sum', view='orders:order_list')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('orders:order_list'))
+
+        self.assertEqual(
+            self.sample('cafe_http_requests_total', view='orders:order_list', method='GET', status='200'),
+            requests_before + 1
+        )
+        self.assertEqual(self.sample('cafe_http_request_db_queries_sum', view='orders:order_list'), queries_before + len(queries))
+        self.assertEqual(self.sample('cafe_http_response_size_bytes_sum', view='orders:order_list'), size_before + len(response.content))
+
+    def test_api_and_unresolved_routes(self):
+        api_before = self.sample('cafe_http_request_duration_seconds_count', view='order-list', method='GET')
+        missing_before = self.sample('cafe_http_requests_total', view='unresolved', method='GET', status='404')
+        self.client.get('/api/orders/')
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.sample('cafe_http_request_duration_seconds_count', view='order-list', method='GET'), api_before + 1)
+        self.assertEqual(self.sample('cafe_http_requests_total', view='unresolved', method='GET', status='404'), missing_before + 1)
+
+    async def test_async_view_queries_are_counted(self):
+        queries_before = self.sample('cafe_http_request_db_queries_sum', view='async-order-list')
+        response = await self.async_client.get('/api/async/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.sample('cafe_http_request_db_queries_sum', view='async-order-list'), queries_before)
+
+    def test_queries_on_other_thread_connections_are_counted(self):
+        # Асинхронный ORM выполняет запросы в потоках sync_to_async со своими соединениями
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        try:
+            async_to_sync(sync_to_async(lambda: connection.cursor().execute('SELECT 1'), thread_sensitive=False))()
+        finally:
+            current_queries.reset(token)
+        self.assertEqual(queries.count, 1)
+
+    @override_settings(ADMIN_EMAIL='admin@example.com')
+    def test_celery_task_duration(self):
+        labels = {'task': 'orders.tasks.notify_admin_worker_login', 'state': 'SUCCESS'}
+        before = self.sample('cafe_celery_task_duration_seconds_count', **labels)
+        notify_admin_worker_login.apply(args=('1234', timezone.now().isoformat()))
+        self.assertEqual(self.sample('cafe_celery_task_duration_seconds_count', **labels), before + 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('orders:order_list'))
+        response = self.client.get(reverse('orders:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'cafe_http_requests_total{method="GET",status="200",view="orders:order_list"}', response.content)
+
+
+"""Тесты для архивации закрытых заказов"""
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        self.old_paid = self.create_order(1, 'paid', days_ago=40)
+        self.recent_paid = self.create_order(2, 'paid', days_ago=1)
+        self.old_waiting = self.create_order(3, 'waiting')
+        self.cutoff = OrderArchiveService.get_cutoff(30)
+
+    @staticmethod
+    def create_order(table_number, status, days_ago=0):
+        order = Order.objects.create(
+            table_number=table_number,
+            items=[{"name": "Пельмени", "price": 7.50}],
+            total_price=7.50,
+            status=status
+        )
+        if days_ago:
+            paid_at = timezone.now() - timedelta(days=days_ago)
+            Order.objects.filter(pk=order.pk).update(paid_at=paid_at)
+            RevenueService.rebuild_rollups()
+        return order
+
+    def test_archive_moves_old_paid_orders_only(self):
+        revenue_before = RevenueService.get_revenue()
+        self.assertEqual(OrderArchiveService.archive(self.cutoff, batch_size=1), 1)
+
+        self.assertFalse(Order.objects.filter(pk=self.old_paid.pk).exists())
+        archived = OrderArchive.objects.get(pk=self.old_paid.pk)
+        self.assertEqual(archived.items, [{"name": "Пельмени", "price": 7.50}])
+        self.assertEqual((archived.table_number, archived.version), (1, self.old_paid.version))
+        self.assertEqual(
+            sorted(Order.objects.values_list('pk', flat=True)), [self.recent_paid.pk, self.old_waiting.pk]
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old_paid.pk).exists())
+        self.assertFalse(TableService.is_occupied(1))
+        self.assertEqual(self.search('пельм'), [self.recent_paid.pk, self.old_waiting.pk])
+
+        # Выручка не меняется: агрегаты не уменьшаются, пересчет и сверка учитывают архив
+        self.assertEqual(RevenueService.get_revenue(), revenue_before)
+        self.assertEqual(RevenueService.aggregate_orders()['total_revenue'], revenue_before['total_revenue'])
+        RevenueService.rebuild_rollups()
+        self.assertEqual(RevenueService.get_revenue(), revenue_before)
+
+    @staticmethod
+    def search(query):
+        return sorted(DishSearchService.filter_orders(Order.objects.all(), query).values_list('pk', flat=True))
+
+    def test_archive_leaves_no_orphans(self):
+        # Оплаченный заказ со столом и позициями: связанные строки удаляются или обнуляются
+        Table.objects.update_or_create(number=1, defaults={'active_order': self.old_paid})
+        self.assertTrue(OrderItem.objects.filter(order_id=self.old_paid.pk).exists())
+        DishStatsService.rebuild()
+        dishes_before = list(DishSalesTotal.objects.values_list('name', 'quantity', 'revenue'))
+
+        with patch('orders.signals.broker.publish_on_commit') as publish:
+            OrderArchiveService.archive(self.cutoff)
+        publish.assert_not_called()
+
+        self.assertFalse(OrderItem.objects.exclude(order_id__in=Order.objects.values('pk')).exists())
+        self.assertFalse(Table.objects.filter(active_order_id=self.old_paid.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_key_check')
+            self.assertEqual(cursor.fetchall(), [])
+        self.assertEqual(list(DishSalesTotal.objects.values_list('name', 'quantity', 'revenue')), dishes_before)
+
+        # Обычное удаление заказа по-прежнему снимает его вклад
+        self.recent_paid.delete()
+        self.assertEqual(RevenueService.get_revenue()['total_revenue'], Decimal('7.50'))
+
+    def test_detail_and_export_see_archived_orders(self):
+        OrderArchiveService.archive(self.cutoff)
+        pk = self.old_paid.pk
+
+        response = self.client.get(reverse('orders:order_detail', args=[pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'перенесен в архив')
+        self.assertNotContains(response, reverse('orders:order_edit', args=[pk]))
+        self.assertEqual(self.client.get(reverse('orders:order_edit', args=[pk])).status_code, 404)
+
+        response = self.client.get(f'/api/orders/{pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_price'], '7.50')
+        self.assertIn('archived_at', response.json())
+        self.assertEqual(self.client.get(f'/api/orders/{pk}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(f'/api/async/orders/{pk}/').json(), response.json())
+        self.assertEqual(self.client.get('/api/orders/0/').status_code, 404)
+
+        # В списке API только рабочие заказы, в выгрузке — все
+        self.assertNotIn(pk, [order['id'] for order in self.client.get('/api/orders/').json()['results']])
+        rows = [json.loads(line) for line in OrderExportService.iter_ndjson(Q(status='paid'), chunk_size=1)]
+        self.assertEqual([row['id'] for row in rows], [pk, self.recent_paid.pk])
+
+    def test_command_and_task(self):
+        stdout = StringIO()
+        call_command('archive_orders', '--days', '60', stdout=stdout)
+        self.assertIn('Перенесено в архив заказов: 0', stdout.getvalue())
+        archive_orders.apply(kwargs={'days': 30})
+        self.assertTrue(OrderArchive.objects.filter(pk=self.old_paid.pk).exists())
+
+
+"""Тесты для счетчиков продаж блюд"""
+class DishStatsTest(TestCase):
+    @staticmethod
+    def create_order(table_number, items, status='waiting'):
+        return Order.objects.create(
+            table_number=table_number,
+            items=items,
+            total_price=sum(item['price'] for item in items),
+            status=status
+        )
+
+    @staticmethod
+    def totals():
+        return {
+            name: (quantity, revenue)
+            for name, quantity, revenue in DishSalesTotal.objects.filter(quantity__gt=0).values_list('name', 'quantity', 'revenue')
+        }
+
+    def assert_rebuild_matches(self):
+        rollups = sorted(DishSalesRollup.objects.filter(quantity__gt=0).values_list('day', 'table_number', 'name', 'quantity', 'revenue'))
+        totals = self.totals()
+        DishStatsService.rebuild(batch_size=1)
+        self.assertEqual(self.totals(), totals)
+        self.assertEqual(
+            sorted(DishSalesRollup.objects.values_list('day', 'table_number', 'name', 'quantity', 'revenue')), rollups
+        )
+
+    def test_counters_follow_order_changes(self):
+        order = self.create_order(1, [{"name": "Борщ", "price": 5.00}, {"name": "Борщ", "price": 5.00}])
+        self.assertEqual(self.totals(), {})
+
+        order.status = 'paid'
+        order.save()
+        self.assertEqual(self.totals(), {'Борщ': (2, Decimal('10.00'))})
+
+        order.items = [{"name": "Борщ", "price": 5.00}, {"name": "Хлеб", "price": 1.00}]
+        order.save()
+        self.assertEqual(self.totals(), {'Борщ': (1, Decimal('5.00')), 'Хлеб': (1, Decimal('1.00'))})
+
+        OrderService.append_items(order, [{"name": "Хлеб", "price": 1.00}])
+        self.assertEqual(self.totals(), {'Борщ': (1, Decimal('5.00')), 'Хлеб': (2, Decimal('2.00'))})
+        self.assert_rebuild_matches()
+
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.totals(), {})
+
+    def test_bulk_paths_are_counted(self):
+        orders = [
+            Order(table_number=1, items=[{"name": "Чай", "price": 2.00}], total_price=2.00, status='paid'),
+            Order(table_number=2, items=[{"name": "Чай", "price": 2.00}], total_price=2.00, status='waiting'),
+        ]
+        OrderService.bulk_create_orders(orders)
+        self.assertEqual(self.totals(), {'Чай': (1, Decimal('2.00'))})
+
+        OrderService.bulk_transition(Order.objects.filter(table_number=2), 'paid')
+        self.assertEqual(self.totals(), {'Чай': (2, Decimal('4.00'))})
+        self.assertEqual(
+            sorted(DishSalesRollup.objects.values_list('table_number', 'quantity')), [(1, 1), (2, 1)]
+        )
+        self.assert_rebuild_matches()
+
+    def test_increment_or_create(self):
+        increment_or_create(DishSalesTotal, {'name': 'Суп'}, quantity=2, revenue=Decimal('8.00'))
+        increment_or_create(DishSalesTotal, {'name': 'Суп'}, quantity=1, revenue=Decimal('4.00'))
+        self.assertEqual(DishSalesTotal.objects.values_list('name', 'quantity', 'revenue').get(), ('Суп', 3, Decimal('12.00')))
+
+    def test_archive_keeps_counters(self):
+        order = self.create_order(1, [{"name": "Пельмени", "price": 7.50}], status='paid')
+        Order.objects.filter(pk=order.pk).update(paid_at=timezone.now() - timedelta(days=40))
+        DishStatsService.rebuild()
+        totals = self.totals()
+
+        OrderArchiveService.archive(OrderArchiveService.get_cutoff(30))
+        self.assertTrue(OrderArchive.objects.filter(pk=order.pk).exists())
+        self.assertEqual(self.totals(), totals)
+        self.assert_rebuild_matches()
+
+        stdout = StringIO()
+        call_command('rebuild_dish_stats', stdout=stdout)
+        self.assertIn('Счетчики продаж блюд пересчитаны по заказам: 1', stdout.getvalue())
+
+    def test_top_dishes_api(self):
+        self.create_order(1, [{"name": "Борщ", "price": 5.00}] * 3 + [{"name": "Хлеб", "price": 1.00}], status='paid')
+        self.create_order(2, [{"name": "Хлеб", "price": 1.00}] * 2, status='paid')
+        self.create_order(3, [{"name": "Суп", "price": 4.00}] * 5)
+        self.assertEqual(self.client.get('/api/dishes/top/').status_code, 401)
+
+        worker = Worker.objects.create(identifier='W001')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {WorkerAuthService.create_token(worker)}'
+        with self.assertNumQueries(1):  # Токен и работник — из кэша, запрос только к счетчикам
+            response = self.client.get('/api/dishes/top/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'name': 'Борщ', 'quantity': 3, 'revenue': '15.00'},
+            {'name': 'Хлеб', 'quantity': 3, 'revenue': '3.00'},
+        ])
+
+        self.assertEqual(
+            self.client.get('/api/dishes/top/', {'limit': 1}).json(), [{'name': 'Борщ', 'quantity': 3, 'revenue': '15.00'}]
+        )
+        self.assertEqual(
+            self.client.get('/api/dishes/top/', {'table_number': 2}).json(),
+            [{'name': 'Хлеб', 'quantity': 2, 'revenue': '2.00'}]
+        )
+        today = timezone.localdate()
+        self.assertEqual(len(self.client.get('/api/dishes/top/', {'date_from': today}).json()), 2)
+        self.assertEqual(self.client.get('/api/dishes/top/', {'date_to': today - timedelta(days=1)}).json(), [])
+        self.assertEqual(self.client.get('/api/dishes/top/', {'limit': 0}).status_code, 400)
+
+
+"""Тесты для быстрого представления заказов при чтении"""
+class OrderReadSerializerTest(TestCase):
+    def setUp(self):
+        self.waiting = Order.objects.create(
+            table_number=1, items=[{"name": "Борщ", "price": 5}, {"name": "Хлеб", "price": 1.25}], total_price=6.25
+        )
+        self.paid = Order.objects.create(
+            table_number=2, items=[{"name": "Чай", "price": "2.5"}], total_price=10, status='paid'
+        )
+        Order.objects.filter(pk=self.paid.pk).update(paid_at=timezone.now().replace(microsecond=0))
+
+    @staticmethod
+    def render_model_serializer(orders, many=False):
+        request = Request(RequestFactory().get('/api/orders/'))
+        return JSONRenderer().render(OrderSerializer(orders, many=many, context={'request': request}).data)
+
+    def test_matches_model_serializer(self):
+        for tz in ('UTC', 'Europe/Moscow'):
+            with timezone.override(tz):
+                orders = Order.objects.order_by('id')
+                self.assertEqual(
+                    JSONRenderer().render(OrderReadSerializer.many(orders.values(*OrderReadSerializer.FIELDS))),
+                    self.render_model_serializer(orders, many=True)
+                )
+
+    def test_api_responses_match_model_serializer(self):
+        response = self.client.get('/api/orders/', {'ordering': 'id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            JSONRenderer().render(response.json()['results']),
+            self.render_model_serializer(Order.objects.order_by('id'), many=True)
+        )
+        for order in (self.waiting, self.paid):
+            order.refresh_from_db()
+            response = self.client.get(f'/api/orders/{order.pk}/')
+            self.assertEqual(response.content, self.render_model_serializer(order))
+            self.assertEqual(response['ETag'], f'"{order.pk}-{order.version}-json"')
+        self.assertEqual(self.client.get('/api/orders/abc/').status_code, 404)
+
+    def test_cursor_pages_from_rows(self):
+        first = self.client.get('/api/orders/', {'page_size': 1}).json()
+        self.assertEqual([order['id'] for order in first['results']], [self.paid.pk])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([order['id'] for order in second['results']], [self.waiting.pk])
+        self.assertIsNone(second['next'])
+
+
+"""Тесты для быстрых JSON и MessagePack в API"""
+class FastRendererTest(TestCase):
+    data = {
+        'price': Decimal('7.50'),
+        'paid_at': datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=dt_timezone.utc),
+        'local': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.get_fixed_timezone(180)),
+        'day': date(2025, 1, 2),
+        'items': [{'name': 'Борщ\u2028', 'price': 5.5}, None, True],
+        1: 'ключ-число',
+    }
+
+    def test_json_matches_default_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), JSONRenderer().render({'big': 2 ** 70}))
+        with patch('api.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_json_parser(self):
+        body = '{"table_number": 1, "items": [{"name": "Борщ", "price": 5.5}]}'.encode()
+        expected = JSONParser().parse(BytesIO(body))
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), expected)
+        with patch('api.parsers.orjson', None):
+            self.assertEqual(FastJSONParser().parse(BytesIO(body)), expected)
+        with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+            FastJSONParser().parse(BytesIO(b'{"items": NaN}'))
+
+    def test_api_json_and_msgpack(self):
+        response = self.client.post(
+            '/api/orders/', {'table_number': 1, 'items': [{'name': 'Чай', 'price': 2.5}]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        body = msgpack.packb({'table_number': 2, 'items': [{'name': 'Борщ', 'price': 5}]})
+        response = self.client.post('/api/orders/', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        json_response = self.client.get('/api/orders/')
+        msgpack_response = self.client.get('/api/orders/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(msgpack_response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(msgpack_response.content), json_response.json())
+        response = self.client.post('/api/orders/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+"""Тесты для выбора полей заказа в API (?fields= и ?exclude=)"""
+class SparseFieldsTest(TestCase):
+    ITEMS_COLUMN = '"orders_order"."items"'
+
+    def setUp(self):
+        self.orders = [
+            Order.objects.create(table_number=number, items=[{"name": "Борщ", "price": 5}], total_price=5)
+            for number in (3, 1, 2)
+        ]
+
+    def get(self, path, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [query['sql'] for query in queries.captured_queries]
+
+    def test_list_without_items_skips_json_column(self):
+        data, queries = self.get('/api/orders/', {'fields': 'id,table_number,status'})
+        self.assertEqual(
+            data['results'],
+            [{'id': order.pk, 'table_number': order.table_number, 'status': 'waiting'} for order in reversed(self.orders)]
+        )
+        self.assertFalse([sql for sql in queries if self.ITEMS_COLUMN in sql])
+
+        data, queries = self.get('/api/orders/', {'exclude': 'items, created_at', 'page': 1})
+        self.assertEqual(
+            list(data['results'][0]),
+            ['id', 'version', 'table_number', 'items_count', 'total_price', 'status', 'updated_at', 'paid_at']
+        )
+        self.assertFalse([sql for sql in queries if self.ITEMS_COLUMN in sql])
+
+        data, queries = self.get('/api/orders/', {'fields': 'items'})
+        self.assertEqual(data['results'][0], {'items': [{"name": "Борщ", "price": 5}]})
+
+    def test_cursor_with_fields_outside_ordering(self):
+        data, _ = self.get('/api/orders/', {'fields': 'status', 'ordering': 'table_number', 'page_size': 2})
+        self.assertEqual(data['results'], [{'status': 'waiting'}] * 2)
+        data, _ = self.get(data['next'], {})
+        self.assertEqual(data['results'], [{'status': 'waiting'}])
+        self.assertIsNone(data['next'])
+
+    def test_detail_and_archive(self):
+        order = self.orders[0]
+        response = self.client.get(f'/api/orders/{order.pk}/', {'fields': 'status,total_price'})
+        self.assertEqual(response.json(), {'total_price': '5.00', 'status': 'waiting'})
+        self.assertEqual(response['ETag'], f'"{order.pk}-{order.version}-json-total_price,status"')
+
+        Order.objects.filter(pk=order.pk).update(status='paid', paid_at=timezone.now() - timedelta(days=40))
+        OrderArchiveService.archive(OrderArchiveService.get_cutoff(30))
+        response = self.client.get(f'/api/orders/{order.pk}/', {'fields': 'id'})
+        self.assertEqual(list(response.json()), ['id', 'archived_at'])
+
+    def test_invalid_fields(self):
+        response = self.client.get('/api/orders/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Неизвестные поля: secret.']})
+        self.assertEqual(self.client.get('/api/orders/', {'fields': 'id', 'exclude': 'id'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/async/orders/', {'exclude': 'nope'}).status_code, 400)
+
+    async def test_async_view_fields(self):
+        response = await self.async_client.get('/api/async/orders/', {'fields': 'id'})
+        self.assertEqual(response.json()['results'], [{'id': order.pk} for order in reversed(self.orders)])
@@ -8,6 +8,8 @@ app_name = 'orders'
 
 urlpatterns = [
     path('', views.order_list, name='order_list'),  # Список заказов
+    path('orders/events/', views.order_events, name='order_events'),  # События заказов (SSE)
+    path('metrics', views.metrics, name='metrics'),  # Метрики для Prometheus
     path('order/<int:pk>/', views.order_detail, name='order_detail'),  # Детали заказа
     path('order/new/', views.order_create, name='order_create'),  # Создание заказа
     path('order/<int:pk>/edit/', views.order_update, name='order_edit'),  # Редактирование заказа
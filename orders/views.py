@@ -1,6 +1,10 @@
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 
-from .models import Order
+from .archive import OrderArchiveService
+from .live import OrderEventService
+from .metrics import MetricsService
+from .models import Order, OrderArchive
 from .services import OrderService, WorkerOrderService
 
 
@@ -12,12 +16,38 @@ def order_list(request) -> render:
     return OrderService.order_list_request(request)
 
 
+async def order_events(request) -> StreamingHttpResponse:
+    """
+    Поток событий заказов (server-sent events) для доски заказов.
+    Без ASGI — ответ 204: по нему EventSource не переподключается.
+    """
+    if not OrderEventService.is_available(request):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(OrderEventService.stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Отключаем буферизацию в nginx
+    return response
+
+
+def metrics(request) -> HttpResponse:
+    """
+    Метрики запросов и задач в формате Prometheus.
+    """
+    content, content_type = MetricsService.render()
+    return HttpResponse(content, content_type=content_type)
+
+
 def order_detail(request, pk) -> render:
     """"
     Детали заказа.
     """
-    order = get_object_or_404(Order, pk=pk)
-    return render(request, 'orders/order_detail.html', {'order': order})
+    order = OrderArchiveService.get_order(pk)
+    if order is None:
+        raise Http404("Заказ не найден.")
+    return render(request, 'orders/order_detail.html', {
+        'order': order,
+        'archived': isinstance(order, OrderArchive),  # Архивный заказ только для просмотра
+    })
 
 
 def order_create(request) -> render:
@@ -40,7 +70,7 @@ def order_update(request, pk):
     """
     order = get_object_or_404(Order, pk=pk)
 
-    if request.session.get('worker_id'):
+    if request.worker:
         # Если пользователь — работник, используем WorkerOrderService
         return WorkerOrderService.worker_update_order_from_request(
             request,